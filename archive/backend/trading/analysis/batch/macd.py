@@ -1,34 +1,133 @@
 import sys
-import json
-import pandas as pd
+from functools import lru_cache
 import numpy as np
+import orjson
 
-def calculate_macd(prices, fast=12, slow=26, signal=9):
-    """计算MACD指标"""
+
+def _macd_loop(prices, af, as_, asig):
+    """单次遍历计算快线EMA、慢线EMA与信号线EMA（与 ewm(adjust=False) 一致）"""
+    n = prices.shape[0]
+    # 单次分配，第0行为MACD，第1行为信号线；精度跟随输入dtype
+    out = np.empty((2, n), dtype=prices.dtype)
+
+    ef = prices[0]
+    es = prices[0]
+    sig = ef - es  # 与输入同dtype的0，避免float32被提升为float64
+    for i in range(n):
+        ef = ef + af * (prices[i] - ef)
+        es = es + as_ * (prices[i] - es)
+        m = ef - es
+        sig = sig + asig * (m - sig)
+        out[0, i] = m
+        out[1, i] = sig
+    return out
+
+
+# 默认参数(12, 26, 9)的平滑系数，作为编译期常量供特化内核使用
+DEFAULT_ALPHAS = (2.0 / 13, 2.0 / 27, 2.0 / 10)
+
+
+def _make_default_loop(loop):
+    af, as_, asig = DEFAULT_ALPHAS
+
+    def _macd_default_loop(prices):
+        return loop(prices, af, as_, asig)
+    return _macd_default_loop
+
+
+try:
+    # 优先使用 macd_aot.py 预编译的扩展模块，子进程启动时无需JIT
+    from macd_kernel import macd_ema, macd_ema_f32
+    from macd_kernel import macd_ema_default as _macd_default_kernel
+    _KERNELS = {np.dtype(np.float64): macd_ema, np.dtype(np.float32): macd_ema_f32}
+except ImportError:
+    from numba import njit
+    _macd_kernel = njit(cache=True, fastmath=True)(_macd_loop)
+    _macd_default_kernel = njit(cache=True, fastmath=True)(_make_default_loop(_macd_kernel))
+    _KERNELS = {np.dtype(np.float64): _macd_kernel, np.dtype(np.float32): _macd_kernel}
+
+
+@lru_cache(maxsize=None)
+def _alphas(fast, slow, signal, dtype=np.dtype(np.float64)):
+    """EMA平滑系数 2/(span+1)，按计算精度转换"""
+    return tuple(dtype.type(2.0 / (span + 1)) for span in (fast, slow, signal))
+
+
+def calculate_macd(prices, fast=12, slow=26, signal=9, dtype=np.float64):
+    """计算MACD指标
+
+    dtype=np.float32 可减半内存带宽，适合实时场景；默认float64保证研究精度。
+    """
     if len(prices) < slow:
         return {
             "error": f"需要至少{slow}个数据点，当前{len(prices)}个"
         }
-    
-    close_prices = np.array(prices, dtype=np.float64)
-    # 计算EMA
-    ema_fast = pd.Series(close_prices).ewm(span=fast, adjust=False).mean()
-    ema_slow = pd.Series(close_prices).ewm(span=slow, adjust=False).mean()
-    macd_line = ema_fast - ema_slow
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-    
-    # 返回原始计算结果（包含NaN）
+    dtype = np.dtype(dtype)
+    if dtype not in _KERNELS:
+        return {"error": f"不支持的计算精度: {dtype}"}
+
+    # 已是连续且dtype一致的数组时不复制
+    close_prices = np.ascontiguousarray(prices, dtype=dtype)
+    # 计算EMA；默认参数走系数常量折叠的特化内核
+    if dtype == np.float64 and (fast, slow, signal) == (12, 26, 9):
+        out = _macd_default_kernel(close_prices)
+    else:
+        out = _KERNELS[dtype](close_prices, *_alphas(fast, slow, signal, dtype))
+
+    # 返回原始计算结果（numpy数组视图，由orjson直接序列化）
+    return {
+        "macd": out[0],
+        "signal": out[1]
+    }
+
+def calculate_macd_batch(prices, fast=12, slow=26, signal=9, dtype=np.float64):
+    """批量计算多个品种的MACD，prices 形状为 (品种数, 时间长度)"""
+    dtype = np.dtype(dtype)
+    close_prices = np.asarray(prices, dtype=dtype)
+    if close_prices.ndim != 2:
+        return {"error": "批量输入必须是二维数组"}
+    if close_prices.shape[1] < slow:
+        return {
+            "error": f"需要至少{slow}个数据点，当前{close_prices.shape[1]}个"
+        }
+
+    af, as_, asig = _alphas(fast, slow, signal, dtype)
+    # 转为 (时间, 品种) 布局，每个时间步对所有品种做一次向量化更新
+    columns = np.ascontiguousarray(close_prices.T)
+    macd_line = np.empty_like(columns)
+    signal_line = np.empty_like(columns)
+
+    ema_fast = columns[0].copy()
+    ema_slow = columns[0].copy()
+    sig = np.zeros(columns.shape[1], dtype=dtype)
+    for t in range(columns.shape[0]):
+        x = columns[t]
+        ema_fast += af * (x - ema_fast)
+        ema_slow += as_ * (x - ema_slow)
+        m = macd_line[t]
+        np.subtract(ema_fast, ema_slow, out=m)
+        sig += asig * (m - sig)
+        signal_line[t] = sig
+
     return {
-        "macd": macd_line.tolist(),
-        "signal": signal_line.tolist()
+        "macd": np.ascontiguousarray(macd_line.T),
+        "signal": np.ascontiguousarray(signal_line.T)
     }
 
+def _write(obj):
+    sys.stdout.buffer.write(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY))
+    sys.stdout.buffer.write(b"\n")
+
 if __name__ == "__main__":
     try:
-        # 从命令行参数获取输入数据
-        input_data = json.loads(sys.argv[1])
-        results = calculate_macd(input_data)
-        print(json.dumps(results))
+        # 从标准输入读取数据；保留命令行参数方式以兼容旧调用
+        raw = sys.argv[1] if len(sys.argv) > 1 else sys.stdin.buffer.read()
+        input_data = orjson.loads(raw)
+        if input_data and isinstance(input_data[0], list):
+            results = calculate_macd_batch(input_data)
+        else:
+            results = calculate_macd(input_data)
+        _write(results)
     except Exception as e:
-        print(json.dumps({"error": str(e)}))
+        _write({"error": str(e)})
         sys.exit(1)
@@ -0,0 +1,15 @@
+"""预编译MACD内核：python macd_aot.py 生成 macd_kernel 扩展模块"""
+import os
+from numba import njit
+from numba.pycc import CC
+
+from macd import _macd_loop, _make_default_loop
+
+cc = CC('macd_kernel')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.export('macd_ema', 'f8[:,:](f8[:], f8, f8, f8)')(_macd_loop)
+cc.export('macd_ema_f32', 'f4[:,:](f4[:], f4, f4, f4)')(_macd_loop)
+cc.export('macd_ema_default', 'f8[:,:](f8[:])')(_make_default_loop(njit(_macd_loop)))
+
+if __name__ == "__main__":
+    cc.compile()
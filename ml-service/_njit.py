@@ -0,0 +1,13 @@
+"""Numba JIT装饰器的兼容入口
+
+未安装numba时退化为原样返回被装饰函数，指标内核仍可按纯Python执行。
+"""
+try:
+    from numba import njit
+except ImportError:  # pragma: no cover
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda f: f
+
+__all__ = ["njit"]
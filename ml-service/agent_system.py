@@ -1,55 +1,475 @@
 import logging
+import math
+import os
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Union, Any
+from typing import Callable, Dict, List, Optional, Union, Any
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 import json
+import orjson
 import sqlite3
+import threading
+import time
+import weakref
 from pathlib import Path
 from abc import ABC, abstractmethod
 from collections import deque
-from decimal import Decimal
+from _njit import njit
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+_logging_configured = False
+
+def _configure_logging() -> None:
+    """配置日志（进程内只执行一次）"""
+    global _logging_configured
+    if _logging_configured:
+        return
+    logging.basicConfig(level=logging.INFO)
+    _logging_configured = True
+
+_configure_logging()
 logger = logging.getLogger(__name__)
 
+# 数据库与日志目录固定在模块所在目录，导入时只解析/创建一次
+_DB_PATH = Path(__file__).resolve().parent / "agent_system.db"
+_LOG_DIR = Path(__file__).resolve().parent / "logs"
+_LOG_DIR.mkdir(parents=True, exist_ok=True)
+
+# OHLCV输入后端：默认pandas；设为polars时analyze()同时接受pl.DataFrame
+OHLCV_BACKEND = os.getenv("OHLCV_BACKEND", "pandas").lower()
+if OHLCV_BACKEND == "polars":
+    try:
+        import polars as pl
+    except ImportError as e:
+        raise ImportError("OHLCV_BACKEND=polars requires the optional polars extra (poetry install -E polars or pip install polars)") from e
+    FRAME_TYPES: tuple = (pd.DataFrame, pl.DataFrame)
+    _FRAME_TYPE_ERROR = "data must be a pandas or polars DataFrame"
+else:
+    FRAME_TYPES = (pd.DataFrame,)
+    _FRAME_TYPE_ERROR = "data must be a pandas DataFrame"
+
+def _frame_index(data) -> Any:
+    """行标签：pandas取索引；polars取timestamp列（不存在时为行号）"""
+    if isinstance(data, pd.DataFrame):
+        return data.index
+    if 'timestamp' in data.columns:
+        return data['timestamp']
+    return range(len(data))
+
+@njit(cache=True, nogil=True)
+def _rolling_mean(x: np.ndarray, period: int, min_periods: int) -> np.ndarray:
+    """O(N) rolling mean using a running sum (NaN-skipping like pandas)"""
+    n = x.shape[0]
+    out = np.empty(n, dtype=np.float64)
+    s = 0.0
+    count = 0
+    for i in range(n):
+        v = x[i]
+        if not np.isnan(v):
+            s += v
+            count += 1
+        if i >= period:
+            old = x[i - period]
+            if not np.isnan(old):
+                s -= old
+                count -= 1
+        out[i] = s / count if count >= min_periods and count > 0 else np.nan
+    return out
+
+@njit(cache=True, nogil=True)
+def _welford_add(count: int, mean: float, m2: float, v: float) -> tuple[int, float, float]:
+    count += 1
+    delta = v - mean
+    mean += delta / count
+    m2 += delta * (v - mean)
+    return count, mean, m2
+
+@njit(cache=True, nogil=True)
+def _welford_remove(count: int, mean: float, m2: float, v: float) -> tuple[int, float, float]:
+    if count <= 1:
+        return 0, 0.0, 0.0
+    count -= 1
+    delta = v - mean
+    mean -= delta / count
+    m2 -= delta * (v - mean)
+    return count, mean, m2
+
+@njit(cache=True, nogil=True)
+def _gains_losses(x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """单次遍历计算逐根涨幅与跌幅（首根为NaN，与diff一致）"""
+    n = x.shape[0]
+    gains = np.empty(n, dtype=np.float64)
+    losses = np.empty(n, dtype=np.float64)
+    if n > 0:
+        gains[0] = np.nan
+        losses[0] = np.nan
+    for i in range(1, n):
+        d = x[i] - x[i - 1]
+        if np.isnan(d):
+            gains[i] = np.nan
+            losses[i] = np.nan
+        else:
+            gains[i] = d if d > 0 else 0.0
+            losses[i] = -d if d < 0 else 0.0
+    return gains, losses
+
+@njit(cache=True, nogil=True)
+def _rsi_loop(close: np.ndarray, period: int) -> np.ndarray:
+    """RSI内核：涨跌幅与均值在编译代码中完成，100*G/(G+L)（G+L=0时为NaN）"""
+    gains, losses = _gains_losses(close)
+    avg_gains = _rolling_mean(gains, period, 1)
+    avg_losses = _rolling_mean(losses, period, 1)
+    out = np.empty(close.shape[0], dtype=np.float64)
+    for i in range(close.shape[0]):
+        total = avg_gains[i] + avg_losses[i]
+        out[i] = 100.0 * avg_gains[i] / total if total > 0.0 else np.nan
+    return out
+
+@njit(cache=True, nogil=True)
+def _atr_loop(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    """ATR内核：单次遍历求真实波幅（NaN项跳过，与DataFrame.max(axis=1)一致）后取滑动均值"""
+    n = close.shape[0]
+    tr = np.empty(n, dtype=np.float64)
+    for i in range(n):
+        best = high[i] - low[i]
+        if i > 0:
+            for v in (abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1])):
+                if np.isnan(best) or v > best:
+                    best = v
+        tr[i] = best
+    return _rolling_mean(tr, period, period)
+
+@njit(cache=True, nogil=True)
+def _rolling_std_welford(arr: np.ndarray, window: int, num_std: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """布林带内核：Welford增删更新求滑动样本标准差（跳过NaN），滑动和求中轨，上下轨在同一次遍历中写出"""
+    n = arr.shape[0]
+    upper = np.empty(n, dtype=np.float64)
+    middle = np.empty(n, dtype=np.float64)
+    lower = np.empty(n, dtype=np.float64)
+    s = 0.0
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        if i >= window:
+            old = arr[i - window]
+            if not np.isnan(old):
+                s -= old
+                count, mean, m2 = _welford_remove(count, mean, m2, old)
+        v = arr[i]
+        if not np.isnan(v):
+            s += v
+            count, mean, m2 = _welford_add(count, mean, m2, v)
+        mid = s / count if count >= window and count > 0 else np.nan
+        if count >= window and count > 1:
+            band = num_std * (np.sqrt(m2 / (count - 1)) if m2 > 0.0 else 0.0)
+        else:
+            band = np.nan
+        middle[i] = mid
+        upper[i] = mid + band
+        lower[i] = mid - band
+    return upper, middle, lower
+
 def calculate_sma(data: pd.Series, period: int) -> pd.Series:
     """Calculate Simple Moving Average"""
-    return data.rolling(window=period).mean()
+    values = _rolling_mean(data.to_numpy(dtype=np.float64), period, period)
+    return pd.Series(values, index=data.index)
+
+def latest_sma(data: pd.Series, period: int) -> float:
+    """Latest value of calculate_sma without building the full series"""
+    window = data.iloc[-period:].to_numpy(dtype=np.float64)
+    if window.shape[0] < period or np.isnan(window).any():
+        return float('nan')
+    return float(window.mean())
 
 def calculate_rsi(data: pd.Series, period: int = 14) -> pd.Series:
     """Calculate Relative Strength Index"""
-    delta = pd.Series(data.diff(), dtype=float)
-    gains = delta.clip(lower=0)
-    losses = -delta.clip(upper=0)
-    avg_gains = gains.rolling(window=period, min_periods=1).mean()
-    avg_losses = losses.rolling(window=period, min_periods=1).mean()
-    rs = avg_gains / avg_losses.replace(0, float('inf'))
-    return pd.Series(100 - (100 / (1 + rs)), dtype=float)
+    return pd.Series(_rsi_loop(data.to_numpy(dtype=np.float64), period), index=data.index)
 
 def calculate_atr(high: pd.Series, low: pd.Series, close: pd.Series, period: int = 14) -> pd.Series:
     """Calculate Average True Range"""
-    tr1 = high - low
-    tr2 = abs(high - close.shift())
-    tr3 = abs(low - close.shift())
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    return tr.rolling(window=period).mean()
+    values = _atr_loop(high.to_numpy(dtype=np.float64), low.to_numpy(dtype=np.float64),
+                       close.to_numpy(dtype=np.float64), period)
+    return pd.Series(values, index=high.index)
 
 def calculate_bbands(data: pd.Series, period: int = 20, num_std: float = 2) -> tuple[pd.Series, pd.Series, pd.Series]:
     """Calculate Bollinger Bands"""
-    middle = calculate_sma(data, period)
-    std = data.rolling(window=period).std()
-    upper = middle + (std * num_std)
-    lower = middle - (std * num_std)
-    return upper, middle, lower
+    upper, middle, lower = _rolling_std_welford(data.to_numpy(dtype=np.float64), period, float(num_std))
+    index = data.index
+    return pd.Series(upper, index=index), pd.Series(middle, index=index), pd.Series(lower, index=index)
+
+class RollingMean:
+    """增量滑动均值，每次更新O(1)，NaN不计入窗口有效数"""
+
+    def __init__(self, period: int, min_periods: Optional[int] = None):
+        self.period = period
+        self.min_periods = period if min_periods is None else min_periods
+        self.window: deque[float] = deque(maxlen=period)
+        self.total = 0.0
+        self.count = 0
+
+    def update(self, value: float) -> float:
+        if len(self.window) == self.period:
+            old = self.window[0]
+            if not math.isnan(old):
+                self.total -= old
+                self.count -= 1
+        self.window.append(value)
+        if not math.isnan(value):
+            self.total += value
+            self.count += 1
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.count > 0 and self.count >= self.min_periods:
+            return self.total / self.count
+        return float('nan')
+
+class RollingStd(RollingMean):
+    """增量滑动样本标准差（Welford增删更新，避免Σx²−(Σx)²/n在高价位下的相消误差）"""
+
+    def __init__(self, period: int):
+        super().__init__(period)
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, value: float) -> float:
+        if len(self.window) == self.period:
+            old = self.window[0]
+            if not math.isnan(old):
+                self._remove(old)
+        self.window.append(value)
+        if not math.isnan(value):
+            self._add(value)
+        return self.value
+
+    def _add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def _remove(self, value: float) -> None:
+        self.count -= 1
+        self.total -= value
+        if self.count == 0:
+            self.mean = 0.0
+            self.m2 = 0.0
+            return
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= delta * (value - self.mean)
+
+    @property
+    def value(self) -> float:
+        if self.count < self.min_periods or self.count < 2:
+            return float('nan')
+        var = self.m2 / (self.count - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+class RollingExtreme:
+    """增量滑动最大/最小值（单调队列，均摊O(1)）"""
+
+    def __init__(self, period: int, mode: str = 'max'):
+        if mode not in ('max', 'min'):
+            raise ValueError("mode must be 'max' or 'min'")
+        self.period = period
+        self.sign = 1.0 if mode == 'max' else -1.0
+        self.valid: deque[bool] = deque(maxlen=period)
+        self.count = 0
+        self.candidates: deque[tuple[int, float]] = deque()
+        self.index = -1
+
+    def update(self, value: float) -> float:
+        self.index += 1
+        if len(self.valid) == self.period and self.valid[0]:
+            self.count -= 1
+        is_valid = not math.isnan(value)
+        self.valid.append(is_valid)
+        while self.candidates and self.candidates[0][0] <= self.index - self.period:
+            self.candidates.popleft()
+        if is_valid:
+            self.count += 1
+            key = value * self.sign
+            while self.candidates and self.candidates[-1][1] * self.sign <= key:
+                self.candidates.pop()
+            self.candidates.append((self.index, value))
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.count < self.period:
+            return float('nan')
+        return self.candidates[0][1]
+
+class OnlineRSI:
+    """增量RSI，与calculate_rsi的滑动均值口径一致"""
+
+    def __init__(self, period: int = 14):
+        self.avg_gain = RollingMean(period, min_periods=1)
+        self.avg_loss = RollingMean(period, min_periods=1)
+        self.prev_close: Optional[float] = None
+
+    def update(self, close: float) -> float:
+        delta = float('nan') if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+        self.avg_gain.update(max(delta, 0.0) if not math.isnan(delta) else delta)
+        self.avg_loss.update(max(-delta, 0.0) if not math.isnan(delta) else delta)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        avg_gain = self.avg_gain.value
+        total = avg_gain + self.avg_loss.value
+        return 100.0 * avg_gain / total if total > 0 else float('nan')
+
+class OnlineATR:
+    """增量ATR，与calculate_atr口径一致"""
+
+    def __init__(self, period: int = 14):
+        self.mean = RollingMean(period)
+        self.prev_close: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float) -> float:
+        ranges = [high - low]
+        if self.prev_close is not None:
+            ranges += [abs(high - self.prev_close), abs(low - self.prev_close)]
+        ranges = [r for r in ranges if not math.isnan(r)]
+        self.prev_close = close
+        return self.mean.update(max(ranges) if ranges else float('nan'))
+
+    @property
+    def value(self) -> float:
+        return self.mean.value
+
+class OHLCVBuffer:
+    """定长环形缓冲区，按列(SoA)保存最近的OHLCV"""
+
+    fields = ('open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.full(capacity, np.nan) for name in self.fields
+        }
+        self.timestamps = np.empty(capacity, dtype=object)
+        self.head = -1
+        self.size = 0
+
+    def clear(self) -> None:
+        self.head = -1
+        self.size = 0
+
+    def push(self, bar: Dict[str, float], timestamp: Any = None) -> None:
+        self.head = (self.head + 1) % self.capacity
+        for name, column in self.columns.items():
+            column[self.head] = bar.get(name, np.nan)
+        self.timestamps[self.head] = timestamp
+        if self.size < self.capacity:
+            self.size += 1
+
+    def last(self, name: str) -> float:
+        """最新一根K线的字段值"""
+        if self.size == 0:
+            return float('nan')
+        return float(self.columns[name][self.head])
+
+    def tail(self, name: str, n: int) -> np.ndarray:
+        """按时间顺序返回最近n根K线的字段值"""
+        n = min(n, self.size)
+        return np.take(self.columns[name], range(self.head - n + 1, self.head + 1), mode='wrap')
+
+    def frame(self) -> pd.DataFrame:
+        """按时间顺序的全部缓冲K线，以推入时的时间戳为索引"""
+        positions = range(self.head - self.size + 1, self.head + 1)
+        return pd.DataFrame(
+            {name: np.take(column, positions, mode='wrap') for name, column in self.columns.items()},
+            index=pd.Index(np.take(self.timestamps, positions, mode='wrap').tolist())
+        )
 
-# 配置日志
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+class IndicatorCache:
+    """单个(symbol, timeframe)的共享增量指标状态，所有Agent共用一次计算"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.ohlcv = OHLCVBuffer()
+        self.sma20 = RollingMean(20)
+        self.sma50 = RollingMean(50)
+        self.std20 = RollingStd(20)
+        self.rsi = OnlineRSI(14)
+        self.atr = OnlineATR(14)
+        self.highest = RollingExtreme(20, 'max')
+        self.lowest = RollingExtreme(20, 'min')
+        self.volume_sma = RollingMean(20)
+        # 前一个周期的高低点（不含当前K线）
+        self.prev_highest = float('nan')
+        self.prev_lowest = float('nan')
+        self.count = 0
+        self.timestamp: Any = None
+        # 最近一次sync的末根K线(标签, 收盘价)，用于识别只新增一根K线的输入
+        self.last_bar: Optional[tuple] = None
+
+    def update(self, bar: Dict[str, float], timestamp: Any = None) -> Dict[str, float]:
+        """推入一根新K线，O(1)更新全部指标并返回最新指标值"""
+        close = bar['close']
+        high = bar.get('high', np.nan)
+        low = bar.get('low', np.nan)
+        self.ohlcv.push(bar, timestamp)
+        self.sma20.update(close)
+        self.sma50.update(close)
+        self.std20.update(close)
+        self.rsi.update(close)
+        self.atr.update(high, low, close)
+        self.prev_highest = self.highest.value
+        self.prev_lowest = self.lowest.value
+        self.highest.update(high)
+        self.lowest.update(low)
+        self.volume_sma.update(bar.get('volume', np.nan))
+        self.count += 1
+        self.timestamp = timestamp
+        return self.snapshot()
+
+    def sync(self, data: pd.DataFrame, columns: List[str], warmup_bars: int) -> None:
+        """使指标状态与data末尾对齐
+
+        若data仅比上次多出一根K线则只增量更新该K线，否则用尾部warmup_bars根K线重建状态。
+        """
+        # 每列只取一次numpy视图，后续均按数组下标访问
+        arrays = {col: np.asarray(data[col].to_numpy(), dtype=np.float64) for col in columns}
+        closes = arrays['close']
+        index = _frame_index(data)
+        if (self.last_bar is not None and len(data) > 1
+                and self.last_bar == (index[-2], closes[-2])):
+            self.update({col: float(values[-1]) for col, values in arrays.items()})
+        else:
+            self.reset()
+            tail = {col: values[-warmup_bars:] for col, values in arrays.items()}
+            for i in range(len(tail['close'])):
+                self.update({col: float(values[i]) for col, values in tail.items()})
+        self.timestamp = index[-1]
+        self.last_bar = (index[-1], closes[-1])
+
+    def snapshot(self) -> Dict[str, float]:
+        """当前各指标的标量值"""
+        return {
+            'close': self.ohlcv.last('close'),
+            'sma20': self.sma20.value,
+            'sma50': self.sma50.value,
+            'std20': self.std20.value,
+            'rsi': self.rsi.value,
+            'atr': self.atr.value,
+            'highest': self.highest.value,
+            'lowest': self.lowest.value,
+            'prev_highest': self.prev_highest,
+            'prev_lowest': self.prev_lowest,
+            'volume_sma': self.volume_sma.value,
+        }
 
-@dataclass
+@dataclass(slots=True)
 class AgentConfig:
     """Agent配置"""
     name: str
@@ -68,7 +488,13 @@ class AgentConfig:
     maintenance_margin: float = 0.05
     metadata: Dict[str, Any] = field(default_factory=dict)
 
-@dataclass
+def _to_float(value: Any, error: str) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        raise ValueError(error) from None
+
+@dataclass(slots=True, frozen=True)
 class TradeSignal:
     """交易信号"""
     symbol: str
@@ -83,36 +509,214 @@ class TradeSignal:
     metadata: Dict[str, Any] = field(default_factory=dict)
 
     def __post_init__(self):
-        if self.direction not in ('buy', 'sell'):
-            raise ValueError("Direction must be 'buy' or 'sell'")
-        if not isinstance(self.price, (int, float, Decimal)) or self.price <= 0:
-            raise ValueError("Invalid price")
-        if not isinstance(self.size, (int, float, Decimal)) or self.size <= 0:
-            raise ValueError("Invalid size")
-        if not isinstance(self.confidence, (int, float)) or not 0 <= self.confidence <= 1:
-            raise ValueError("Confidence must be between 0 and 1")
+        # 数值字段在构造时统一转为float，下游无需再次转换（冻结实例需经object.__setattr__赋值）
+        setattr_ = object.__setattr__
+        setattr_(self, 'price', _to_float(self.price, "Invalid price"))
+        setattr_(self, 'stop_loss', _to_float(self.stop_loss, "Invalid stop_loss"))
+        setattr_(self, 'take_profit', _to_float(self.take_profit, "Invalid take_profit"))
+        setattr_(self, 'size', _to_float(self.size, "Invalid size"))
+        setattr_(self, 'confidence', _to_float(self.confidence, "Confidence must be between 0 and 1"))
+        # python -O 运行时跳过校验
+        if __debug__:
+            if self.direction not in ('buy', 'sell'):
+                raise ValueError("Direction must be 'buy' or 'sell'")
+            if self.price <= 0:
+                raise ValueError("Invalid price")
+            if self.size <= 0:
+                raise ValueError("Invalid size")
+            if not 0 <= self.confidence <= 1:
+                raise ValueError("Confidence must be between 0 and 1")
+
+class SignalHistory:
+    """定长信号历史环形缓冲区
+
+    每个信号只保存数值字段的紧凑记录，需要时再还原为TradeSignal（不含metadata，时间为UTC）。
+    """
+
+    dtype = np.dtype([
+        ('timestamp', 'f8'),
+        ('direction', 'u1'),
+        ('price', 'f8'),
+        ('stop_loss', 'f8'),
+        ('take_profit', 'f8'),
+        ('size', 'f8'),
+        ('confidence', 'f8'),
+    ])
+    directions = ('buy', 'sell')
+
+    def __init__(self, symbol: str, agent_name: str, capacity: int = 1000):
+        self.symbol = symbol
+        self.agent_name = agent_name
+        self.capacity = capacity
+        self.records = np.recarray(capacity, dtype=self.dtype)
+        self.head = -1
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, signal: TradeSignal) -> None:
+        self.head = (self.head + 1) % self.capacity
+        self.records[self.head] = (
+            _epoch_seconds(signal.timestamp),
+            0 if signal.direction == 'buy' else 1,
+            signal.price,
+            signal.stop_loss,
+            signal.take_profit,
+            signal.size,
+            signal.confidence,
+        )
+        if self.size < self.capacity:
+            self.size += 1
+
+    def latest(self, n: Optional[int] = None) -> np.recarray:
+        """按时间顺序返回最近n条记录（默认全部）"""
+        n = self.size if n is None else min(n, self.size)
+        return np.take(self.records, range(self.head - n + 1, self.head + 1), mode='wrap').view(np.recarray)
+
+    def to_signals(self, n: Optional[int] = None) -> List[TradeSignal]:
+        """将最近n条记录还原为TradeSignal"""
+        return [
+            TradeSignal(
+                symbol=self.symbol,
+                direction=self.directions[direction],
+                price=price,
+                stop_loss=stop_loss,
+                take_profit=take_profit,
+                size=size,
+                confidence=confidence,
+                agent_name=self.agent_name,
+                timestamp=None if math.isnan(ts) else pd.Timestamp(ts, unit='s')
+            )
+            for ts, direction, price, stop_loss, take_profit, size, confidence in self.latest(n).tolist()
+        ]
+
+def _epoch_seconds(timestamp: Any) -> float:
+    """时间戳转为Unix秒，无法解析时为NaN"""
+    if timestamp is None:
+        return float('nan')
+    try:
+        return pd.Timestamp(timestamp).timestamp()
+    except (TypeError, ValueError):
+        return float('nan')
+
+# 数据库中时间字段的文本格式
+_TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+def _format_ts(timestamp: datetime) -> str:
+    """格式化为数据库时间文本；无时区时isoformat与strftime结果相同但更快"""
+    if timestamp.tzinfo is None:
+        return timestamp.isoformat(' ', 'seconds')
+    return timestamp.strftime(_TS_FORMAT)
+
+_now_cache = [-1, '']
+
+def _now_str() -> str:
+    """当前本地时间的数据库时间文本，同一秒内复用已格式化的字符串"""
+    second = int(time.time())
+    if second != _now_cache[0]:
+        _now_cache[1] = time.strftime(_TS_FORMAT, time.localtime(second))
+        _now_cache[0] = second
+    return _now_cache[1]
 
 class BaseAgent(ABC):
     """Agent基类"""
 
+    # 指标状态所需的列与重建状态时回放的尾部K线数
+    required_columns: List[str] = ['close']
+    warmup_bars: int = 51
+    # 是否实现了analyze_from_cache（可直接基于共享IndicatorCache决策）
+    supports_cache: bool = False
+
     def __init__(self, config: AgentConfig):
         self.config = config
+        # 单笔风险金额与信心阈值，构造时计算一次
+        self._risk_amount = float(config.risk_limit) * 100000
+        self._thr_cached = float(config.confidence_threshold)
         self.positions: List[Dict[str, Any]] = []
-        self.signals: deque[TradeSignal] = deque(maxlen=1000)
-        self.performance_metrics: Dict[str, Union[int, float]] = {
-            'total_signals': 0,
-            'successful_signals': 0,
-            'failed_signals': 0,
-            'total_pnl': 0.0,
-            'win_rate': 0.0,
-            'avg_return': 0.0
+        self.signals = SignalHistory(config.symbol, config.name)
+        # 累计绩效计数，胜率与平均收益在读取时计算
+        self._n_total = 0
+        self._n_succ = 0
+        self._pnl_sum = 0.0
+        # 逐笔信号结果按列保存（收益率与是否成功），供向量化统计
+        self._pnl_arr = np.empty(1024, dtype=np.float64)
+        self._success_arr = np.empty(1024, dtype=np.bool_)
+        self._outcomes = 0
+        self.indicators = IndicatorCache()
+        # 由AgentSystem注册，用于维护系统级累计指标
+        self._on_update: Optional[Callable[[str, bool, float], None]] = None
+
+    def latest_signals(self, n: Optional[int] = None) -> List[TradeSignal]:
+        """最近生成的n条信号（默认全部保留的信号）"""
+        return self.signals.to_signals(n)
+
+    @property
+    def total_signals(self) -> int:
+        return self._n_total
+
+    @property
+    def successful_signals(self) -> int:
+        return self._n_succ
+
+    @property
+    def failed_signals(self) -> int:
+        return self._n_total - self._n_succ
+
+    @property
+    def total_pnl(self) -> float:
+        return self._pnl_sum
+
+    @property
+    def win_rate(self) -> float:
+        return self._n_succ / self._n_total if self._n_total else 0.0
+
+    @property
+    def avg_return(self) -> float:
+        return self._pnl_sum / self._n_total if self._n_total else 0.0
+
+    @property
+    def performance_metrics(self) -> Dict[str, Union[int, float]]:
+        """绩效指标快照"""
+        return {
+            'total_signals': self.total_signals,
+            'successful_signals': self.successful_signals,
+            'failed_signals': self.failed_signals,
+            'total_pnl': self.total_pnl,
+            'win_rate': self.win_rate,
+            'avg_return': self.avg_return
         }
 
+    @property
+    def returns(self) -> np.ndarray:
+        """已记录信号的收益率序列"""
+        return self._pnl_arr[:self._outcomes]
+
+    @property
+    def successes(self) -> np.ndarray:
+        """已记录信号是否成功"""
+        return self._success_arr[:self._outcomes]
+
+    def update(self, bar: Dict[str, float], timestamp: Any = None) -> Dict[str, float]:
+        """推入一根新K线，O(1)更新指标状态并返回最新指标值"""
+        return self.indicators.update(bar, timestamp)
+
+    def _sync_indicators(self, data: pd.DataFrame) -> None:
+        """使本Agent的指标状态与data末尾对齐"""
+        self.indicators.sync(data, self.required_columns, self.warmup_bars)
+
     @abstractmethod
-    def analyze(self, data: pd.DataFrame) -> Optional[TradeSignal]:
-        """分析市场数据并生成交易信号"""
+    def analyze(self, data: pd.DataFrame, indicators: Optional[IndicatorCache] = None) -> Optional[TradeSignal]:
+        """分析市场数据并生成交易信号
+
+        传入indicators（已与data对齐的共享指标）时跳过自身的指标计算。
+        """
         pass
 
+    def analyze_from_cache(self, cache: IndicatorCache) -> Optional[TradeSignal]:
+        """基于已更新的共享指标生成交易信号（supports_cache为True的Agent实现）"""
+        raise NotImplementedError(f"{type(self).__name__} does not support cached indicators")
+
     def update_performance(self, signal: TradeSignal, success: bool, return_pct: float) -> None:
         """更新性能指标"""
         if not isinstance(signal, TradeSignal):
@@ -122,96 +726,97 @@ class BaseAgent(ABC):
         if not isinstance(return_pct, (int, float)):
             raise TypeError("return_pct must be a number")
 
-        self.performance_metrics['total_signals'] += 1
-        if success:
-            self.performance_metrics['successful_signals'] += 1
-        else:
-            self.performance_metrics['failed_signals'] += 1
+        i = self._outcomes
+        if i == self._pnl_arr.shape[0]:
+            self._pnl_arr = np.resize(self._pnl_arr, i * 2)
+            self._success_arr = np.resize(self._success_arr, i * 2)
+        self._pnl_arr[i] = return_pct
+        self._success_arr[i] = success
+        self._outcomes = i + 1
 
-        self.performance_metrics['total_pnl'] += float(return_pct)
+        self._n_total += 1
+        self._n_succ += success
+        self._pnl_sum += return_pct
 
-        total_signals = self.performance_metrics['total_signals']
-        if total_signals > 0:
-            self.performance_metrics['win_rate'] = (
-                self.performance_metrics['successful_signals'] / total_signals
-            )
-            self.performance_metrics['avg_return'] = (
-                self.performance_metrics['total_pnl'] / total_signals
-            )
+        if self._on_update is not None:
+            self._on_update(self.config.name, success, float(return_pct))
 
     def _calculate_position_size(self, price: float, stop_loss: float) -> float:
-        """计算仓位大小"""
-        if not isinstance(price, (int, float)) or price <= 0:
-            raise ValueError("price must be a positive number")
-        if not isinstance(stop_loss, (int, float)):
-            raise ValueError("stop_loss must be a number")
-
-        risk_amount = float(self.config.risk_limit * 100000)
-        price_risk = abs(float(price) - float(stop_loss))
+        """计算仓位大小（价格合法性由TradeSignal在创建时校验）"""
+        price_risk = abs(price - stop_loss)
         if price_risk == 0:
             raise ValueError("price_risk cannot be zero")
-        return risk_amount / price_risk
+        return self._risk_amount / price_risk
 
-    def _calculate_stop_loss(self, data: pd.DataFrame, direction: str) -> float:
-        """计算止损价格"""
-        if not isinstance(data, pd.DataFrame):
-            raise TypeError("data must be a pandas DataFrame")
+    def _calculate_stop_loss(self, high: np.ndarray, low: np.ndarray, direction: str) -> float:
+        """计算止损价格（high/low为按时间排列的价格数组）"""
         if direction not in ('buy', 'sell'):
             raise ValueError("direction must be 'buy' or 'sell'")
 
         if direction == 'buy':
-            return float(data['low'].iloc[-10:].min())
+            return float(np.nanmin(low[-10:]))
         else:
-            return float(data['high'].iloc[-10:].max())
+            return float(np.nanmax(high[-10:]))
 
     def _calculate_take_profit(self, entry_price: float, stop_loss: float) -> float:
         """计算止盈价格"""
-        if not isinstance(entry_price, (int, float)) or entry_price <= 0:
-            raise ValueError("entry_price must be a positive number")
-        if not isinstance(stop_loss, (int, float)):
-            raise ValueError("stop_loss must be a number")
-
-        risk = abs(float(entry_price) - float(stop_loss))
-        return entry_price + (risk * 2)
+        return entry_price + abs(entry_price - stop_loss) * 2
 
 class TrendFollowingAgent(BaseAgent):
     """趋势跟踪Agent"""
 
-    def analyze(self, data: pd.DataFrame) -> Optional[TradeSignal]:
-        if not isinstance(data, pd.DataFrame):
-            raise TypeError("data must be a pandas DataFrame")
+    supports_cache = True
+    required_columns = ['close', 'high', 'low']
+
+    def analyze(self, data: pd.DataFrame, indicators: Optional[IndicatorCache] = None) -> Optional[TradeSignal]:
+        if not isinstance(data, FRAME_TYPES):
+            raise TypeError(_FRAME_TYPE_ERROR)
         if len(data) < 50:
             return None
 
-        required_columns = ['close', 'high', 'low']
+        required_columns = self.required_columns
         if not all(col in data.columns for col in required_columns):
             raise ValueError(f"DataFrame must contain columns: {required_columns}")
 
+        if indicators is not None:
+            return self.analyze_from_cache(indicators)
         try:
-            data['sma20'] = calculate_sma(data['close'], 20)
-            data['sma50'] = calculate_sma(data['close'], 50)
-            data['rsi'] = calculate_rsi(data['close'], 14)
-            data['atr'] = calculate_atr(data['high'], data['low'], data['close'], 14)
-
-            current_price = float(data['close'].iloc[-1])
-            sma20 = float(data['sma20'].iloc[-1])
-            sma50 = float(data['sma50'].iloc[-1])
-            rsi = float(data['rsi'].iloc[-1])
-            atr = float(data['atr'].iloc[-1])
-
-            if pd.isna(current_price) or pd.isna(sma20) or pd.isna(sma50) or pd.isna(rsi) or pd.isna(atr):
-                logger.warning(f"NaN values detected in technical indicators for {self.config.symbol}")
+            self._sync_indicators(data)
+        except Exception as e:
+            logger.error("Error in TrendFollowingAgent analysis: %s", e)
+            return None
+        return self.analyze_from_cache(self.indicators)
+
+    def analyze_from_cache(self, cache: IndicatorCache) -> Optional[TradeSignal]:
+        if cache.count < 50:
+            return None
+
+        try:
+            current_price = cache.ohlcv.last('close')
+            sma20 = cache.sma20.value
+            sma50 = cache.sma50.value
+            rsi = cache.rsi.value
+            atr = cache.atr.value
+
+            # 任一项为NaN时和也为NaN（NaN != NaN）
+            total = current_price + sma20 + sma50 + rsi + atr
+            if total != total:
+                logger.warning("NaN values detected in technical indicators for %s", self.config.symbol)
                 return None
 
             signal = None
             if sma20 > sma50 and rsi > 50:
                 stop_loss = current_price - (atr * 2)
                 take_profit = current_price + (atr * 4)
-                confidence = min(1.0, (sma20 - sma50) / sma50 * 5)
+                confidence = (sma20 - sma50) / sma50 * 5
+                confidence = confidence if confidence < 1.0 else 1.0
 
-                if confidence >= self.config.confidence_threshold:
+                if confidence >= self._thr_cached:
                     try:
-                        position_size = self._calculate_position_size(current_price, stop_loss)
+                        price_risk = abs(current_price - stop_loss)
+                        if price_risk == 0.0:
+                            return None
+                        position_size = self._risk_amount / price_risk
                         signal = TradeSignal(
                             symbol=self.config.symbol,
                             direction='buy',
@@ -221,7 +826,7 @@ class TrendFollowingAgent(BaseAgent):
                             size=position_size,
                             confidence=confidence,
                             agent_name=self.config.name,
-                            timestamp=data.index[-1],
+                            timestamp=cache.timestamp,
                             metadata={
                                 'strategy': 'trend_following',
                                 'sma20': float(sma20),
@@ -231,17 +836,21 @@ class TrendFollowingAgent(BaseAgent):
                             }
                         )
                     except (ValueError, TypeError) as e:
-                        logger.error(f"Error creating buy signal: {e}")
+                        logger.error("Error creating buy signal: %s", e)
                         return None
 
             elif sma20 < sma50 and rsi < 50:
                 stop_loss = current_price + (atr * 2)
                 take_profit = current_price - (atr * 4)
-                confidence = min(1.0, (sma50 - sma20) / sma50 * 5)
+                confidence = (sma50 - sma20) / sma50 * 5
+                confidence = confidence if confidence < 1.0 else 1.0
 
-                if confidence >= self.config.confidence_threshold:
+                if confidence >= self._thr_cached:
                     try:
-                        position_size = self._calculate_position_size(current_price, stop_loss)
+                        price_risk = abs(current_price - stop_loss)
+                        if price_risk == 0.0:
+                            return None
+                        position_size = self._risk_amount / price_risk
                         signal = TradeSignal(
                             symbol=self.config.symbol,
                             direction='sell',
@@ -251,7 +860,7 @@ class TrendFollowingAgent(BaseAgent):
                             size=position_size,
                             confidence=confidence,
                             agent_name=self.config.name,
-                            timestamp=data.index[-1],
+                            timestamp=cache.timestamp,
                             metadata={
                                 'strategy': 'trend_following',
                                 'sma20': float(sma20),
@@ -261,7 +870,7 @@ class TrendFollowingAgent(BaseAgent):
                             }
                         )
                     except (ValueError, TypeError) as e:
-                        logger.error(f"Error creating sell signal: {e}")
+                        logger.error("Error creating sell signal: %s", e)
                         return None
 
             if signal:
@@ -270,48 +879,64 @@ class TrendFollowingAgent(BaseAgent):
             return signal
 
         except Exception as e:
-            logger.error(f"Error in TrendFollowingAgent analysis: {e}")
+            logger.error("Error in TrendFollowingAgent analysis: %s", e)
             return None
 
 class MeanReversionAgent(BaseAgent):
     """均值回归Agent"""
 
-    def analyze(self, data: pd.DataFrame) -> Optional[TradeSignal]:
-        if not isinstance(data, pd.DataFrame):
-            raise TypeError("data must be a pandas DataFrame")
+    supports_cache = True
+    required_columns = ['close']
+
+    def analyze(self, data: pd.DataFrame, indicators: Optional[IndicatorCache] = None) -> Optional[TradeSignal]:
+        if not isinstance(data, FRAME_TYPES):
+            raise TypeError(_FRAME_TYPE_ERROR)
         if len(data) < 50:
             return None
 
-        required_columns = ['close']
+        required_columns = self.required_columns
         if not all(col in data.columns for col in required_columns):
             raise ValueError(f"DataFrame must contain columns: {required_columns}")
 
+        if indicators is not None:
+            return self.analyze_from_cache(indicators)
         try:
-            data['sma20'] = calculate_sma(data['close'], 20)
-            data['boll_upper'], data['boll_middle'], data['boll_lower'] = calculate_bbands(
-                data['close'], period=20, num_std=2
-            )
-            data['rsi'] = calculate_rsi(data['close'], 14)
+            self._sync_indicators(data)
+        except Exception as e:
+            logger.error("Error in MeanReversionAgent analysis: %s", e)
+            return None
+        return self.analyze_from_cache(self.indicators)
 
-            current_price = float(data['close'].iloc[-1])
-            sma20 = float(data['sma20'].iloc[-1])
-            boll_upper = float(data['boll_upper'].iloc[-1])
-            boll_lower = float(data['boll_lower'].iloc[-1])
-            rsi = float(data['rsi'].iloc[-1])
+    def analyze_from_cache(self, cache: IndicatorCache) -> Optional[TradeSignal]:
+        if cache.count < 50:
+            return None
 
-            if pd.isna(current_price) or pd.isna(sma20) or pd.isna(boll_upper) or pd.isna(boll_lower) or pd.isna(rsi):
-                logger.warning(f"NaN values detected in technical indicators for {self.config.symbol}")
+        try:
+            current_price = cache.ohlcv.last('close')
+            sma20 = cache.sma20.value
+            boll_upper = sma20 + cache.std20.value * 2
+            boll_lower = sma20 - cache.std20.value * 2
+            rsi = cache.rsi.value
+
+            # 任一项为NaN时和也为NaN（NaN != NaN）
+            total = current_price + sma20 + boll_upper + boll_lower + rsi
+            if total != total:
+                logger.warning("NaN values detected in technical indicators for %s", self.config.symbol)
                 return None
 
             signal = None
             if current_price < boll_lower and rsi < 30:  # 超卖，买入信号
                 stop_loss = current_price * 0.99  # 1%止损
                 take_profit = sma20  # 均线作为目标
-                confidence = min(1.0, (boll_lower - current_price) / current_price * 10)
+                confidence = (boll_lower - current_price) / current_price * 10
+                confidence = confidence if confidence < 1.0 else 1.0
 
-                if confidence >= self.config.confidence_threshold:
+                if confidence >= self._thr_cached:
                     try:
-                        position_size = self._calculate_position_size(current_price, stop_loss)
+                        price_risk = abs(current_price - stop_loss)
+                        if price_risk == 0.0:
+                            return None
+                        position_size = self._risk_amount / price_risk
                         signal = TradeSignal(
                             symbol=self.config.symbol,
                             direction='buy',
@@ -321,7 +946,7 @@ class MeanReversionAgent(BaseAgent):
                             size=position_size,
                             confidence=confidence,
                             agent_name=self.config.name,
-                            timestamp=data.index[-1],
+                            timestamp=cache.timestamp,
                             metadata={
                                 'strategy': 'mean_reversion',
                                 'sma20': float(sma20),
@@ -331,17 +956,21 @@ class MeanReversionAgent(BaseAgent):
                             }
                         )
                     except (ValueError, TypeError) as e:
-                        logger.error(f"Error creating buy signal: {e}")
+                        logger.error("Error creating buy signal: %s", e)
                         return None
 
             elif current_price > boll_upper and rsi > 70:  # 超买，卖出信号
                 stop_loss = current_price * 1.01  # 1%止损
                 take_profit = sma20  # 均线作为目标
-                confidence = min(1.0, (current_price - boll_upper) / current_price * 10)
+                confidence = (current_price - boll_upper) / current_price * 10
+                confidence = confidence if confidence < 1.0 else 1.0
 
-                if confidence >= self.config.confidence_threshold:
+                if confidence >= self._thr_cached:
                     try:
-                        position_size = self._calculate_position_size(current_price, stop_loss)
+                        price_risk = abs(current_price - stop_loss)
+                        if price_risk == 0.0:
+                            return None
+                        position_size = self._risk_amount / price_risk
                         signal = TradeSignal(
                             symbol=self.config.symbol,
                             direction='sell',
@@ -351,7 +980,7 @@ class MeanReversionAgent(BaseAgent):
                             size=position_size,
                             confidence=confidence,
                             agent_name=self.config.name,
-                            timestamp=data.index[-1],
+                            timestamp=cache.timestamp,
                             metadata={
                                 'strategy': 'mean_reversion',
                                 'sma20': float(sma20),
@@ -361,7 +990,7 @@ class MeanReversionAgent(BaseAgent):
                             }
                         )
                     except (ValueError, TypeError) as e:
-                        logger.error(f"Error creating sell signal: {e}")
+                        logger.error("Error creating sell signal: %s", e)
                         return None
 
             if signal:
@@ -370,42 +999,54 @@ class MeanReversionAgent(BaseAgent):
             return signal
 
         except Exception as e:
-            logger.error(f"Error in MeanReversionAgent analysis: {e}")
+            logger.error("Error in MeanReversionAgent analysis: %s", e)
             return None
 
 class BreakoutAgent(BaseAgent):
     """突破交易Agent"""
 
-    def analyze(self, data: pd.DataFrame) -> Optional[TradeSignal]:
-        if not isinstance(data, pd.DataFrame):
-            raise TypeError("data must be a pandas DataFrame")
+    supports_cache = True
+    required_columns = ['close', 'high', 'low', 'volume']
+
+    def analyze(self, data: pd.DataFrame, indicators: Optional[IndicatorCache] = None) -> Optional[TradeSignal]:
+        if not isinstance(data, FRAME_TYPES):
+            raise TypeError(_FRAME_TYPE_ERROR)
         if len(data) < 50:
             return None
 
-        required_columns = ['close', 'high', 'low', 'volume']
+        required_columns = self.required_columns
         if not all(col in data.columns for col in required_columns):
             raise ValueError(f"DataFrame must contain columns: {required_columns}")
 
+        if indicators is not None:
+            return self.analyze_from_cache(indicators)
+        try:
+            self._sync_indicators(data)
+        except Exception as e:
+            logger.error("Error in BreakoutAgent analysis: %s", e)
+            return None
+        return self.analyze_from_cache(self.indicators)
+
+    def analyze_from_cache(self, cache: IndicatorCache) -> Optional[TradeSignal]:
+        if cache.count < 50:
+            return None
+
         try:
-            data['atr'] = calculate_atr(data['high'], data['low'], data['close'], 14)
-            data['highest'] = data['high'].rolling(20).max()
-            data['lowest'] = data['low'].rolling(20).min()
-            data['volume_sma'] = calculate_sma(data['volume'], 20)
-
-            current_price = float(data['close'].iloc[-1])
-            current_volume = float(data['volume'].iloc[-1])
-            atr = float(data['atr'].iloc[-1])
-            highest = float(data['highest'].iloc[-2])  # 使用前一个周期的高点
-            lowest = float(data['lowest'].iloc[-2])  # 使用前一个周期的低点
-            volume_sma = float(data['volume_sma'].iloc[-1])
-
-            # Validate data integrity
-            if any(pd.isna(x) for x in [current_price, current_volume, atr, highest, lowest, volume_sma]):
-                logger.warning(f"NaN values detected in technical indicators for {self.config.symbol}")
+            current_price = cache.ohlcv.last('close')
+            current_volume = cache.ohlcv.last('volume')
+            atr = cache.atr.value
+            highest = cache.prev_highest  # 使用前一个周期的高点
+            lowest = cache.prev_lowest  # 使用前一个周期的低点
+            volume_sma = cache.volume_sma.value
+
+            # Validate data integrity (the sum is NaN iff any term is NaN)
+            total = current_price + current_volume + atr + highest + lowest + volume_sma
+            if total != total:
+                logger.warning("NaN values detected in technical indicators for %s", self.config.symbol)
                 return None
 
             if current_price <= 0 or current_volume <= 0 or atr <= 0:
-                logger.error(f"Invalid negative or zero values detected for {self.config.symbol}")
+                logger.error("Invalid negative or zero values detected for %s", self.config.symbol)
                 return None
 
             signal = None
@@ -414,10 +1055,14 @@ class BreakoutAgent(BaseAgent):
                 try:
                     stop_loss = current_price - (atr * 2)
                     take_profit = current_price + (atr * 4)
-                    confidence = min(1.0, (current_price - highest) / highest * 10)
-
-                    if confidence >= self.config.confidence_threshold:
-                        position_size = self._calculate_position_size(current_price, stop_loss)
+                    confidence = (current_price - highest) / highest * 10
+                    confidence = confidence if confidence < 1.0 else 1.0
+
+                    if confidence >= self._thr_cached:
+                        price_risk = abs(current_price - stop_loss)
+                        if price_risk == 0.0:
+                            return None
+                        position_size = self._risk_amount / price_risk
                         signal = TradeSignal(
                             symbol=self.config.symbol,
                             direction='buy',
@@ -427,7 +1072,7 @@ class BreakoutAgent(BaseAgent):
                             size=position_size,
                             confidence=confidence,
                             agent_name=self.config.name,
-                            timestamp=data.index[-1],
+                            timestamp=cache.timestamp,
                             metadata={
                                 'strategy': 'breakout',
                                 'atr': float(atr),
@@ -436,7 +1081,7 @@ class BreakoutAgent(BaseAgent):
                             }
                         )
                 except (ValueError, TypeError) as e:
-                    logger.error(f"Error creating buy signal: {e}")
+                    logger.error("Error creating buy signal: %s", e)
                     return None
 
             elif (current_price < lowest and
@@ -444,10 +1089,14 @@ class BreakoutAgent(BaseAgent):
                 try:
                     stop_loss = float(current_price + (atr * 2))
                     take_profit = float(current_price - (atr * 4))
-                    confidence = float(min(1.0, (lowest - current_price) / lowest * 10))
-
-                    if confidence >= self.config.confidence_threshold:
-                        position_size = self._calculate_position_size(current_price, stop_loss)
+                    confidence = (lowest - current_price) / lowest * 10
+                    confidence = confidence if confidence < 1.0 else 1.0
+
+                    if confidence >= self._thr_cached:
+                        price_risk = abs(current_price - stop_loss)
+                        if price_risk == 0.0:
+                            return None
+                        position_size = self._risk_amount / price_risk
                         signal = TradeSignal(
                             symbol=self.config.symbol,
                             direction='sell',
@@ -457,7 +1106,7 @@ class BreakoutAgent(BaseAgent):
                             size=float(position_size),
                             confidence=confidence,
                             agent_name=self.config.name,
-                            timestamp=data.index[-1],
+                            timestamp=cache.timestamp,
                             metadata={
                                 'strategy': 'breakout',
                                 'atr': float(atr),
@@ -466,52 +1115,119 @@ class BreakoutAgent(BaseAgent):
                             }
                         )
                 except (ValueError, TypeError) as e:
-                    logger.error(f"Error creating sell signal: {e}")
+                    logger.error("Error creating sell signal: %s", e)
                     return None
                 except Exception as e:
-                    logger.error(f"Unexpected error creating sell signal: {e}", exc_info=True)
+                    logger.error("Unexpected error creating sell signal: %s", e, exc_info=True)
                     return None
 
             if signal:
                 try:
                     if not isinstance(signal, TradeSignal):
-                        logger.error(f"Invalid signal type: {type(signal)}")
+                        logger.error("Invalid signal type: %s", type(signal))
                         return None
                     self.signals.append(signal)
-                    logger.info(f"Generated {signal.direction} signal for {signal.symbol} with confidence {signal.confidence:.2f}")
+                    logger.info("Generated %s signal for %s with confidence %.2f", signal.direction, signal.symbol, signal.confidence)
                 except Exception as e:
-                    logger.error(f"Error appending signal: {e}", exc_info=True)
+                    logger.error("Error appending signal: %s", e, exc_info=True)
                     return None
 
             return signal
 
         except Exception as e:
-            logger.error(f"Error in BreakoutAgent analysis: {e}", exc_info=True)
+            logger.error("Error in BreakoutAgent analysis: %s", e, exc_info=True)
             return None
 
+# 策略类型到Agent类的映射
+AGENT_TYPES: Dict[str, type[BaseAgent]] = {
+    'trend_following': TrendFollowingAgent,
+    'mean_reversion': MeanReversionAgent,
+    'breakout': BreakoutAgent
+}
+
+# 信号元数据为空时的JSON（默认值，最常见的情况）
+_EMPTY_META_JSON = "{}"
+
 class AgentSystem:
     """Agent系统"""
 
-    def __init__(self):
+    # 信号/性能记录缓冲达到该条数，或距上次写库超过flush_interval秒时批量写库
+    flush_size = 128
+    flush_interval = 1.0
+    # 写库持续失败时缓冲的最大条数，超过后拒绝新记录
+    max_buffered = 100_000
+
+    _INSERT_SIGNAL_SQL = """
+        INSERT INTO signals (
+            timestamp, symbol, direction, price,
+            stop_loss, take_profit, size,
+            confidence, agent_name, margin_type,
+            leverage, funding_rate, liquidation_price,
+            maintenance_margin, metadata
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    _INSERT_PERFORMANCE_SQL = """
+        INSERT INTO performance (
+            timestamp, agent_name, total_signals,
+            successful_signals, failed_signals,
+            total_pnl, win_rate, avg_return
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    # 时间边界为NULL时不过滤；语句文本固定，可复用sqlite3语句缓存中已编译的语句
+    _SELECT_PERFORMANCE_SQL = """
+        SELECT * FROM performance
+        WHERE agent_name = ?
+        AND (? IS NULL OR timestamp >= ?)
+        AND (? IS NULL OR timestamp <= ?)
+        ORDER BY timestamp
+    """
+    _SELECT_SIGNALS_SQL = """
+        SELECT * FROM signals
+        WHERE agent_name = ?
+        AND (? IS NULL OR timestamp >= ?)
+        AND (? IS NULL OR timestamp <= ?)
+        ORDER BY timestamp
+    """
+
+    def __init__(self, db_path: Union[str, Path] = _DB_PATH):
         self.agents: Dict[str, BaseAgent] = {}
         self.agent_performance: Dict[str, Dict] = {}
-        self.db_path = Path("agent_system.db").absolute()
+        self._indicator_cache: Dict[tuple, IndicatorCache] = {}
+        self._signal_buf: List[tuple] = []
+        self._performance_buf: List[tuple] = []
+        self._buf_lock = threading.Lock()
+        # 缓冲非空且未达到flush_size时，由定时器在flush_interval秒后写库
+        self._flush_timer: Optional[threading.Timer] = None
+        # 系统级累计指标，随Agent的update_performance增量更新
+        self._sys: Dict[str, Any] = {
+            'total_signals': 0,
+            'successful_signals': 0,
+            'total_pnl': 0.0,
+            'active_agents': set()
+        }
+        self._sys_lock = threading.Lock()
+        # 所有线程共用一个连接，事务与查询需串行执行
+        self._db_lock = threading.RLock()
+        self.db_path = Path(db_path)
         self._initialize_database()
-
-        # Configure logging
-        logging.basicConfig(
-            level=logging.INFO,
-            format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler("logs/agent_system.log"),
-                logging.StreamHandler()
-            ]
+        # 未调用close()时，进程退出或对象被回收时写入剩余缓冲并关闭连接
+        self._finalizer = weakref.finalize(
+            self, AgentSystem._finalize, self.conn, self._db_lock,
+            self._buf_lock, self._signal_buf, self._performance_buf
         )
 
     def _initialize_database(self):
         """初始化数据库"""
-        Path("logs").mkdir(exist_ok=True)
-        with sqlite3.connect(str(self.db_path)) as conn:
+        # 长连接 + WAL：避免每次读写都重新建立连接
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        # 读路径通过内存映射访问数据库页，减少read()系统调用
+        self.conn.execute("PRAGMA mmap_size=268435456")
+        # 64MB页缓存（负值单位为KiB）
+        self.conn.execute("PRAGMA cache_size=-65536")
+        with self._db_lock, self.conn as conn:
             # Agent配置表
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS agent_config (
@@ -570,7 +1286,183 @@ class AgentSystem:
                 )
             """)
 
-            conn.commit()
+            # 按Agent与时间查询的复合索引
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_signals_agent_ts
+                ON signals(agent_name, timestamp)
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_perf_agent_ts
+                ON performance(agent_name, timestamp)
+            """)
+            # get_system_metrics按时间窗口扫描全部Agent的信号
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_signals_ts
+                ON signals(timestamp)
+            """)
+
+            self._initialize_daily_rollup(conn)
+
+    def _initialize_daily_rollup(self, conn: sqlite3.Connection) -> None:
+        """按日/Agent汇总信号统计，插入信号时由触发器增量维护
+
+        get_system_metrics的30天聚合据此只需读取约30行汇总，而不是扫描全部信号。
+        """
+        rollup_exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'signals_daily_agg'"
+        ).fetchone() is not None
+
+        # 每条信号对汇总的贡献，元数据每行只校验一次
+        conn.execute("""
+            CREATE VIEW IF NOT EXISTS signal_contrib AS
+            SELECT
+                id,
+                timestamp,
+                agent_name,
+                substr(timestamp, 1, 10) as day,
+                meta IS NULL as invalid,
+                CASE WHEN meta IS NOT NULL
+                    AND CAST(json_extract(meta, '$.pnl') AS FLOAT) > 0
+                    THEN 1 ELSE 0 END as win,
+                CAST(json_extract(meta, '$.pnl') AS FLOAT) as pnl
+            FROM (
+                SELECT id, timestamp, agent_name,
+                    CASE WHEN json_valid(metadata) THEN metadata END as meta
+                FROM signals
+            )
+        """)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS signals_daily_agg (
+                day TEXT,
+                agent_name TEXT,
+                n INTEGER DEFAULT 0,
+                n_invalid INTEGER DEFAULT 0,
+                n_win INTEGER DEFAULT 0,
+                n_pnl INTEGER DEFAULT 0,
+                sum_pnl REAL DEFAULT 0.0,
+                PRIMARY KEY (day, agent_name)
+            )
+        """)
+        conn.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_signals_daily_agg
+            AFTER INSERT ON signals
+            BEGIN
+                INSERT INTO signals_daily_agg (day, agent_name, n, n_invalid, n_win, n_pnl, sum_pnl)
+                SELECT day, agent_name, 1, invalid, win, pnl IS NOT NULL, COALESCE(pnl, 0.0)
+                FROM signal_contrib
+                WHERE id = NEW.id
+                ON CONFLICT(day, agent_name) DO UPDATE SET
+                    n = n + 1,
+                    n_invalid = n_invalid + excluded.n_invalid,
+                    n_win = n_win + excluded.n_win,
+                    n_pnl = n_pnl + excluded.n_pnl,
+                    sum_pnl = sum_pnl + excluded.sum_pnl;
+            END
+        """)
+
+        if not rollup_exists:
+            # 已有数据库首次建表时，从历史信号回填
+            conn.execute("""
+                INSERT INTO signals_daily_agg (day, agent_name, n, n_invalid, n_win, n_pnl, sum_pnl)
+                SELECT day, agent_name, COUNT(*), SUM(invalid), SUM(win), COUNT(pnl), TOTAL(pnl)
+                FROM signal_contrib
+                GROUP BY day, agent_name
+            """)
+
+
+    def close(self) -> None:
+        """写入缓冲记录并关闭数据库连接"""
+        with self._buf_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        self.flush()
+        self._finalizer()
+
+    def flush(self) -> None:
+        """将缓冲的信号与性能记录在一个事务内批量写入数据库
+
+        写入失败时记录放回缓冲区头部，留待下次写库。
+        """
+        self._write_buffers(self.conn, self._db_lock, self._buf_lock,
+                            self._signal_buf, self._performance_buf)
+
+    @classmethod
+    def _write_buffers(cls, conn: sqlite3.Connection, db_lock: threading.RLock, buf_lock: threading.Lock,
+                       signal_buf: List[tuple], performance_buf: List[tuple]) -> None:
+        with buf_lock:
+            signals = signal_buf[:]
+            performance = performance_buf[:]
+            signal_buf.clear()
+            performance_buf.clear()
+        if not signals and not performance:
+            return
+
+        try:
+            with db_lock, conn:
+                conn.execute("BEGIN")
+                if signals:
+                    conn.executemany(cls._INSERT_SIGNAL_SQL, signals)
+                if performance:
+                    conn.executemany(cls._INSERT_PERFORMANCE_SQL, performance)
+        except sqlite3.Error as e:
+            with buf_lock:
+                signal_buf[:0] = signals
+                performance_buf[:0] = performance
+            logger.error(f"Error flushing {len(signals)} signals and {len(performance)} performance records: {e}")
+            raise
+
+    @classmethod
+    def _finalize(cls, conn: sqlite3.Connection, db_lock: threading.RLock, buf_lock: threading.Lock,
+                  signal_buf: List[tuple], performance_buf: List[tuple]) -> None:
+        """写入剩余缓冲并关闭连接（不引用AgentSystem实例，可由weakref.finalize调用）"""
+        try:
+            cls._write_buffers(conn, db_lock, buf_lock, signal_buf, performance_buf)
+        except sqlite3.Error:
+            pass  # _write_buffers已记录错误
+        finally:
+            with db_lock:
+                conn.close()
+
+    def _buffer(self, buf: List[tuple], row: tuple) -> None:
+        """缓冲一条记录，达到flush_size时顺带写库，否则确保flush_interval秒内由定时器写库
+
+        顺带写库失败不影响本条记录（已留在缓冲区）；只有缓冲区已满、本条无法入队时才抛出异常。
+        """
+        with self._buf_lock:
+            if len(buf) >= self.max_buffered:
+                raise sqlite3.OperationalError(
+                    f"Write buffer full ({len(buf)} records pending), database writes are failing"
+                )
+            buf.append(row)
+            due = len(buf) >= self.flush_size
+            if not due:
+                self._schedule_flush()
+        if due:
+            try:
+                self.flush()
+            except sqlite3.Error:
+                # flush已记录错误并把记录放回缓冲区，下次写库时重试
+                with self._buf_lock:
+                    self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """启动定时写库（调用方需持有_buf_lock）"""
+        if self._flush_timer is None and self._finalizer.alive:
+            self._flush_timer = threading.Timer(self.flush_interval, self._timed_flush)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def _timed_flush(self) -> None:
+        with self._buf_lock:
+            self._flush_timer = None
+        if not self._finalizer.alive:
+            return
+        try:
+            self.flush()
+        except sqlite3.Error:
+            with self._buf_lock:
+                self._schedule_flush()
 
     def add_agent(self, config: AgentConfig) -> bool:
         """Add a new trading agent to the system"""
@@ -582,19 +1474,14 @@ class AgentSystem:
             logger.warning(f"Agent {config.name} already exists, updating configuration")
 
         try:
-            agent_types = {
-                'trend_following': TrendFollowingAgent,
-                'mean_reversion': MeanReversionAgent,
-                'breakout': BreakoutAgent
-            }
-
-            if config.strategy_type not in agent_types:
+            if config.strategy_type not in AGENT_TYPES:
                 logger.error(f"Unknown strategy type: {config.strategy_type}")
                 return False
 
-            agent = agent_types[config.strategy_type](config)
+            agent = AGENT_TYPES[config.strategy_type](config)
+            agent._on_update = self._on_agent_update
 
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db_lock, self.conn as conn:
                 try:
                     conn.execute("""
                         INSERT OR REPLACE INTO agent_config (
@@ -613,7 +1500,6 @@ class AgentSystem:
                         config.funding_rate_threshold,
                         config.liquidation_threshold, config.maintenance_margin
                     ))
-                    conn.commit()
                 except sqlite3.Error as e:
                     logger.error(f"Database error while adding agent {config.name}: {e}")
                     return False
@@ -632,14 +1518,32 @@ class AgentSystem:
             del self.agents[agent_name]
 
             # 从数据库删除Agent配置
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db_lock, self.conn as conn:
                 conn.execute("""
                     DELETE FROM agent_config WHERE name = ?
                 """, (agent_name,))
-                conn.commit()
 
             logger.info(f"Removed agent: {agent_name}")
 
+    def _on_agent_update(self, agent_name: str, success: bool, return_pct: float) -> None:
+        """Agent性能更新回调：O(1)累加系统级指标"""
+        with self._sys_lock:
+            self._sys['total_signals'] += 1
+            self._sys['successful_signals'] += int(success)
+            self._sys['total_pnl'] += return_pct
+            self._sys['active_agents'].add(agent_name)
+
+    def get_live_metrics(self) -> Dict[str, Union[int, float]]:
+        """基于内存累计值的系统指标，无需遍历Agent或查询数据库"""
+        with self._sys_lock:
+            total = self._sys['total_signals']
+            return {
+                'total_signals': total,
+                'active_agents': len(self._sys['active_agents']),
+                'system_win_rate': self._sys['successful_signals'] / total if total else 0.0,
+                'system_avg_return': self._sys['total_pnl'] / total if total else 0.0
+            }
+
     def get_agent(self, agent_name: str) -> Optional[BaseAgent]:
         """获取Agent"""
         return self.agents.get(agent_name)
@@ -648,112 +1552,176 @@ class AgentSystem:
         """获取所有Agent名称"""
         return list(self.agents.keys())
 
+    def tick(self, symbol: str, bar: Dict[str, Any], timeframe: Optional[str] = None) -> List[TradeSignal]:
+        """推入一根新K线：每个(symbol, timeframe)只更新一次指标，再分发给相关Agent"""
+        key = (symbol, timeframe)
+        cache = self._indicator_cache.get(key)
+        if cache is None:
+            cache = self._indicator_cache[key] = IndicatorCache()
+        cache.update(bar, bar.get('timestamp', datetime.now()))
+
+        signals = []
+        for agent in self._agents_for(symbol, timeframe):
+            try:
+                if agent.supports_cache:
+                    signal = agent.analyze_from_cache(cache)
+                else:
+                    # 未实现共享指标决策的Agent以缓冲的K线窗口调用analyze
+                    signal = agent.analyze(cache.ohlcv.frame())
+            except Exception as e:
+                logger.error("Error dispatching tick to agent %s: %s", agent.config.name, e)
+                continue
+            if signal:
+                signals.append(signal)
+        return signals
+
+    def run_bar(self, symbol: str, frame: pd.DataFrame, timeframe: Optional[str] = None) -> List[TradeSignal]:
+        """对一个品种的K线窗口只同步一次共享指标，再交给所有相关Agent的analyze决策"""
+        agents = self._agents_for(symbol, timeframe)
+        if not agents:
+            return []
+
+        key = (symbol, timeframe)
+        cache = self._indicator_cache.get(key)
+        if cache is None:
+            cache = self._indicator_cache[key] = IndicatorCache()
+        columns = [col for col in OHLCVBuffer.fields if col in frame.columns]
+        try:
+            cache.sync(frame, columns, max(agent.warmup_bars for agent in agents))
+        except Exception as e:
+            logger.error("Error computing shared indicators for %s: %s", symbol, e)
+            return []
+
+        signals = []
+        for agent in agents:
+            try:
+                signal = agent.analyze(frame, indicators=cache)
+            except Exception as e:
+                logger.error("Error running bar for agent %s: %s", agent.config.name, e)
+                continue
+            if signal:
+                signals.append(signal)
+        return signals
+
+    def _agents_for(self, symbol: str, timeframe: Optional[str]) -> List[BaseAgent]:
+        """订阅该品种（及周期）的Agent"""
+        return [
+            agent for agent in self.agents.values()
+            if agent.config.symbol == symbol
+            and (timeframe is None or agent.config.timeframe == timeframe)
+        ]
+
     def save_signal(self, signal: TradeSignal):
         """保存交易信号"""
         try:
             if not isinstance(signal, TradeSignal):
                 raise ValueError("Invalid signal type")
 
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT INTO signals (
-                        timestamp, symbol, direction, price,
-                        stop_loss, take_profit, size,
-                        confidence, agent_name, margin_type,
-                        leverage, funding_rate, liquidation_price,
-                        maintenance_margin, metadata
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    signal.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                    signal.symbol,
-                    signal.direction,
-                    float(signal.price),
-                    float(signal.stop_loss),
-                    float(signal.take_profit),
-                    float(signal.size),
-                    float(signal.confidence),
-                    signal.agent_name,
-                    signal.metadata.get('margin_type', 'isolated'),
-                    int(signal.metadata.get('leverage', 1)),
-                    float(signal.metadata.get('funding_rate', 0.0)),
-                    float(signal.metadata.get('liquidation_price', 0.0)),
-                    float(signal.metadata.get('maintenance_margin', 0.05)),
-                    json.dumps(signal.metadata)
-                ))
-                conn.commit()
+            self._buffer(self._signal_buf, (
+                _format_ts(signal.timestamp),
+                signal.symbol,
+                signal.direction,
+                signal.price,
+                signal.stop_loss,
+                signal.take_profit,
+                signal.size,
+                signal.confidence,
+                signal.agent_name,
+                signal.metadata.get('margin_type', 'isolated'),
+                int(signal.metadata.get('leverage', 1)),
+                float(signal.metadata.get('funding_rate', 0.0)),
+                float(signal.metadata.get('liquidation_price', 0.0)),
+                float(signal.metadata.get('maintenance_margin', 0.05)),
+                _EMPTY_META_JSON if not signal.metadata else orjson.dumps(
+                    signal.metadata, default=str, option=orjson.OPT_SERIALIZE_NUMPY
+                ).decode()
+            ))
         except (sqlite3.Error, ValueError, TypeError, json.JSONDecodeError) as e:
             logger.error(f"Error saving signal: {e}")
             raise
 
-    def update_agent_performance(self, agent_name: str, metrics: Dict):
-        """更新Agent性能"""
-        required_fields = {
-            'total_signals': int,
-            'successful_signals': int,
-            'failed_signals': int,
-            'total_pnl': float,
-            'win_rate': float,
-            'avg_return': float
-        }
+    def update_agent_performance(self, agent_name: str, metrics: Optional[Dict] = None):
+        """更新Agent性能
 
+        metrics省略时读取已注册Agent的累计计数；否则只需total_signals、successful_signals、
+        total_pnl三项，其余指标由这三项推导。
+        """
         try:
-            # Validate metrics
-            for field, field_type in required_fields.items():
-                if field not in metrics:
-                    raise ValueError(f"Missing required field: {field}")
+            if metrics is None:
+                agent = self.agents.get(agent_name)
+                if agent is None:
+                    raise ValueError(f"Unknown agent: {agent_name}")
+                total, successful, total_pnl = agent.total_signals, agent.successful_signals, agent.total_pnl
+            else:
+                for field in ('total_signals', 'successful_signals', 'total_pnl'):
+                    if field not in metrics:
+                        raise ValueError(f"Missing required field: {field}")
                 try:
-                    metrics[field] = field_type(metrics[field])
+                    total = int(metrics['total_signals'])
+                    successful = int(metrics['successful_signals'])
+                    total_pnl = float(metrics['total_pnl'])
                 except (ValueError, TypeError):
-                    raise ValueError(f"Invalid type for {field}")
-
-            self.agent_performance[agent_name] = metrics
-
-            # 保存到数据库
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute("""
-                    INSERT INTO performance (
-                        timestamp, agent_name, total_signals,
-                        successful_signals, failed_signals,
-                        total_pnl, win_rate, avg_return
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    agent_name,
-                    metrics['total_signals'],
-                    metrics['successful_signals'],
-                    metrics['failed_signals'],
-                    metrics['total_pnl'],
-                    metrics['win_rate'],
-                    metrics['avg_return']
-                ))
-                conn.commit()
+                    raise ValueError("Invalid type for performance counters")
+
+            row = {
+                'total_signals': total,
+                'successful_signals': successful,
+                'failed_signals': total - successful,
+                'total_pnl': total_pnl,
+                'win_rate': successful / total if total else 0.0,
+                'avg_return': total_pnl / total if total else 0.0
+            }
+            self.agent_performance[agent_name] = row
+
+            # 缓冲后批量写入数据库
+            self._buffer(self._performance_buf, (
+                _now_str(),
+                agent_name,
+                *row.values()
+            ))
         except Exception as e:
             logger.error(f"Error updating agent performance: {e}")
             raise
 
+    # 查询结果每次从游标取出的行数
+    read_chunk_rows = 50_000
+
+    def _read_frame(self, conn: sqlite3.Connection, query: str, params: tuple) -> pd.DataFrame:
+        """分块从游标读取查询结果并按列累积，只在最后构建一次DataFrame
+
+        与read_sql_query不同，不会同时持有全部行的元组列表与记录数组等多份中间副本。
+        """
+        cursor = conn.execute(query, params)
+        names = [d[0] for d in cursor.description]
+        columns = [[] for _ in names]
+        while True:
+            rows = cursor.fetchmany(self.read_chunk_rows)
+            if not rows:
+                break
+            for column, values in zip(columns, zip(*rows)):
+                column.extend(values)
+        if not columns or not columns[0]:
+            return pd.DataFrame(columns=names)
+        return pd.DataFrame(dict(zip(names, columns)), columns=names)
+
+    @staticmethod
+    def _time_range_params(agent_name: str, start_time: Optional[datetime],
+                           end_time: Optional[datetime]) -> tuple:
+        """按时间范围查询的绑定参数，未给出的边界绑定为NULL"""
+        start = _format_ts(start_time) if start_time else None
+        end = _format_ts(end_time) if end_time else None
+        return (agent_name, start, start, end, end)
+
     def get_agent_performance(self, agent_name: str,
                             start_time: Optional[datetime] = None,
                             end_time: Optional[datetime] = None) -> pd.DataFrame:
         """获取Agent性能数据"""
+        self.flush()
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.row_factory = sqlite3.Row
-                query = """
-                    SELECT * FROM performance
-                    WHERE agent_name = ?
-                """
-                params = [agent_name]
-
-                if start_time:
-                    query += " AND timestamp >= ?"
-                    params.append(start_time.strftime('%Y-%m-%d %H:%M:%S'))
-                if end_time:
-                    query += " AND timestamp <= ?"
-                    params.append(end_time.strftime('%Y-%m-%d %H:%M:%S'))
-
-                query += " ORDER BY timestamp"
-
-                df = pd.read_sql_query(query, conn, params=tuple(params), parse_dates=['timestamp'])
+            with self._db_lock, self.conn as conn:
+                df = self._read_frame(conn, self._SELECT_PERFORMANCE_SQL,
+                                      self._time_range_params(agent_name, start_time, end_time))
+                df['timestamp'] = pd.to_datetime(df['timestamp'])
                 if df.empty:
                     return pd.DataFrame(columns=[
                         'timestamp', 'agent_name', 'total_signals',
@@ -769,128 +1737,152 @@ class AgentSystem:
                          start_time: Optional[datetime] = None,
                          end_time: Optional[datetime] = None) -> pd.DataFrame:
         """获取Agent信号数据"""
-        with sqlite3.connect(self.db_path) as conn:
-            query = """
-                SELECT * FROM signals
-                WHERE agent_name = ?
-            """
-            params = [agent_name]
-
-            if start_time:
-                query += " AND timestamp >= ?"
-                params.append(start_time.strftime('%Y-%m-%d %H:%M:%S'))
-            if end_time:
-                query += " AND timestamp <= ?"
-                params.append(end_time.strftime('%Y-%m-%d %H:%M:%S'))
-
-            query += " ORDER BY timestamp"
-
-            df = pd.read_sql_query(query, conn, params=tuple(params))
+        self.flush()
+        with self._db_lock, self.conn as conn:
+            df = self._read_frame(conn, self._SELECT_SIGNALS_SQL,
+                                  self._time_range_params(agent_name, start_time, end_time))
             df['timestamp'] = pd.to_datetime(df['timestamp'])
             return df
 
+    def _get_default_metrics(self) -> Dict[str, Union[int, float, Dict[str, float]]]:
+        """系统指标的默认值（数据库不可用时返回）"""
+        return {
+            'total_agents': len(self.agents),
+            'active_agents': 0,
+            'total_signals': 0,
+            'system_win_rate': 0.0,
+            'system_avg_return': 0.0,
+            'live_metrics': self.get_live_metrics(),
+            'risk_metrics': {
+                'volatility': 0.0,
+                'sharpe_ratio': 0.0,
+                'max_drawdown': 0.0,
+                'win_loss_ratio': 0.0
+            },
+            'perpetual_metrics': {
+                'funding_rate_impact': 0.0,
+                'leverage_ratio': 0.0,
+                'position_concentration': 0.0,
+                'liquidation_risk': 0.0,
+                'margin_usage': 0.0,
+                'position_health': 0.0
+            }
+        }
+
     def get_system_metrics(self) -> Dict[str, Union[int, float, Dict[str, float]]]:
         """Get system-wide performance metrics including perpetual trading metrics"""
         try:
+            self.flush()
             if not Path(str(self.db_path)).exists():
                 logger.warning(f"Database file {self.db_path} does not exist")
                 return self._get_default_metrics()
 
-            metrics = {
-                'total_agents': len(self.agents),
-                'active_agents': 0,
-                'total_signals': 0,
-                'system_win_rate': 0.0,
-                'system_avg_return': 0.0,
-                'risk_metrics': {
-                    'volatility': 0.0,
-                    'sharpe_ratio': 0.0,
-                    'max_drawdown': 0.0,
-                    'win_loss_ratio': 0.0
-                },
-                'perpetual_metrics': {
-                    'funding_rate_impact': 0.0,
-                    'leverage_ratio': 0.0,
-                    'position_concentration': 0.0,
-                    'liquidation_risk': 0.0,
-                    'margin_usage': 0.0,
-                    'position_health': 0.0
-                }
-            }
+            metrics = self._get_default_metrics()
 
-            with sqlite3.connect(self.db_path) as conn:
+            with self._db_lock, self.conn as conn:
+                # 30天汇总与7天风险/永续指标在一条语句内聚合，不向Python传输逐行数据
                 cursor = conn.execute("""
-                    WITH signal_metrics AS (
+                    WITH bounds AS (
+                        SELECT datetime('now', '-30 days') as since,
+                            date('now', '-30 days') as since_day
+                    ),
+                    parts AS (
+                        -- 窗口起始日只有部分信号落在窗口内，这一天按原始信号统计
+                        SELECT c.agent_name, 1 as n, c.invalid as n_invalid, c.win as n_win,
+                            c.pnl IS NOT NULL as n_pnl, COALESCE(c.pnl, 0.0) as sum_pnl
+                        FROM signal_contrib c, bounds b
+                        WHERE c.timestamp >= b.since
+                        AND c.timestamp < date(b.since_day, '+1 day')
+                        UNION ALL
+                        -- 之后的整日直接读取汇总
+                        SELECT a.agent_name, a.n, a.n_invalid, a.n_win, a.n_pnl, a.sum_pnl
+                        FROM signals_daily_agg a, bounds b
+                        WHERE a.day > b.since_day
+                    ),
+                    monthly AS (
                         SELECT
-                            COUNT(*) as total_signals,
+                            SUM(n) as total_signals,
                             COUNT(DISTINCT agent_name) as active_agents,
-                            AVG(CASE WHEN json_valid(metadata)
-                                AND CAST(json_extract(metadata, '$.pnl') AS FLOAT) > 0
-                                THEN 1 ELSE 0 END) as win_rate,
-                            AVG(CASE WHEN json_valid(metadata)
-                                THEN CAST(json_extract(metadata, '$.pnl') AS FLOAT)
-                                ELSE 0 END) as avg_pnl,
-                            AVG(CASE WHEN json_valid(metadata)
-                                THEN CAST(json_extract(metadata, '$.funding_rate') AS FLOAT)
-                                ELSE 0 END) as avg_funding_rate,
-                            AVG(CASE WHEN json_valid(metadata)
-                                THEN CAST(json_extract(metadata, '$.leverage') AS FLOAT)
-                                ELSE 1 END) as avg_leverage,
-                            AVG(CASE WHEN json_valid(metadata)
-                                AND ABS(CAST(json_extract(metadata, '$.liquidation_price') AS FLOAT) - price) / price < 0.1
-                                THEN 1 ELSE 0 END) as liquidation_risk,
-                            AVG(CASE WHEN json_valid(metadata)
-                                THEN CAST(json_extract(metadata, '$.maintenance_margin') AS FLOAT)
-                                ELSE 0.05 END) as avg_margin
-                        FROM signals
-                        WHERE timestamp >= datetime('now', '-30 days')
-                    )
-                    SELECT * FROM signal_metrics
-                """)
-                row = cursor.fetchone()
-
-                if row and row[0]:
-                    metrics.update({
-                        'total_signals': row[0],
-                        'active_agents': row[1],
-                        'system_win_rate': float(row[2] or 0.0),
-                        'system_avg_return': float(row[3] or 0.0)
-                    })
-
-                    returns = pd.read_sql_query("""
+                            CAST(SUM(n_win) AS FLOAT) / SUM(n) as win_rate,
+                            -- 非法元数据按0计入均值，缺少pnl的行不计入
+                            SUM(sum_pnl) / NULLIF(SUM(n_invalid) + SUM(n_pnl), 0) as avg_pnl
+                        FROM parts
+                    ),
+                    recent AS MATERIALIZED (
                         SELECT
+                            id,
+                            symbol,
+                            price,
                             CAST(json_extract(metadata, '$.pnl') AS FLOAT) as pnl,
                             CAST(json_extract(metadata, '$.funding_rate') AS FLOAT) as funding_rate,
                             CAST(json_extract(metadata, '$.leverage') AS INTEGER) as leverage,
-                            symbol,
-                            price,
                             CAST(json_extract(metadata, '$.liquidation_price') AS FLOAT) as liquidation_price,
                             CAST(json_extract(metadata, '$.maintenance_margin') AS FLOAT) as maintenance_margin
                         FROM signals
                         WHERE timestamp >= datetime('now', '-7 days')
                         AND json_valid(metadata)
                         AND json_extract(metadata, '$.pnl') IS NOT NULL
-                    """, conn)
-
-                    if not returns.empty:
-                        # Calculate risk metrics
-                        returns['pnl'] = returns['pnl'].astype(float)
-                        metrics['risk_metrics'].update({
-                            'volatility': float(returns['pnl'].std()),
-                            'sharpe_ratio': float(returns['pnl'].mean() / returns['pnl'].std() if returns['pnl'].std() > 0 else 0),
-                            'max_drawdown': float(returns['pnl'].cumsum().diff().min()),
-                            'win_loss_ratio': float(len(returns[returns['pnl'] > 0]) / len(returns[returns['pnl'] < 0]) if len(returns[returns['pnl'] < 0]) > 0 else 0)
-                        })
-
-                        # Calculate perpetual trading metrics
-                        metrics['perpetual_metrics'].update({
-                            'funding_rate_impact': float(returns['funding_rate'].mean()),
-                            'leverage_ratio': float(returns['leverage'].mean()),
-                            'position_concentration': float(returns.groupby('symbol').size().max() / len(returns)),
-                            'liquidation_risk': float((abs(returns['liquidation_price'] - returns['price']) / returns['price'] < 0.1).mean()),
-                            'margin_usage': float(returns['maintenance_margin'].mean()),
-                            'position_health': float(1 - (returns['leverage'] > 10).mean())
-                        })
+                    ),
+                    recent_mean AS (
+                        SELECT AVG(pnl) as mean, MIN(id) as first_id FROM recent
+                    ),
+                    weekly AS (
+                        SELECT
+                            COUNT(*) as n,
+                            m.mean as pnl_mean,
+                            -- 两遍法平方差和，避免 E[X²]-E[X]² 的抵消误差
+                            SUM((pnl - m.mean) * (pnl - m.mean)) as pnl_m2,
+                            SUM(pnl > 0) as wins,
+                            SUM(pnl < 0) as losses,
+                            -- 累计收益的逐笔差分即pnl本身（首笔除外）
+                            MIN(CASE WHEN id > m.first_id THEN pnl END) as max_drawdown,
+                            AVG(funding_rate) as funding_rate,
+                            AVG(leverage) as leverage,
+                            AVG(CASE WHEN ABS(liquidation_price - price) / price < 0.1
+                                THEN 1.0 ELSE 0.0 END) as liquidation_risk,
+                            AVG(maintenance_margin) as margin,
+                            AVG(CASE WHEN leverage > 10 THEN 1.0 ELSE 0.0 END) as high_leverage,
+                            (SELECT MAX(cnt) FROM (
+                                SELECT COUNT(*) as cnt FROM recent
+                                WHERE symbol IS NOT NULL GROUP BY symbol
+                            )) as top_symbol_count
+                        FROM recent, recent_mean m
+                    )
+                    SELECT * FROM monthly, weekly
+                """)
+                names = [d[0] for d in cursor.description]
+                row = dict(zip(names, cursor.fetchone()))
+
+            if row['total_signals']:
+                metrics.update({
+                    'total_signals': row['total_signals'],
+                    'active_agents': row['active_agents'],
+                    'system_win_rate': float(row['win_rate'] or 0.0),
+                    'system_avg_return': float(row['avg_pnl'] or 0.0)
+                })
+
+                n = row['n']
+                if n:
+                    def value(name: str) -> float:
+                        return np.nan if row[name] is None else float(row[name])
+
+                    std = math.sqrt(row['pnl_m2'] / (n - 1)) if n > 1 else np.nan
+                    metrics['risk_metrics'].update({
+                        'volatility': std,
+                        'sharpe_ratio': float(row['pnl_mean'] / std if std > 0 else 0),
+                        'max_drawdown': value('max_drawdown'),
+                        'win_loss_ratio': float(row['wins'] / row['losses'] if row['losses'] > 0 else 0)
+                    })
+                    metrics['perpetual_metrics'].update({
+                        'funding_rate_impact': value('funding_rate'),
+                        'leverage_ratio': value('leverage'),
+                        'position_concentration': (
+                            row['top_symbol_count'] / n if row['top_symbol_count'] else np.nan
+                        ),
+                        'liquidation_risk': value('liquidation_risk'),
+                        'margin_usage': value('margin'),
+                        'position_health': 1 - value('high_leverage')
+                    })
 
             return metrics
         except Exception as e:
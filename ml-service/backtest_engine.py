@@ -5,6 +5,7 @@ from dataclasses import dataclass
 from datetime import datetime
 import logging
 from strategy_engine import StrategyEngine, StrategyConfig, Signal
+from _njit import njit
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -36,6 +37,218 @@ class BacktestResult:
     drawdown_curve: pd.Series
     metrics: Dict
 
+_BUY = 1
+_SELL = -1
+
+class TradesBuffer:
+    """Struct-of-arrays trade store; Trade objects are built only on export"""
+    
+    def __init__(self, capacity: int = 64):
+        self.n = 0
+        self.symbols: List[str] = []
+        self._symbol_ids: Dict[str, int] = {}
+        self.open_trade: List[int] = []  # symbol id -> index of its open trade, or -1
+        self.symbol_id = np.empty(capacity, dtype=np.int32)
+        self.side = np.empty(capacity, dtype=np.int8)
+        self.is_open = np.zeros(capacity, dtype=bool)
+        self.entry_price = np.empty(capacity, dtype=np.float64)
+        self.exit_price = np.empty(capacity, dtype=np.float64)
+        self.amount = np.empty(capacity, dtype=np.float64)
+        self.pnl = np.empty(capacity, dtype=np.float64)
+        self.fee = np.empty(capacity, dtype=np.float64)
+        self.entry_time = np.empty(capacity, dtype=object)
+        self.exit_time = np.empty(capacity, dtype=object)
+    
+    _COLUMNS = ('symbol_id', 'side', 'is_open', 'entry_price', 'exit_price',
+                'amount', 'pnl', 'fee', 'entry_time', 'exit_time')
+    
+    def __len__(self) -> int:
+        return self.n
+    
+    def symbol_index(self, symbol: str) -> int:
+        """Integer id of a symbol, assigned on first use"""
+        sid = self._symbol_ids.get(symbol)
+        if sid is None:
+            sid = self._symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+            self.open_trade.append(-1)
+        return sid
+    
+    def lookup(self, symbol: str) -> int:
+        """Integer id of a known symbol, or -1"""
+        return self._symbol_ids.get(symbol, -1)
+    
+    def _grow(self):
+        """Double the capacity of every column"""
+        capacity = max(2 * len(self.side), 64)
+        for name in self._COLUMNS:
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.n] = column[:self.n]
+            setattr(self, name, grown)
+    
+    def open(self, symbol: str, side: int, entry_time: datetime, entry_price: float,
+             amount: float, fee: float) -> int:
+        """Record a newly opened trade and return its index"""
+        if self.n == len(self.side):
+            self._grow()
+        i = self.n
+        sid = self.symbol_index(symbol)
+        self.symbol_id[i] = sid
+        self.side[i] = side
+        self.is_open[i] = True
+        self.entry_price[i] = entry_price
+        self.exit_price[i] = np.nan
+        self.amount[i] = amount
+        self.pnl[i] = 0.0
+        self.fee[i] = fee
+        self.entry_time[i] = entry_time
+        self.exit_time[i] = None
+        self.open_trade[sid] = i
+        self.n += 1
+        return i
+    
+    def close(self, i: int, exit_time: datetime, exit_price: float, pnl: float, exit_fee: float):
+        """Mark trade i as closed"""
+        sid = self.symbol_id[i]
+        if self.open_trade[sid] == i:
+            self.open_trade[sid] = -1
+        self.is_open[i] = False
+        self.exit_time[i] = exit_time
+        self.exit_price[i] = exit_price
+        self.pnl[i] = pnl
+        self.fee[i] += exit_fee
+    
+    def last_open(self, sid: int) -> int:
+        """Index of the most recent open trade for a symbol id, or -1"""
+        return self.open_trade[sid]
+    
+    @classmethod
+    def from_arrays(cls, symbol: str, side: np.ndarray, entry_time: np.ndarray, entry_price: np.ndarray,
+                    exit_time: np.ndarray, exit_price: np.ndarray, amount: np.ndarray,
+                    pnl: np.ndarray, fee: np.ndarray) -> 'TradesBuffer':
+        """Wrap column arrays of closed trades for a single symbol without copying"""
+        buf = cls(capacity=0)
+        buf.n = len(side)
+        sid = buf.symbol_index(symbol) if buf.n else 0
+        buf.symbol_id = np.full(buf.n, sid, dtype=np.int32)
+        buf.side = side
+        buf.is_open = np.zeros(buf.n, dtype=bool)
+        buf.entry_price = entry_price
+        buf.exit_price = exit_price
+        buf.amount = amount
+        buf.pnl = pnl
+        buf.fee = fee
+        buf.entry_time = entry_time
+        buf.exit_time = exit_time
+        return buf
+    
+    def to_trades(self) -> List[Trade]:
+        """Materialize Trade dataclasses"""
+        n = self.n
+        symbols = self.symbols
+        return [
+            Trade(
+                id=f"trade_{k}",
+                symbol=symbols[sid],
+                side='BUY' if side > 0 else 'SELL',
+                entry_time=entry_time,
+                entry_price=entry_price,
+                exit_time=None if is_open else exit_time,
+                exit_price=None if is_open else exit_price,
+                amount=amount,
+                pnl=pnl,
+                fee=fee
+            )
+            for k, (sid, side, is_open, entry_time, entry_price, exit_time, exit_price, amount, pnl, fee)
+            in enumerate(zip(
+                self.symbol_id[:n].tolist(), self.side[:n].tolist(), self.is_open[:n].tolist(),
+                self.entry_time[:n].tolist(), self.entry_price[:n].tolist(),
+                self.exit_time[:n].tolist(), self.exit_price[:n].tolist(),
+                self.amount[:n].tolist(), self.pnl[:n].tolist(), self.fee[:n].tolist()
+            ))
+        ]
+
+@njit(cache=True, nogil=True)
+def _run_backtest_core(prices, signals, fee_rate, position_size, max_position_size, initial_capital):
+    """Event-driven backtest state machine (same rules as execute_signal/close_position)
+
+    Returns the equity marked at each bar before its signal executes, the final
+    capital, and per-trade arrays (entry/exit bar, side, entry/exit price, amount, pnl, fee).
+    """
+    n = prices.shape[0]
+    equity_out = np.empty(n, dtype=np.float64)
+    trade_entry_idx = np.empty(n, dtype=np.int64)
+    trade_exit_idx = np.empty(n, dtype=np.int64)
+    trade_side = np.empty(n, dtype=np.int8)
+    trade_entry_price = np.empty(n, dtype=np.float64)
+    trade_exit_price = np.empty(n, dtype=np.float64)
+    trade_amount = np.empty(n, dtype=np.float64)
+    trade_pnl = np.empty(n, dtype=np.float64)
+    trade_fee = np.empty(n, dtype=np.float64)
+
+    capital = initial_capital
+    position = 0.0
+    n_trades = 0
+    for i in range(n + 1):
+        last = i == n
+        price = prices[n - 1] if last else prices[i]
+        if not last:
+            equity_out[i] = capital + position * price
+        side = 0 if last else signals[i]
+        if not last and side == 0:
+            continue
+
+        amount = 0.0
+        fee = 0.0
+        if not last:
+            amount = min(capital * position_size / price, max_position_size)
+            if amount == 0.0:
+                continue
+            fee = abs(amount * price * fee_rate)
+            # BUY when already long / SELL when already short is a no-op
+            if (side > 0 and position > 0) or (side < 0 and position < 0):
+                continue
+
+        # Close the open trade on a reversal, or on the final bar
+        if position != 0.0:
+            t = n_trades - 1
+            exit_fee = abs(position * price * fee_rate)
+            if trade_side[t] > 0:
+                pnl = position * (price - trade_entry_price[t]) - trade_fee[t] - exit_fee
+            else:
+                pnl = position * (trade_entry_price[t] - price) - trade_fee[t] - exit_fee
+            trade_exit_idx[t] = n - 1 if last else i
+            trade_exit_price[t] = price
+            trade_pnl[t] = pnl
+            trade_fee[t] += exit_fee
+            capital += pnl
+            if trade_side[t] > 0:
+                capital += position * price
+            position = 0.0
+        if last:
+            break
+
+        if side > 0:
+            position = amount
+            capital -= (amount * price + fee)
+        else:
+            position = -amount
+            capital -= fee
+        trade_entry_idx[n_trades] = i
+        trade_exit_idx[n_trades] = -1
+        trade_side[n_trades] = 1 if side > 0 else -1
+        trade_entry_price[n_trades] = price
+        trade_exit_price[n_trades] = np.nan
+        trade_amount[n_trades] = amount
+        trade_pnl[n_trades] = 0.0
+        trade_fee[n_trades] = fee
+        n_trades += 1
+
+    return (equity_out, capital, trade_entry_idx[:n_trades], trade_exit_idx[:n_trades],
+            trade_side[:n_trades], trade_entry_price[:n_trades], trade_exit_price[:n_trades],
+            trade_amount[:n_trades], trade_pnl[:n_trades], trade_fee[:n_trades])
+
 class BacktestEngine:
     """Backtesting engine for trading strategies"""
     
@@ -44,12 +257,53 @@ class BacktestEngine:
                  initial_capital: float = 100000,
                  fee_rate: float = 0.001):
         self.strategy = StrategyEngine(strategy_config)
+        self._load_sizing()
         self.initial_capital = initial_capital
         self.fee_rate = fee_rate
         self.capital = initial_capital
-        self.trades: List[Trade] = []
-        self.equity_curve: List[float] = []
-        self.positions: Dict[str, float] = {}  # symbol -> amount
+        self.trade_buf = TradesBuffer()
+        self.equity_curve = np.array([initial_capital], dtype=np.float64)
+        self._positions = np.zeros(8, dtype=np.float64)  # symbol id -> amount
+    
+    @property
+    def trades(self) -> List[Trade]:
+        """Trades as Trade objects (built from the column store on each access)"""
+        return self.trade_buf.to_trades()
+    
+    @property
+    def positions(self) -> Dict[str, float]:
+        """Position amount per symbol that has been traded"""
+        return {symbol: float(self._positions[sid]) for sid, symbol in enumerate(self.trade_buf.symbols)}
+    
+    def _set_position(self, sid: int, amount: float):
+        if sid >= len(self._positions):
+            grown = np.zeros(2 * (sid + 1), dtype=np.float64)
+            grown[:len(self._positions)] = self._positions
+            self._positions = grown
+        self._positions[sid] = amount
+    
+    def _load_sizing(self):
+        """Resolve the risk-management sizing rules to plain floats once per run"""
+        risk_config = self.strategy.config.risk_management
+        self._position_pct = float(risk_config.get('positionSize', 1.0))  # Percentage of capital
+        self._max_amount = float(risk_config.get('maxPositionSize', np.inf))
+    
+    @property
+    def equity_curve(self) -> np.ndarray:
+        """Portfolio value after each bar (first entry is the initial capital)"""
+        return self._equity[:self._eq_i]
+    
+    @equity_curve.setter
+    def equity_curve(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        self._equity = np.empty(max(len(values), 64), dtype=np.float64)
+        self._equity[:len(values)] = values
+        self._eq_i = len(values)
+    
+    @property
+    def trade_pnls(self) -> np.ndarray:
+        """PnL of every recorded trade, in trade order"""
+        return self.trade_buf.pnl[:self.trade_buf.n]
     
     def run(self, data: pd.DataFrame) -> BacktestResult:
         """Run backtest on historical data"""
@@ -57,35 +311,47 @@ class BacktestEngine:
         
         # Reset state
         self.capital = self.initial_capital
-        self.trades = []
-        self.equity_curve = [self.initial_capital]
-        self.positions = {}
+        self.trade_buf = TradesBuffer()
+        self._positions = np.zeros(8, dtype=np.float64)
         
         # Ensure data is sorted by time
         data = data.sort_index()
+        index = data.index
+        close = data['close'].to_numpy(dtype=np.float64)
+        config = self.strategy.config
+        symbol = config.symbols[0] if config.symbols else 'default'
         
-        # Run strategy on each bar
-        for timestamp, bar in data.iterrows():
-            # Update equity curve
-            self.update_equity_curve(bar)
-            
-            # Generate trading signals
-            signal = self.strategy.generate_signal(data.loc[:timestamp])
-            if signal:
-                self.execute_signal(signal, bar, timestamp)
+        # Generate signals for every bar in one vectorized pass
+        signals = np.ascontiguousarray(self.strategy.generate_signals(data), dtype=np.int8)
         
-        # Close any remaining positions
-        self.close_all_positions(data.iloc[-1], data.index[-1])
+        # Run the sequential position logic in compiled code
+        self._load_sizing()
+        (equity, self.capital, entry_idx, exit_idx, sides, entry_prices, exit_prices,
+         amounts, pnls, fees) = _run_backtest_core(
+            close, signals, float(self.fee_rate), self._position_pct, self._max_amount,
+            float(self.initial_capital)
+        )
+        self._equity = np.empty(len(equity) + 1, dtype=np.float64)
+        self._equity[0] = self.initial_capital
+        self._equity[1:] = equity
+        self._eq_i = len(self._equity)
+        
+        # Keep the kernel's trade columns as the trade store
+        self.trade_buf = TradesBuffer.from_arrays(
+            symbol, sides, index[entry_idx].to_numpy(dtype=object), entry_prices,
+            index[exit_idx].to_numpy(dtype=object), exit_prices, amounts, pnls, fees
+        )
         
         # Calculate performance metrics
         return self.calculate_results()
     
-    def execute_signal(self, signal: Signal, bar: pd.Series, timestamp: datetime):
-        """Execute a trading signal"""
-        position = self.positions.get(signal.symbol, 0)
+    def execute_signal(self, signal: Signal, close: float, timestamp: datetime):
+        """Execute a trading signal at the bar's close price"""
+        sid = self.trade_buf.lookup(signal.symbol)
+        position = self._positions[sid] if sid >= 0 else 0.0
         
         # Calculate position size based on risk management
-        amount = self.calculate_position_size(signal, bar)
+        amount = self.calculate_position_size(signal)
         if amount == 0:
             return
             
@@ -97,127 +363,111 @@ class BacktestEngine:
             if position <= 0:
                 # Close existing short position if any
                 if position < 0:
-                    self.close_position(signal.symbol, bar, timestamp)
+                    self.close_position(signal.symbol, close, timestamp)
                 
                 # Open new long position
-                self.positions[signal.symbol] = amount
+                i = self.trade_buf.open(signal.symbol, _BUY, timestamp, signal.price, amount, fee)
+                self._set_position(self.trade_buf.symbol_id[i], amount)
                 self.capital -= (amount * signal.price + fee)
                 
-                self.trades.append(Trade(
-                    id=f"trade_{len(self.trades)}",
-                    symbol=signal.symbol,
-                    side='BUY',
-                    entry_time=timestamp,
-                    entry_price=signal.price,
-                    exit_time=None,
-                    exit_price=None,
-                    amount=amount,
-                    fee=fee
-                ))
-                
         elif signal.side == 'SELL':
             # Open short position
             if position >= 0:
                 # Close existing long position if any
                 if position > 0:
-                    self.close_position(signal.symbol, bar, timestamp)
+                    self.close_position(signal.symbol, close, timestamp)
                 
                 # Open new short position
-                self.positions[signal.symbol] = -amount
+                i = self.trade_buf.open(signal.symbol, _SELL, timestamp, signal.price, amount, fee)
+                self._set_position(self.trade_buf.symbol_id[i], -amount)
                 self.capital -= fee
-                
-                self.trades.append(Trade(
-                    id=f"trade_{len(self.trades)}",
-                    symbol=signal.symbol,
-                    side='SELL',
-                    entry_time=timestamp,
-                    entry_price=signal.price,
-                    exit_time=None,
-                    exit_price=None,
-                    amount=amount,
-                    fee=fee
-                ))
     
-    def close_position(self, symbol: str, bar: pd.Series, timestamp: datetime):
-        """Close an open position"""
-        position = self.positions.get(symbol, 0)
+    def close_position(self, symbol: str, close: float, timestamp: datetime):
+        """Close an open position at the given close price"""
+        buf = self.trade_buf
+        sid = buf.lookup(symbol)
+        position = self._positions[sid] if sid >= 0 else 0.0
         if position == 0:
             return
             
         # Find the corresponding trade
-        for trade in reversed(self.trades):
-            if trade.symbol == symbol and trade.exit_time is None:
-                # Calculate PnL
-                exit_price = bar['close']
-                fee = abs(position * exit_price * self.fee_rate)
-                
-                if trade.side == 'BUY':
-                    pnl = position * (exit_price - trade.entry_price) - trade.fee - fee
-                else:
-                    pnl = position * (trade.entry_price - exit_price) - trade.fee - fee
-                
-                # Update trade
-                trade.exit_time = timestamp
-                trade.exit_price = exit_price
-                trade.pnl = pnl
-                trade.fee += fee
-                
-                # Update capital
-                self.capital += pnl
-                if trade.side == 'BUY':
-                    self.capital += position * exit_price
-                
-                break
+        i = buf.last_open(sid)
+        if i >= 0:
+            # Calculate PnL
+            exit_price = close
+            fee = abs(position * exit_price * self.fee_rate)
+            
+            if buf.side[i] == _BUY:
+                pnl = position * (exit_price - buf.entry_price[i]) - buf.fee[i] - fee
+            else:
+                pnl = position * (buf.entry_price[i] - exit_price) - buf.fee[i] - fee
+            
+            # Update trade
+            buf.close(i, timestamp, exit_price, pnl, fee)
+            
+            # Update capital
+            self.capital += pnl
+            if buf.side[i] == _BUY:
+                self.capital += position * exit_price
         
         # Clear position
-        self.positions[symbol] = 0
+        self._positions[sid] = 0.0
     
-    def close_all_positions(self, bar: pd.Series, timestamp: datetime):
+    def close_all_positions(self, close: float, timestamp: datetime):
         """Close all open positions"""
-        for symbol in list(self.positions.keys()):
-            self.close_position(symbol, bar, timestamp)
+        symbols = self.trade_buf.symbols
+        for sid in np.flatnonzero(self._positions[:len(symbols)]):
+            self.close_position(symbols[sid], close, timestamp)
     
-    def calculate_position_size(self, signal: Signal, bar: pd.Series) -> float:
+    def calculate_position_size(self, signal: Signal) -> float:
         """Calculate position size based on risk management rules"""
-        risk_config = self.strategy.config.risk_management
-        position_size = risk_config.get('positionSize', 1.0)  # Percentage of capital
-        
         # Calculate maximum position size based on available capital
-        max_amount = (self.capital * position_size) / signal.price
-        
-        # Apply additional risk management rules
-        if 'maxPositionSize' in risk_config:
-            max_amount = min(max_amount, risk_config['maxPositionSize'])
+        max_amount = (self.capital * self._position_pct) / signal.price
         
-        return max_amount
+        # Apply additional risk management rules (inf when no cap is configured)
+        return min(max_amount, self._max_amount)
     
-    def update_equity_curve(self, bar: pd.Series):
+    def update_equity_curve(self, close: float):
         """Update equity curve with current portfolio value"""
         portfolio_value = self.capital
         
         # Add unrealized PnL from open positions
-        for symbol, amount in self.positions.items():
-            if amount != 0:
-                portfolio_value += amount * bar['close']
+        positions = self._positions
+        for amount in positions[positions != 0]:
+            portfolio_value += amount * close
         
-        self.equity_curve.append(portfolio_value)
+        if self._eq_i == len(self._equity):
+            grown = np.empty(2 * len(self._equity), dtype=np.float64)
+            grown[:self._eq_i] = self._equity
+            self._equity = grown
+        self._equity[self._eq_i] = portfolio_value
+        self._eq_i += 1
     
     def calculate_results(self) -> BacktestResult:
         """Calculate backtest results and performance metrics"""
-        equity_curve = pd.Series(self.equity_curve)
-        returns = equity_curve.pct_change().dropna()
-        
-        # Calculate drawdown
-        drawdown = (equity_curve - equity_curve.cummax()) / equity_curve.cummax() * 100
+        equity = self.equity_curve
+        with np.errstate(divide='ignore', invalid='ignore'):
+            returns = np.diff(equity) / equity[:-1]
+            returns = returns[~np.isnan(returns)]
+            
+            # Calculate drawdown
+            peak = np.maximum.accumulate(equity)
+            drawdown = (equity - peak) / peak * 100
+        max_dd = drawdown.min()
         
         # Calculate basic metrics
-        total_pnl = equity_curve.iloc[-1] - self.initial_capital
-        winning_trades = len([t for t in self.trades if t.pnl > 0])
-        total_trades = len(self.trades)
+        total_pnl = equity[-1] - self.initial_capital
+        winning_trades = int(np.count_nonzero(self.trade_pnls > 0))
+        total_trades = len(self.trade_buf)
         win_rate = winning_trades / total_trades if total_trades > 0 else 0
         
         # Calculate Sharpe Ratio (assuming risk-free rate = 0)
-        sharpe_ratio = np.sqrt(252) * (returns.mean() / returns.std()) if len(returns) > 0 else 0
+        if len(returns) > 0:
+            std = returns.std(ddof=1) if len(returns) > 1 else np.nan
+            with np.errstate(divide='ignore', invalid='ignore'):
+                sharpe_ratio = np.sqrt(252) * (returns.mean() / std)
+        else:
+            sharpe_ratio = 0
         
         # Calculate additional metrics
         metrics = {
@@ -226,7 +476,7 @@ class BacktestEngine:
             'losing_trades': total_trades - winning_trades,
             'avg_trade': total_pnl / total_trades if total_trades > 0 else 0,
             'profit_factor': self.calculate_profit_factor(),
-            'recovery_factor': abs(total_pnl / drawdown.min()) if drawdown.min() < 0 else float('inf'),
+            'recovery_factor': abs(total_pnl / max_dd) if max_dd < 0 else float('inf'),
             'expectancy': self.calculate_expectancy()
         }
         
@@ -234,29 +484,31 @@ class BacktestEngine:
             total_pnl=total_pnl,
             win_rate=win_rate,
             sharpe_ratio=sharpe_ratio,
-            max_drawdown=abs(drawdown.min()),
+            max_drawdown=abs(max_dd),
             trades=self.trades,
-            equity_curve=equity_curve,
-            drawdown_curve=drawdown,
+            equity_curve=pd.Series(equity, copy=False),
+            drawdown_curve=pd.Series(drawdown, copy=False),
             metrics=metrics
         )
     
     def calculate_profit_factor(self) -> float:
         """Calculate profit factor (gross profit / gross loss)"""
-        gross_profit = sum(t.pnl for t in self.trades if t.pnl > 0)
-        gross_loss = abs(sum(t.pnl for t in self.trades if t.pnl < 0))
+        pnl = self.trade_pnls
+        gross_profit = float(pnl[pnl > 0].sum())
+        gross_loss = abs(float(pnl[pnl < 0].sum()))
         return gross_profit / gross_loss if gross_loss != 0 else float('inf')
     
     def calculate_expectancy(self) -> float:
         """Calculate system expectancy (average win * win rate - average loss * loss rate)"""
-        if not self.trades:
+        if not len(self.trade_buf):
             return 0
             
-        winning_trades = [t.pnl for t in self.trades if t.pnl > 0]
-        losing_trades = [t.pnl for t in self.trades if t.pnl < 0]
+        pnl = self.trade_pnls
+        winning_trades = pnl[pnl > 0]
+        losing_trades = pnl[pnl < 0]
         
-        avg_win = np.mean(winning_trades) if winning_trades else 0
-        avg_loss = abs(np.mean(losing_trades)) if losing_trades else 0
-        win_rate = len(winning_trades) / len(self.trades)
+        avg_win = winning_trades.mean() if len(winning_trades) else 0
+        avg_loss = abs(losing_trades.mean()) if len(losing_trades) else 0
+        win_rate = len(winning_trades) / len(self.trade_buf)
         
         return (avg_win * win_rate) - (avg_loss * (1 - win_rate)) 
\ No newline at end of file
@@ -4,13 +4,18 @@ import numpy as np
 from typing import Dict, List, Optional, Union
 from datetime import datetime, timedelta
 from dataclasses import dataclass
-from agent_system import AgentSystem, AgentConfig, TradeSignal
+from collections import defaultdict
+from agent_system import AgentSystem, AgentConfig, TradeSignal, BaseAgent, IndicatorCache, OHLCVBuffer
 from reporting_system import ReportingSystem, ExecutionReport, PerformanceReport
 from market_data_service import MarketDataService, MarketConfig
 import json
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from risk_management import RiskConfig, Position
 import sqlite3
+from _njit import njit
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -31,31 +36,7 @@ class BacktestConfig:
     max_leverage: float = 10.0  # 最大杠杆倍数
     funding_rate_interval: int = 8  # 资金费率收取间隔（小时）
     min_maintenance_margin: float = 0.005  # 最小维持保证金率
-
-@dataclass
-class BacktestPosition:
-    """回测持仓"""
-    symbol: str
-    direction: str
-    size: float
-    entry_price: float
-    stop_loss: float
-    take_profit: float
-    agent_name: str
-    open_time: datetime
-    unrealized_pnl: float = 0.0
-    metadata: Dict = None
-
-@dataclass
-class ContractBacktestPosition(BacktestPosition):
-    """合约回测持仓"""
-    leverage: float  # 杠杆倍数
-    liquidation_price: float  # 强平价格
-    margin_type: str  # 'isolated' 或 'cross'
-    maintenance_margin: float  # 维持保证金
-    funding_rate: float  # 资金费率
-    next_funding_time: datetime  # 下次资金费时间
-    notional_value: float  # 名义价值
+    funding_seed: Optional[int] = None  # 资金费率随机种子，固定后回测结果可复现
 
 @dataclass
 class BacktestResult:
@@ -73,10 +54,308 @@ class BacktestResult:
     positions_history: List[Position]
     risk_metrics: Dict[str, float]
 
+@dataclass
+class BacktestBatchResult:
+    """批量回测中单个配置的精简结果（不含DataFrame，便于跨进程传回）"""
+    config: BacktestConfig
+    total_pnl: float
+    max_drawdown: float
+    equity: np.ndarray  # 权益序列
+    timestamps: np.ndarray  # 权益对应的int64纳秒时间戳
+    trades: np.ndarray  # _TRADE_DTYPE结构化数组
+
+# 批量回测工作进程内按(回测类, 交易对, 周期, 起止时间, 数据源)缓存的历史数据
+_BATCH_DATA_CACHE: Dict[tuple, Dict[str, Dict[str, pd.DataFrame]]] = {}
+
+# 成交记录的原因编码与名称（0为开仓）
+_OPEN = 0
+_SL_TP = 1
+_LIQUIDATION = 2
+_BACKTEST_END = 3
+_CLOSE_REASONS = ('', 'SL/TP', 'LIQUIDATION', 'BACKTEST_END')
+_MINUTE_NS = 60_000_000_000
+
+# 成交记录（交易对以config.symbols中的下标保存，方向1为buy、-1为sell）
+_TRADE_DTYPE = np.dtype([
+    ('ts', 'i8'), ('sym', 'i4'), ('dir', 'i1'), ('size', 'f8'), ('price', 'f8'),
+    ('comm', 'f8'), ('pnl', 'f8'), ('lev', 'f8'), ('reason', 'i1')
+])
+
+_OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+_SELECT_OHLCV_SQL = """
+    SELECT timestamp, open, high, low, close, volume FROM ohlcv
+    WHERE symbol = ? AND timeframe = ?
+    AND timestamp BETWEEN ? AND ?
+    ORDER BY timestamp
+"""
+
+@njit(cache=True, nogil=True)
+def _run_kernel(close, sig_bar, sig_sym, sig_dir, sig_size, sig_stop, sig_tp, sig_lev, sig_liq,
+                commission, funding_rates, funding_bars, initial_capital):
+    """逐分钟回测状态机
+
+    close为按分钟网格前向填充的收盘价矩阵(n_bars, n_symbols)，无数据处为NaN。
+    信号按生效分钟升序排列，sig_lev为0表示现货，sig_liq为强平价相对开仓价的系数。止损止盈、强平、资金费与开平仓
+    均在循环内完成；返回有效分钟掩码、权益、已实现盈亏、因保证金不足被拒的信号数
+    及成交数组（分钟、交易对、方向、数量、价格、手续费、盈亏、杠杆、原因）。
+    """
+    n, m = close.shape
+    valid = np.zeros(n, dtype=np.bool_)
+    equity = np.empty(n, dtype=np.float64)
+
+    # 每笔信号至多产生开仓与平仓两条成交
+    cap = 2 * sig_bar.shape[0]
+    tr_bar = np.empty(cap, dtype=np.int64)
+    tr_sym = np.empty(cap, dtype=np.int64)
+    tr_dir = np.empty(cap, dtype=np.int8)
+    tr_size = np.empty(cap, dtype=np.float64)
+    tr_price = np.empty(cap, dtype=np.float64)
+    tr_comm = np.empty(cap, dtype=np.float64)
+    tr_pnl = np.empty(cap, dtype=np.float64)
+    tr_lev = np.empty(cap, dtype=np.float64)
+    tr_reason = np.empty(cap, dtype=np.int8)
+
+    # 每个交易对至多一笔持仓，方向为0表示空仓
+    pos_dir = np.zeros(m, dtype=np.int8)
+    pos_size = np.zeros(m, dtype=np.float64)
+    pos_entry = np.zeros(m, dtype=np.float64)
+    pos_stop = np.zeros(m, dtype=np.float64)
+    pos_tp = np.zeros(m, dtype=np.float64)
+    pos_lev = np.zeros(m, dtype=np.float64)
+    pos_liq = np.zeros(m, dtype=np.float64)
+    pos_margin = np.zeros(m, dtype=np.float64)
+    pos_rate = np.zeros(m, dtype=np.float64)
+    pos_next_funding = np.zeros(m, dtype=np.int64)
+
+    realized = 0.0
+    used_margin = 0.0
+    last_equity = initial_capital
+    rejected = 0
+    n_trades = 0
+    last_bar = -1
+    j = 0
+    n_sig = sig_bar.shape[0]
+    for k in range(n):
+        has_data = False
+        for s in range(m):
+            if close[k, s] == close[k, s]:
+                has_data = True
+                break
+        if not has_data:
+            # 尚无任何行情的分钟不处理信号
+            while j < n_sig and sig_bar[j] == k:
+                j += 1
+            continue
+        valid[k] = True
+        last_bar = k
+
+        # 更新持仓：强平、资金费、止损止盈
+        for s in range(m):
+            d = pos_dir[s]
+            price = close[k, s]
+            if d == 0 or price != price:
+                continue
+            # 以方向符号统一多空两侧的比较，按位或避免短路分支
+            reason = _OPEN
+            if pos_lev[s] > 0.0:
+                if d * (price - pos_liq[s]) <= 0:
+                    reason = _LIQUIDATION
+                elif k >= pos_next_funding[s]:
+                    realized -= pos_size[s] * pos_entry[s] * pos_rate[s]
+                    pos_next_funding[s] += funding_bars
+            if reason == _OPEN:
+                hit = (d * (price - pos_stop[s]) <= 0) | (d * (pos_tp[s] - price) <= 0)
+                if hit:
+                    reason = _SL_TP
+            if reason != _OPEN:
+                comm = pos_size[s] * price * commission
+                pnl = d * (price - pos_entry[s]) * pos_size[s]
+                realized += pnl - comm
+                used_margin -= pos_margin[s]
+                tr_bar[n_trades] = k
+                tr_sym[n_trades] = s
+                tr_dir[n_trades] = -d
+                tr_size[n_trades] = pos_size[s]
+                tr_price[n_trades] = price
+                tr_comm[n_trades] = comm
+                tr_pnl[n_trades] = pnl
+                tr_lev[n_trades] = pos_lev[s]
+                tr_reason[n_trades] = reason
+                n_trades += 1
+                pos_dir[s] = 0
+
+        # 处理本分钟生效的信号（已有持仓的交易对忽略新信号）
+        while j < n_sig and sig_bar[j] == k:
+            s = sig_sym[j]
+            price = close[k, s]
+            if pos_dir[s] == 0 and price == price:
+                size = sig_size[j]
+                lev = sig_lev[j]
+                notional = size * price
+                margin = 0.0
+                if lev > 0.0:
+                    margin = notional / lev
+                    if margin > last_equity - used_margin:
+                        rejected += 1
+                        j += 1
+                        continue
+                    pos_liq[s] = price * sig_liq[j]
+                    period = k // funding_bars
+                    pos_rate[s] = funding_rates[period, s]
+                    pos_next_funding[s] = (period + 1) * funding_bars
+                    comm = margin * commission
+                else:
+                    comm = notional * commission
+                realized -= comm
+                used_margin += margin
+                pos_dir[s] = sig_dir[j]
+                pos_size[s] = size
+                pos_entry[s] = price
+                pos_stop[s] = sig_stop[j]
+                pos_tp[s] = sig_tp[j]
+                pos_lev[s] = lev
+                pos_margin[s] = margin
+                tr_bar[n_trades] = k
+                tr_sym[n_trades] = s
+                tr_dir[n_trades] = sig_dir[j]
+                tr_size[n_trades] = size
+                tr_price[n_trades] = price
+                tr_comm[n_trades] = comm
+                tr_pnl[n_trades] = np.nan
+                tr_lev[n_trades] = lev
+                tr_reason[n_trades] = _OPEN
+                n_trades += 1
+            j += 1
+
+        # 记录权益
+        eq = initial_capital + realized
+        for s in range(m):
+            price = close[k, s]
+            if pos_dir[s] != 0 and price == price:
+                eq += pos_dir[s] * (price - pos_entry[s]) * pos_size[s]
+        equity[k] = eq
+        last_equity = eq
+
+    # 回测结束时按最后价格平掉所有持仓
+    if last_bar >= 0:
+        for s in range(m):
+            d = pos_dir[s]
+            if d == 0:
+                continue
+            price = close[last_bar, s]
+            comm = pos_size[s] * price * commission
+            pnl = d * (price - pos_entry[s]) * pos_size[s]
+            realized += pnl - comm
+            tr_bar[n_trades] = last_bar
+            tr_sym[n_trades] = s
+            tr_dir[n_trades] = -d
+            tr_size[n_trades] = pos_size[s]
+            tr_price[n_trades] = price
+            tr_comm[n_trades] = comm
+            tr_pnl[n_trades] = pnl
+            tr_lev[n_trades] = pos_lev[s]
+            tr_reason[n_trades] = _BACKTEST_END
+            n_trades += 1
+            pos_dir[s] = 0
+
+    return (valid, equity, realized, rejected,
+            tr_bar[:n_trades], tr_sym[:n_trades], tr_dir[:n_trades], tr_size[:n_trades],
+            tr_price[:n_trades], tr_comm[:n_trades], tr_pnl[:n_trades],
+            tr_lev[:n_trades], tr_reason[:n_trades])
+
+@njit(cache=True, nogil=True, error_model='numpy')
+def _equity_stats(equity):
+    """单次遍历权益序列，计算收益率与回撤统计
+
+    返回(收益率均值, 收益率标准差, 负收益率标准差, 最大回撤, 平均回撤, 平均回撤持续K线数)；
+    标准差为样本标准差(ddof=1)，样本不足两个时为NaN。未恢复的最后一段回撤不计入持续时长。
+    """
+    n = equity.shape[0]
+    # Welford在线均值/方差，避免对收益率序列做多遍扫描
+    n_ret = 0
+    mean = 0.0
+    m2 = 0.0
+    n_neg = 0
+    neg_mean = 0.0
+    neg_m2 = 0.0
+    peak = -np.inf
+    max_dd = np.nan
+    dd_sum = 0.0
+    n_dd = 0
+    in_drawdown = False
+    dd_start = 0
+    dd_len_sum = 0
+    n_periods = 0
+    for i in range(n):
+        value = equity[i]
+        if i > 0:
+            ret = value / equity[i - 1] - 1
+            if ret == ret:
+                n_ret += 1
+                delta = ret - mean
+                mean += delta / n_ret
+                m2 += delta * (ret - mean)
+                if ret < 0:
+                    n_neg += 1
+                    delta = ret - neg_mean
+                    neg_mean += delta / n_neg
+                    neg_m2 += delta * (ret - neg_mean)
+        if value > peak:
+            peak = value
+        dd = (peak - value) / peak
+        if dd == dd:
+            if not (dd <= max_dd):
+                max_dd = dd
+            dd_sum += dd
+            n_dd += 1
+        if not in_drawdown and dd > 0:
+            in_drawdown = True
+            dd_start = i
+        elif in_drawdown and dd == 0:
+            in_drawdown = False
+            dd_len_sum += i - dd_start
+            n_periods += 1
+
+    mean_ret = mean if n_ret > 0 else np.nan
+    std_ret = np.sqrt(m2 / (n_ret - 1)) if n_ret > 1 else np.nan
+    downside_std = np.sqrt(neg_m2 / (n_neg - 1)) if n_neg > 1 else np.nan
+    avg_dd = dd_sum / n_dd if n_dd > 0 else np.nan
+    avg_dd_bars = dd_len_sum / n_periods if n_periods > 0 else 0.0
+    return mean_ret, std_ret, downside_std, max_dd, avg_dd, avg_dd_bars
+
+def _monthly_returns(ts_i8: np.ndarray, equity: np.ndarray) -> pd.Series:
+    """按月末权益计算月度收益率，与equity.resample('M').last().pct_change()一致
+
+    ts_i8为升序的纳秒时间戳；月份键由datetime64[M]得到，每月最后一个点即月末权益，
+    无数据的月份沿用上月权益（收益率为0），索引为各月最后一天。
+    """
+    months = ts_i8.astype('datetime64[ns]').astype('datetime64[M]').astype(np.int64)
+    first = months[0]
+    last_of_month = np.r_[np.flatnonzero(np.diff(months)), len(months) - 1]
+    n_months = months[-1] - first + 1
+    month_equity = np.empty(n_months, dtype=np.float64)
+    present = np.zeros(n_months, dtype=np.int64)
+    slots = months[last_of_month] - first
+    month_equity[slots] = equity[last_of_month]
+    present[slots] = slots
+    month_equity = month_equity[np.maximum.accumulate(present)]
+    
+    returns = np.empty(n_months, dtype=np.float64)
+    returns[0] = np.nan
+    returns[1:] = month_equity[1:] / month_equity[:-1] - 1
+    month_ends = (
+        np.arange(first + 1, first + n_months + 1).astype('datetime64[M]').astype('datetime64[ns]')
+        - np.timedelta64(1, 'D')
+    )
+    return pd.Series(returns, index=pd.DatetimeIndex(month_ends))
+
 class BacktestSystem:
     """回测系统"""
     
-    def __init__(self, config: BacktestConfig):
+    read_chunk_rows = 100_000
+    
+    def __init__(self, config: BacktestConfig,
+                 historical_data: Optional[Dict[str, Dict[str, pd.DataFrame]]] = None):
         self.config = config
         self.agent_system = AgentSystem()
         self.reporting = ReportingSystem("backtest_results.db")
@@ -84,9 +363,21 @@ class BacktestSystem:
         # 回测状态
         self.current_time: datetime = config.start_date
         self.positions: Dict[str, Position] = {}
-        self.trades_history: List[Dict] = []
-        self.equity_curve: List[float] = [config.initial_capital]
-        self.equity_timestamps: List[datetime] = [config.start_date]
+        # 权益与时间戳按回测分钟数预分配，首个点为初始资金
+        n_bars = max((config.end_date - config.start_date) // timedelta(minutes=1) + 1, 0)
+        self._equity = np.empty(n_bars + 1, dtype=np.float64)
+        self._ts_i8 = np.empty(n_bars + 1, dtype=np.int64)
+        self._equity[0] = config.initial_capital
+        self._ts_i8[0] = pd.Timestamp(config.start_date).value
+        self._eq_i = 1
+        self._trades = np.empty(0, dtype=_TRADE_DTYPE)
+        self._tr_i = 0
+        # 维持保证金率在回测期间不变，预先算好各整数杠杆下多空两侧的强平价系数
+        mm = config.min_maintenance_margin
+        self._liq_factors: Dict[tuple, float] = {}
+        for leverage in range(1, int(config.max_leverage) + 1):
+            self._liq_factors[(1, float(leverage))] = 1 - 1 / leverage + mm
+            self._liq_factors[(-1, float(leverage))] = 1 + 1 / leverage - mm
         
         # 性能指标
         self.total_pnl = 0.0
@@ -94,11 +385,84 @@ class BacktestSystem:
         self.max_drawdown = 0.0
         self.peak_equity = config.initial_capital
         
-        # 加载历史数据
-        self.historical_data = self._load_historical_data()
+        # 加载历史数据（可复用已加载的同范围数据）
+        if historical_data is None:
+            self.historical_data = self._load_historical_data()
+        else:
+            self.historical_data = historical_data
+            self._cache_arrays(historical_data)
         
         self.funding_rates: Dict[str, float] = {}  # 各交易对的资金费率
         self.next_funding_time = config.start_date + timedelta(hours=config.funding_rate_interval)
+        # 整个回测期间的资金费率表一次生成，由内核按分钟下标取用
+        self._funding_schedule = self._funding_rate_schedule(n_bars)
+    
+    @property
+    def equity_curve(self) -> np.ndarray:
+        """已记录的权益序列（预分配缓冲区的视图）"""
+        return self._equity[:self._eq_i]
+    
+    @property
+    def equity_timestamps(self) -> pd.DatetimeIndex:
+        """权益序列对应的时间戳"""
+        return pd.DatetimeIndex(self._ts_i8[:self._eq_i])
+    
+    @property
+    def trades_history(self) -> List[Dict]:
+        """成交记录，按需由结构化数组构建为字典列表"""
+        trades = self._trades[:self._tr_i]
+        times = pd.DatetimeIndex(trades['ts']).to_pydatetime()
+        history = []
+        for t, row in zip(times, trades.tolist()):
+            _, sym, direction, size, price, comm, pnl, lev, reason = row
+            symbol = self.config.symbols[sym]
+            direction = 'buy' if direction > 0 else 'sell'
+            if reason == _OPEN:
+                is_contract = lev > 0
+                history.append({
+                    'timestamp': t,
+                    'symbol': symbol,
+                    'direction': direction,
+                    'size': size,
+                    'price': price,
+                    'commission': comm,
+                    'type': 'contract' if is_contract else 'spot',
+                    'leverage': lev if is_contract else 1.0,
+                    'notional_value': size * price
+                })
+            else:
+                history.append({
+                    'timestamp': t,
+                    'symbol': symbol,
+                    'direction': direction,
+                    'size': size,
+                    'price': price,
+                    'commission': comm,
+                    'pnl': pnl,
+                    'reason': _CLOSE_REASONS[reason],
+                    'type': 'close'
+                })
+        return history
+    
+    @property
+    def trades_frame(self) -> pd.DataFrame:
+        """成交记录的列式DataFrame，直接由结构化数组各列构建，不经过逐笔字典
+
+        交易对与平仓原因为分类列，方向为±1，开仓记录的pnl为NaN、reason为空字符串。
+        """
+        trades = self._trades[:self._tr_i]
+        return pd.DataFrame({
+            'timestamp': pd.DatetimeIndex(trades['ts']),
+            'symbol': pd.Categorical.from_codes(trades['sym'], categories=self.config.symbols),
+            'direction': trades['dir'],
+            'size': trades['size'],
+            'price': trades['price'],
+            'commission': trades['comm'],
+            'pnl': trades['pnl'],
+            'leverage': trades['lev'],
+            'notional_value': trades['size'] * trades['price'],
+            'reason': pd.Categorical.from_codes(trades['reason'], categories=list(_CLOSE_REASONS)),
+        })
     
     def _load_historical_data(self) -> Dict[str, Dict[str, pd.DataFrame]]:
         """加载历史数据"""
@@ -106,430 +470,508 @@ class BacktestSystem:
         
         if self.config.data_source == "database":
             with sqlite3.connect("database/market_data.db") as conn:
+                # 只读的大范围扫描：内存映射、加大页缓存，临时结构放内存
+                conn.execute("PRAGMA mmap_size=268435456")
+                conn.execute("PRAGMA cache_size=-262144")
+                conn.execute("PRAGMA temp_store=MEMORY")
+                # timestamp以'YYYY-MM-DD HH:MM:SS'文本存储，边界按同一格式比较
+                start, end = str(self.config.start_date), str(self.config.end_date)
                 for symbol in self.config.symbols:
                     data[symbol] = {}
                     for timeframe in self.config.timeframes:
-                        query = """
-                            SELECT * FROM ohlcv
-                            WHERE symbol = ? AND timeframe = ?
-                            AND timestamp BETWEEN ? AND ?
-                            ORDER BY timestamp
-                        """
-                        df = pd.read_sql_query(
-                            query, conn,
-                            params=(
-                                symbol, timeframe,
-                                self.config.start_date,
-                                self.config.end_date
-                            )
-                        )
-                        if not df.empty:
-                            df.set_index('timestamp', inplace=True)
+                        df = self._read_ohlcv(conn, (symbol, timeframe, start, end))
+                        if df is not None:
                             data[symbol][timeframe] = df
         
         else:  # csv数据源
             data_dir = Path("data")
+            start = pd.Timestamp(self.config.start_date).value
+            end = pd.Timestamp(self.config.end_date).value
             for symbol in self.config.symbols:
                 data[symbol] = {}
                 for timeframe in self.config.timeframes:
                     file_path = data_dir / f"{symbol}_{timeframe}.csv"
                     if file_path.exists():
-                        df = pd.read_csv(file_path)
-                        df['timestamp'] = pd.to_datetime(df['timestamp'])
-                        df.set_index('timestamp', inplace=True)
-                        mask = (
-                            (df.index >= self.config.start_date) &
-                            (df.index <= self.config.end_date)
-                        )
-                        data[symbol][timeframe] = df[mask]
+                        data[symbol][timeframe] = self._read_ohlcv_csv(file_path, start, end)
         
+        self._cache_arrays(data)
         return data
     
+    def _read_ohlcv(self, conn: sqlite3.Connection, params: tuple) -> Optional[pd.DataFrame]:
+        """分块读取一组OHLCV行，按列写入float64矩阵（容量不足时倍增），最后只构建一次DataFrame
+
+        矩阵每行为一列数据，各列在内存中连续，DataFrame与数组缓存共享这块内存。
+        """
+        cursor = conn.execute(_SELECT_OHLCV_SQL, params)
+        values = np.empty((len(_OHLCV_COLUMNS), self.read_chunk_rows), dtype=np.float64)
+        timestamps = np.empty(self.read_chunk_rows, dtype=object)
+        n = 0
+        while True:
+            rows = cursor.fetchmany(self.read_chunk_rows)
+            if not rows:
+                break
+            m = len(rows)
+            if n + m > values.shape[1]:
+                capacity = max(2 * values.shape[1], n + m)
+                grown = np.empty((values.shape[0], capacity), dtype=np.float64)
+                grown[:, :n] = values[:, :n]
+                values = grown
+                grown_ts = np.empty(capacity, dtype=object)
+                grown_ts[:n] = timestamps[:n]
+                timestamps = grown_ts
+            ts, *columns = zip(*rows)
+            timestamps[n:n + m] = ts
+            # NULL按NaN读入
+            values[:, n:n + m] = np.array(columns, dtype=np.float64)
+            n += m
+        
+        if n == 0:
+            return None
+        index = pd.DatetimeIndex(pd.to_datetime(timestamps[:n], format='ISO8601'), name='timestamp')
+        return pd.DataFrame(values[:, :n].T, index=index, columns=_OHLCV_COLUMNS, copy=False)
+    
+    def _read_ohlcv_csv(self, file_path: Path, start: int, end: int) -> pd.DataFrame:
+        """用pyarrow多线程解析CSV的时间戳与OHLCV列，按int64纳秒索引二分截取[start, end]区间
+
+        截取后的各列写入与数据库路径相同的按列连续float64矩阵，不保留整表DataFrame。
+        """
+        df = pd.read_csv(
+            file_path,
+            engine='pyarrow',
+            usecols=['timestamp', *_OHLCV_COLUMNS],
+            parse_dates=['timestamp'],
+        )
+        index = pd.DatetimeIndex(df['timestamp'], name='timestamp')
+        order = None
+        if not index.is_monotonic_increasing:
+            order = np.argsort(index.asi8, kind='stable')
+            index = index[order]
+        index_i8 = index.asi8
+        lo = np.searchsorted(index_i8, start, side='left')
+        hi = np.searchsorted(index_i8, end, side='right')
+        rows = slice(lo, hi) if order is None else order[lo:hi]
+        
+        values = np.empty((len(_OHLCV_COLUMNS), hi - lo), dtype=np.float64)
+        for i, col in enumerate(_OHLCV_COLUMNS):
+            values[i] = df[col].to_numpy(dtype=np.float64)[rows]
+        return pd.DataFrame(values.T, index=index[lo:hi], columns=_OHLCV_COLUMNS, copy=False)
+    
+    def _cache_arrays(self, data: Dict[str, Dict[str, pd.DataFrame]]):
+        """缓存各(symbol, timeframe)的int64纳秒索引与各列连续的numpy数组，并重置查找游标"""
+        self._index_i8: Dict[str, Dict[str, np.ndarray]] = {}
+        self._arrays: Dict[str, Dict[str, Dict[str, np.ndarray]]] = {}
+        self._cursor: Dict[str, Dict[str, int]] = {}
+        for symbol, frames in data.items():
+            self._index_i8[symbol] = {}
+            self._arrays[symbol] = {}
+            self._cursor[symbol] = {}
+            for timeframe, df in frames.items():
+                self._index_i8[symbol][timeframe] = pd.DatetimeIndex(df.index).asi8
+                self._arrays[symbol][timeframe] = {
+                    col: np.ascontiguousarray(df[col].to_numpy(dtype=np.float64))
+                    for col in _OHLCV_COLUMNS if col in df.columns
+                }
+                self._cursor[symbol][timeframe] = -1
+    
+    def _locate(self, symbol: str, timeframe: str, t: int) -> int:
+        """时间t（纳秒）处最后一根K线的下标，无则为-1
+
+        时间前进一根K线时游标O(1)推进，跳跃或回退时二分查找。
+        """
+        index = self._index_i8[symbol][timeframe]
+        i = self._cursor[symbol][timeframe]
+        n = len(index)
+        if i + 1 < n and index[i + 1] <= t:
+            if i + 2 < n and index[i + 2] <= t:
+                i = int(np.searchsorted(index, t, side='right')) - 1
+            else:
+                i += 1
+        elif i >= 0 and index[i] > t:
+            i = int(np.searchsorted(index, t, side='right')) - 1
+        self._cursor[symbol][timeframe] = i
+        return i
+    
     def run(self) -> BacktestResult:
         """运行回测"""
         logger.info("Starting backtest...")
+        self._simulate()
+        self._flush_trades()
         
+        # 计算回测结果
+        return self._calculate_results()
+    
+    def _simulate(self):
+        """运行回测内核并写入权益、成交与回撤状态"""
         # 初始化Agent
         self._initialize_agents()
         
-        # 回测主循环
-        while self.current_time <= self.config.end_date:
-            try:
-                # 更新市场数据
-                current_data = self._get_current_data()
-                if not current_data:
-                    self.current_time += timedelta(minutes=1)
-                    continue
-                
-                # 更新持仓
-                self._update_positions(current_data)
-                
-                # 生成交易信号
-                for symbol in self.config.symbols:
-                    for agent in self.agent_system.agents.values():
-                        if agent.config.symbol == symbol:
-                            timeframe_data = self._get_timeframe_data(
-                                symbol,
-                                agent.config.timeframe,
-                                self.current_time
-                            )
-                            
-                            if timeframe_data is not None:
-                                signal = agent.analyze(timeframe_data)
-                                if signal:
-                                    self._process_signal(signal, current_data[symbol])
-                
-                # 记录权益
-                current_equity = self._calculate_total_equity(current_data)
-                self.equity_curve.append(current_equity)
-                self.equity_timestamps.append(self.current_time)
-                
-                # 更新最大回撤
-                self.peak_equity = max(self.peak_equity, current_equity)
-                self.current_drawdown = (self.peak_equity - current_equity) / self.peak_equity
-                self.max_drawdown = max(self.max_drawdown, self.current_drawdown)
-                
-                # 更新时间
-                self.current_time += timedelta(minutes=1)
-                
-            except Exception as e:
-                logger.error(f"Error in backtest loop: {str(e)}")
-                break
-        
-        # 平掉所有持仓
-        self._close_all_positions()
+        try:
+            # 预先计算分钟网格上的价格与全部信号，再由内核一次性逐分钟推进
+            grid, close = self._minute_close_matrix()
+            signals = self._collect_signals(grid)
+            funding_rates = self._funding_schedule
+            funding_bars = self.config.funding_rate_interval * 60
+            (valid, equity, realized, rejected,
+             tr_bar, tr_sym, tr_dir, tr_size, tr_price, tr_comm, tr_pnl, tr_lev, tr_reason) = _run_kernel(
+                close, *signals,
+                self.config.commission_rate, funding_rates, funding_bars, float(self.config.initial_capital)
+            )
+        except Exception as e:
+            # 不返回空结果：策略出错的回测不能被当作无交易的平稳结果
+            logger.error(f"Error in backtest loop: {str(e)}")
+            raise
+        
+        if rejected:
+            logger.warning(f"Insufficient margin for {rejected} contract orders")
+        
+        # 记录权益
+        m = int(valid.sum())
+        self._equity[1:1 + m] = equity[valid]
+        self._ts_i8[1:1 + m] = grid[valid]
+        self._eq_i = 1 + m
+        self.total_pnl = realized
+        
+        # 更新最大回撤
+        curve = self.equity_curve
+        peak = np.maximum.accumulate(curve)
+        drawdown = (peak - curve) / peak
+        self.peak_equity = float(peak[-1])
+        self.current_drawdown = float(drawdown[-1])
+        self.max_drawdown = float(drawdown.max())
         
-        # 计算回测结果
-        return self._calculate_results()
+        # 记录交易
+        trades = np.empty(len(tr_bar), dtype=_TRADE_DTYPE)
+        trades['ts'] = grid[tr_bar]
+        trades['sym'] = tr_sym
+        trades['dir'] = tr_dir
+        trades['size'] = tr_size
+        trades['price'] = tr_price
+        trades['comm'] = tr_comm
+        trades['pnl'] = tr_pnl
+        trades['lev'] = tr_lev
+        trades['reason'] = tr_reason
+        self._trades = trades
+        self._tr_i = len(trades)
+        
+        # 同步回测结束时的时间与资金费率状态
+        if len(grid):
+            self.current_time = pd.Timestamp(grid[-1]).to_pydatetime() + timedelta(minutes=1)
+            period = (len(grid) - 1) // funding_bars
+            if period:
+                self.funding_rates = dict(zip(self.config.symbols, funding_rates[period].tolist()))
+            self.next_funding_time = self.config.start_date + timedelta(
+                hours=self.config.funding_rate_interval * (period + 1)
+            )
+    
+    def _flush_trades(self, batch_size: int = 10_000) -> int:
+        """将成交记录按开平仓配对为完整交易，批量写入报告数据库"""
+        trades = self._trades[:self._tr_i]
+        if not len(trades):
+            return 0
+        
+        # 每个交易对至多一笔持仓，按交易对稳定排序后开仓、平仓记录依次交替
+        trades = trades[np.argsort(trades['sym'], kind='stable')]
+        is_open = trades['reason'] == _OPEN
+        opens, closes = trades[is_open], trades[~is_open]
+        n = min(len(opens), len(closes))
+        opens, closes = opens[:n], closes[:n]
+        
+        symbols = np.array(self.config.symbols, dtype=object)[opens['sym']]
+        directions = np.where(opens['dir'] > 0, 'buy', 'sell')
+        open_times = pd.DatetimeIndex(opens['ts']).strftime('%Y-%m-%d %H:%M:%S')
+        close_times = pd.DatetimeIndex(closes['ts']).strftime('%Y-%m-%d %H:%M:%S')
+        metadata = [
+            json.dumps({'leverage': lev, 'commission': comm, 'reason': _CLOSE_REASONS[reason]})
+            for lev, comm, reason in zip(
+                opens['lev'].tolist(), (opens['comm'] + closes['comm']).tolist(),
+                closes['reason'].tolist()
+            )
+        ]
+        rows = list(zip(
+            symbols.tolist(), directions.tolist(), open_times.tolist(), close_times.tolist(),
+            opens['price'].tolist(), closes['price'].tolist(), opens['size'].tolist(),
+            closes['pnl'].tolist(), ['backtest'] * n, metadata
+        ))
+        return self.reporting.save_trades(rows, batch_size=batch_size)
+    
+    @classmethod
+    def run_batch(cls, configs: List[BacktestConfig],
+                  max_workers: Optional[int] = None) -> List[BacktestBatchResult]:
+        """在多个进程中并行运行一组回测配置（如参数网格、逐交易对回测），结果按configs顺序返回"""
+        if not configs:
+            return []
+        
+        workers = min(max_workers or os.cpu_count() or 1, len(configs))
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(max_workers=workers,
+                                 mp_context=multiprocessing.get_context(method)) as executor:
+            return list(executor.map(
+                cls._run_one, configs,
+                chunksize=max(1, len(configs) // (4 * workers))
+            ))
+    
+    @classmethod
+    def _run_one(cls, config: BacktestConfig) -> BacktestBatchResult:
+        """工作进程入口：按调用run_batch的类构建回测（保留子类注册的Agent），
+        同一进程内相同数据范围的配置只加载一次历史数据"""
+        key = (
+            cls.__module__, cls.__qualname__,
+            tuple(config.symbols), tuple(config.timeframes),
+            config.start_date, config.end_date, config.data_source
+        )
+        system = cls(config, historical_data=_BATCH_DATA_CACHE.get(key))
+        _BATCH_DATA_CACHE[key] = system.historical_data
+        system._simulate()
+        return BacktestBatchResult(
+            config=config,
+            total_pnl=system.total_pnl,
+            max_drawdown=system.max_drawdown,
+            equity=system.equity_curve.copy(),
+            timestamps=system._ts_i8[:system._eq_i].copy(),
+            trades=system._trades[:system._tr_i].copy()
+        )
     
     def _initialize_agents(self):
         """初始化交易代理"""
         # 这里添加需要测试的交易代理
-        pass
+        
+        # 按交易对索引Agent（保持注册顺序），信号收集时无需逐个比对交易对
+        self._agents_by_symbol = defaultdict(list)
+        for agent in self.agent_system.agents.values():
+            self._agents_by_symbol[agent.config.symbol].append(agent)
     
     def _get_current_data(self) -> Optional[Dict[str, Dict]]:
         """获取当前时间点的市场数据"""
         data = {}
+        t = pd.Timestamp(self.current_time).value
         for symbol in self.config.symbols:
             # 获取1分钟数据
-            if '1m' not in self.historical_data[symbol]:
+            if '1m' not in self._arrays[symbol]:
                 continue
             
-            df = self.historical_data[symbol]['1m']
-            mask = (df.index <= self.current_time)
-            if not mask.any():
+            i = self._locate(symbol, '1m', t)
+            if i < 0:
                 continue
             
-            current = df[mask].iloc[-1]
+            columns = self._arrays[symbol]['1m']
             data[symbol] = {
-                'price': current['close'],
-                'volume': current['volume'],
-                'high': current['high'],
-                'low': current['low']
+                'price': columns['close'][i],
+                'volume': columns['volume'][i],
+                'high': columns['high'][i],
+                'low': columns['low'][i]
             }
         
         return data if data else None
     
     def _get_timeframe_data(self, symbol: str, timeframe: str,
                            current_time: datetime) -> Optional[pd.DataFrame]:
-        """获取指定时间周期的历史数据"""
-        if timeframe not in self.historical_data[symbol]:
+        """获取指定时间周期的历史数据（截至current_time的前缀视图）"""
+        if timeframe not in self._arrays[symbol]:
             return None
         
-        df = self.historical_data[symbol][timeframe]
-        mask = (df.index <= current_time)
-        if not mask.any():
+        i = self._locate(symbol, timeframe, pd.Timestamp(current_time).value)
+        if i < 0:
             return None
         
-        return df[mask]
-    
-    def _process_signal(self, signal: Dict, market_data: Dict):
-        """处理交易信号"""
-        symbol = signal['symbol']
-        direction = signal['direction']
-        size = signal['size']
-        
-        # 检查是否是合约交易
-        is_contract = signal.get('contract', False)
-        leverage = signal.get('leverage', 1.0)
-        margin_type = signal.get('margin_type', 'isolated')
-        
-        if is_contract:
-            # 检查杠杆是否超过限制
-            if leverage > self.config.max_leverage:
-                logger.warning(f"Leverage {leverage} exceeds maximum allowed {self.config.max_leverage}")
-                return
-            
-            # 计算所需保证金
-            notional_value = size * market_data['price']
-            required_margin = notional_value / leverage
-            
-            # 检查是否有足够保证金
-            if required_margin > self._calculate_free_margin():
-                logger.warning("Insufficient margin for the contract order")
-                return
-            
-            # 计算强平价格
-            liquidation_price = self._calculate_liquidation_price(
-                direction, market_data['price'], leverage, margin_type
-            )
-            
-            # 创建合约持仓
-            position = ContractBacktestPosition(
-                symbol=symbol,
-                direction=direction,
-                size=size,
-                entry_price=market_data['price'],
-                stop_loss=signal['stop_loss'],
-                take_profit=signal['take_profit'],
-                agent_name=signal.get('agent_name', 'unknown'),
-                open_time=self.current_time,
-                unrealized_pnl=0.0,
-                metadata=signal.get('metadata', {}),
-                leverage=leverage,
-                liquidation_price=liquidation_price,
-                margin_type=margin_type,
-                maintenance_margin=required_margin * self.config.min_maintenance_margin,
-                funding_rate=self.funding_rates.get(symbol, 0.0),
-                next_funding_time=self.next_funding_time,
-                notional_value=notional_value
-            )
-        else:
-            # 现货交易逻辑
-            position = BacktestPosition(
-                symbol=symbol,
-                direction=direction,
-                size=size,
-                entry_price=market_data['price'],
-                stop_loss=signal['stop_loss'],
-                take_profit=signal['take_profit'],
-                agent_name=signal.get('agent_name', 'unknown'),
-                open_time=self.current_time,
-                unrealized_pnl=0.0,
-                metadata=signal.get('metadata', {})
-            )
-        
-        # 记录交易
-        trade = {
-            'timestamp': self.current_time,
-            'symbol': symbol,
-            'direction': direction,
-            'size': size,
-            'price': market_data['price'],
-            'commission': required_margin * self.config.commission_rate if is_contract else size * market_data['price'] * self.config.commission_rate,
-            'type': 'contract' if is_contract else 'spot',
-            'leverage': leverage if is_contract else 1.0,
-            'notional_value': notional_value if is_contract else size * market_data['price']
-        }
-        self.trades_history.append(trade)
-        
-        # 添加持仓
-        self.positions[symbol] = position
+        return self.historical_data[symbol][timeframe].iloc[:i + 1]
     
-    def _update_positions(self, current_data: Dict[str, Dict]):
-        """更新持仓状态"""
-        # 检查是否需要更新资金费率
-        if self.current_time >= self.next_funding_time:
-            self._update_funding_rates()
-            self.next_funding_time += timedelta(hours=self.config.funding_rate_interval)
-        
-        for symbol, position in list(self.positions.items()):
-            if symbol not in current_data:
+    def _minute_close_matrix(self):
+        """按分钟网格（start_date至end_date）前向填充各交易对1m收盘价，无数据处为NaN"""
+        n = (self.config.end_date - self.config.start_date) // timedelta(minutes=1) + 1
+        grid = pd.Timestamp(self.config.start_date).value + np.arange(max(n, 0), dtype=np.int64) * _MINUTE_NS
+        close = np.full((len(grid), len(self.config.symbols)), np.nan)
+        for s, symbol in enumerate(self.config.symbols):
+            index = self._index_i8[symbol].get('1m')
+            if index is None or not len(index):
                 continue
+            # 每个网格分钟对应的最后一根K线（<= 当前分钟）
+            pos = np.searchsorted(index, grid, side='right') - 1
+            has = pos >= 0
+            close[has, s] = self._arrays[symbol]['1m']['close'][pos[has]]
+        return grid, close
+    
+    def _collect_signals(self, grid: np.ndarray):
+        """对每个Agent按其时间周期逐根K线运行一次决策，返回按生效分钟排序的信号数组
+
+        supports_cache为True的Agent按(交易对, 周期)共用一份增量指标，逐根K线O(1)推进；
+        其余Agent仍以截至当前K线的前缀数据调用analyze。
+        """
+        symbol_ids = {symbol: s for s, symbol in enumerate(self.config.symbols)}
+        events = []
+        for symbol in self.config.symbols:
+            agents = self._agents_by_symbol.get(symbol, [])
+            # 同一交易对下相同周期的Agent共用K线对应的网格分钟与共享指标
+            tf_bars = {}
+            streamed: Dict[str, List[int]] = defaultdict(list)
+            for k, agent in enumerate(agents):
+                if getattr(agent, 'supports_cache', False):
+                    streamed[agent.config.timeframe].append(k)
+            agent_signals: Dict[int, List[tuple]] = {}
             
-            current_price = current_data[symbol]['price']
-            position.current_price = current_price
+            for timeframe, members in streamed.items():
+                df = self.historical_data[symbol].get(timeframe)
+                if df is None or df.empty:
+                    continue
+                tf_bars[timeframe] = np.searchsorted(grid, self._index_i8[symbol][timeframe], side='left')
+                agent_signals.update(zip(members, self._stream_signals(
+                    symbol, timeframe, tf_bars[timeframe], len(grid), [agents[k] for k in members]
+                )))
             
-            if isinstance(position, ContractBacktestPosition):
-                # 更新合约持仓
-                self._update_contract_position(position, current_price)
-            else:
-                # 更新现货持仓
-                if position.direction == 'buy':
-                    position.unrealized_pnl = (current_price - position.entry_price) * position.size
+            for k, agent in enumerate(agents):
+                timeframe = agent.config.timeframe
+                df = self.historical_data[symbol].get(timeframe)
+                if df is None or df.empty:
+                    continue
+                if k in agent_signals:
+                    signals = agent_signals[k]
                 else:
-                    position.unrealized_pnl = (position.entry_price - current_price) * position.size
-            
-            # 检查止损止盈
-            if self._check_stop_loss_take_profit(position):
-                self._close_position(position, current_price, "SL/TP")
-    
-    def _update_contract_position(self, position: ContractBacktestPosition, current_price: float):
-        """更新合约持仓状态"""
-        # 更新未实现盈亏
-        if position.direction == 'buy':
-            position.unrealized_pnl = (current_price - position.entry_price) * position.size * position.leverage
-        else:
-            position.unrealized_pnl = (position.entry_price - current_price) * position.size * position.leverage
-        
-        # 检查是否触及强平价格
-        if position.direction == 'buy' and current_price <= position.liquidation_price:
-            self._close_position(position, current_price, "LIQUIDATION")
-        elif position.direction == 'sell' and current_price >= position.liquidation_price:
-            self._close_position(position, current_price, "LIQUIDATION")
-        
-        # 更新资金费用
-        if self.current_time >= position.next_funding_time:
-            funding_payment = position.notional_value * position.funding_rate
-            position.realized_pnl -= funding_payment
-            position.next_funding_time += timedelta(hours=self.config.funding_rate_interval)
-    
-    def _update_funding_rates(self):
-        """更新资金费率"""
-        # 这里可以实现更复杂的资金费率计算逻辑
-        # 目前使用简单的随机生成
-        for symbol in self.config.symbols:
-            self.funding_rates[symbol] = np.random.normal(0.0001, 0.0002)  # 均值0.01%，标准差0.02%
+                    if timeframe not in tf_bars:
+                        # K线在其时间戳之后的第一个网格分钟可见
+                        tf_bars[timeframe] = np.searchsorted(grid, self._index_i8[symbol][timeframe], side='left')
+                    bars = tf_bars[timeframe]
+                    signals = []
+                    for i in range(len(df)):
+                        if bars[i] >= len(grid):
+                            break
+                        signal = agent.analyze(df.iloc[:i + 1])
+                        if signal:
+                            signals.append((bars[i], signal))
+                for bar, signal in signals:
+                    event = self._signal_event(signal, bar, symbol_ids)
+                    if event is not None:
+                        events.append(event)
+        
+        table = np.array(events, dtype=np.float64).reshape(-1, 8)
+        # 同一分钟内保持交易对、Agent的处理顺序
+        table = table[np.argsort(table[:, 0], kind='stable')]
+        return (
+            table[:, 0].astype(np.int64), table[:, 1].astype(np.int64), table[:, 2].astype(np.int8),
+            table[:, 3].copy(), table[:, 4].copy(), table[:, 5].copy(), table[:, 6].copy(),
+            table[:, 7].copy()
+        )
     
-    def _calculate_liquidation_price(self, direction: str, entry_price: float,
-                                   leverage: float, margin_type: str) -> float:
-        """计算强平价格"""
-        maintenance_margin = self.config.min_maintenance_margin
-        
-        if direction == 'buy':
-            return entry_price * (1 - 1/leverage + maintenance_margin)
-        else:
-            return entry_price * (1 + 1/leverage - maintenance_margin)
+    def _stream_signals(self, symbol: str, timeframe: str, bars: np.ndarray, n_grid: int,
+                        agents: List[BaseAgent]) -> List[List[tuple]]:
+        """逐根K线更新一份共享IndicatorCache，并由各Agent的analyze_from_cache决策
+
+        与逐根调用analyze(df.iloc[:i + 1])等价：前一根收盘价为NaN时，analyze会按warmup_bars
+        重建指标状态，这里同样重建。返回每个Agent的[(生效分钟, 信号)]列表。
+        """
+        df = self.historical_data[symbol][timeframe]
+        for agent in agents:
+            if not all(col in df.columns for col in agent.required_columns):
+                raise ValueError(f"DataFrame must contain columns: {agent.required_columns}")
+        
+        arrays = self._arrays[symbol][timeframe]
+        columns = [col for col in OHLCVBuffer.fields if col in arrays]
+        values = [arrays[col].tolist() for col in columns]
+        closes = arrays['close']
+        index = df.index
+        warmup = max(agent.warmup_bars for agent in agents)
+        cache = IndicatorCache()
+        signals: List[List[tuple]] = [[] for _ in agents]
+        for i in range(int(np.searchsorted(bars, n_grid, side='left'))):
+            if i > 49 and closes[i - 1] != closes[i - 1]:
+                cache.reset()
+                for j in range(max(i + 1 - warmup, 0), i + 1):
+                    cache.update({col: column[j] for col, column in zip(columns, values)})
+            else:
+                cache.update({col: column[i] for col, column in zip(columns, values)})
+            cache.timestamp = index[i]
+            for k, agent in enumerate(agents):
+                signal = agent.analyze_from_cache(cache)
+                if signal:
+                    signals[k].append((bars[i], signal))
+        return signals
     
-    def _close_position(self, position: Position, current_price: float, reason: str):
-        """平仓"""
-        commission = position.size * current_price * self.config.commission_rate
-        
-        if position.direction == 'buy':
-            pnl = (current_price - position.entry_price) * position.size
-        else:
-            pnl = (position.entry_price - current_price) * position.size
-        
-        # 记录交易
-        trade = {
-            'timestamp': self.current_time,
-            'symbol': position.symbol,
-            'direction': 'sell' if position.direction == 'buy' else 'buy',
-            'size': position.size,
-            'price': current_price,
-            'commission': commission,
-            'pnl': pnl,
-            'reason': reason,
-            'type': 'close'
-        }
-        self.trades_history.append(trade)
-        
-        # 更新总盈亏
-        self.total_pnl += pnl - commission
+    def _signal_event(self, signal: TradeSignal, bar: int, symbol_ids: Dict[str, int]) -> Optional[tuple]:
+        """将交易信号转为内核输入行 (分钟, 交易对, 方向, 数量, 止损, 止盈, 杠杆, 强平系数)"""
+        symbol_id = symbol_ids.get(signal.symbol)
+        if symbol_id is None:
+            return None
         
-        # 移除持仓
-        del self.positions[position.symbol]
-    
-    def _check_stop_loss_take_profit(self, position: Position) -> bool:
-        """检查止损止盈"""
-        if position.direction == 'buy':
-            if position.current_price <= position.stop_loss:
-                return True
-            elif position.current_price >= position.take_profit:
-                return True
-        else:
-            if position.current_price >= position.stop_loss:
-                return True
-            elif position.current_price <= position.take_profit:
-                return True
+        # 检查是否是合约交易
+        metadata = signal.metadata or {}
+        leverage = 0.0
+        liq_factor = 0.0
+        if metadata.get('contract', False):
+            leverage = float(metadata.get('leverage', 1.0))
+            # 检查杠杆是否超过限制
+            if leverage > self.config.max_leverage:
+                logger.warning(f"Leverage {leverage} exceeds maximum allowed {self.config.max_leverage}")
+                return None
         
-        return False
-    
-    def _calculate_total_equity(self, current_data: Dict[str, Dict]) -> float:
-        """计算总权益"""
-        total = self.equity_curve[-1]
-        for symbol, position in self.positions.items():
-            if symbol in current_data:
-                if position.direction == 'buy':
-                    pnl = (
-                        (current_data[symbol]['price'] - position.entry_price) *
-                        position.size
-                    )
-                else:
-                    pnl = (
-                        (position.entry_price - current_data[symbol]['price']) *
-                        position.size
-                    )
-                total += pnl
-        return total
+        direction = 1 if signal.direction == 'buy' else -1
+        if leverage > 0.0:
+            liq_factor = self._liquidation_factor(direction, leverage)
+        return (bar, symbol_id, direction, signal.size, signal.stop_loss, signal.take_profit,
+                leverage, liq_factor)
     
-    def _calculate_free_margin(self) -> float:
-        """计算可用保证金"""
-        used_margin = sum(p.margin_used for p in self.positions.values())
-        return self.equity_curve[-1] - used_margin
+    def _liquidation_factor(self, direction: int, leverage: float) -> float:
+        """强平价 = 开仓价 * 系数；常用杠杆的系数已预先算好，其余杠杆首次用到时计算并缓存"""
+        factor = self._liq_factors.get((direction, leverage))
+        if factor is None:
+            mm = self.config.min_maintenance_margin
+            factor = 1 - 1 / leverage + mm if direction > 0 else 1 + 1 / leverage - mm
+            self._liq_factors[(direction, leverage)] = factor
+        return factor
     
-    def _close_all_positions(self):
-        """平掉所有持仓"""
-        for symbol, position in list(self.positions.items()):
-            current_price = self._get_current_price(symbol)
-            if current_price is not None:
-                self._close_position(position, current_price, 'BACKTEST_END')
-    
-    def _get_current_price(self, symbol: str) -> Optional[float]:
-        """获取当前价格"""
-        if symbol not in self.historical_data:
-            return None
-        
-        # 使用最小时间周期的数据
-        min_timeframe = min(self.config.timeframes)
-        if min_timeframe not in self.historical_data[symbol]:
-            return None
-        
-        df = self.historical_data[symbol][min_timeframe]
-        if self.current_time not in df.index:
-            return None
-        
-        return df.loc[self.current_time, 'close']
+    def _funding_rate_schedule(self, n_bars: int) -> np.ndarray:
+        """各资金费周期的费率表(n_periods, n_symbols)，第0行（首次更新前）为0"""
+        # 这里可以实现更复杂的资金费率计算逻辑
+        # 目前使用简单的随机生成
+        funding_bars = self.config.funding_rate_interval * 60
+        rates = np.zeros((n_bars // funding_bars + 1, len(self.config.symbols)))
+        rng = np.random.default_rng(self.config.funding_seed)
+        rates[1:] = rng.normal(0.0001, 0.0002, rates[1:].shape)  # 均值0.01%，标准差0.02%
+        return rates
     
     def _calculate_results(self) -> BacktestResult:
         """计算回测结果"""
-        equity_curve = pd.Series(self.equity_curve, index=pd.date_range(
-            self.config.start_date,
-            self.config.end_date,
-            freq='1min'
-        )[:len(self.equity_curve)])
+        equity_curve = pd.Series(self.equity_curve, index=self.equity_timestamps, copy=False)
         
-        # 计算收益率
-        returns = equity_curve.pct_change().dropna()
-        total_returns = (equity_curve[-1] - self.config.initial_capital) / self.config.initial_capital
+        # 收益率、回撤统计一次遍历得到
+        curve = self.equity_curve
+        mean_ret, std_ret, downside_std, max_drawdown, avg_drawdown, avg_dd_bars = np.array(
+            _equity_stats(curve)
+        )
+        total_returns = (curve[-1] - self.config.initial_capital) / self.config.initial_capital
         
         # 计算年化收益率
         days = (self.config.end_date - self.config.start_date).days
         annual_returns = (1 + total_returns) ** (365 / days) - 1
         
-        # 计算夏普比率
+        # 计算夏普比率与索提诺比率
         risk_free_rate = 0.02  # 假设无风险利率2%
-        excess_returns = returns - risk_free_rate/252
-        sharpe_ratio = np.sqrt(252) * excess_returns.mean() / returns.std()
-        
-        # 计算最大回撤
-        cummax = equity_curve.cummax()
-        drawdown = (cummax - equity_curve) / cummax
-        max_drawdown = drawdown.max()
-        
-        # 计算交易统计
-        trades_df = pd.DataFrame(self.trades_history)
-        if not trades_df.empty:
-            winning_trades = trades_df[trades_df['pnl'] > 0]
-            win_rate = len(winning_trades) / len(trades_df)
+        excess_mean = mean_ret - risk_free_rate/252
+        sharpe_ratio = np.sqrt(252) * excess_mean / std_ret
+        downside_std = downside_std * np.sqrt(252)
+        sortino_ratio = excess_mean * 252 / downside_std if downside_std != 0 else 0
+        
+        # 计算交易统计（开仓记录的pnl为NaN，不计入盈亏）
+        total_trades = self._tr_i
+        if total_trades:
+            pnl = self._trades['pnl'][:total_trades]
+            winning = pnl[pnl > 0]
+            win_rate = len(winning) / total_trades
             
-            total_profit = winning_trades['pnl'].sum()
-            total_loss = abs(trades_df[trades_df['pnl'] < 0]['pnl'].sum())
+            total_profit = winning.sum()
+            total_loss = abs(pnl[pnl < 0].sum())
             profit_factor = total_profit / total_loss if total_loss != 0 else float('inf')
         else:
             win_rate = 0
             profit_factor = 0
         
         # 计算月度收益率
-        monthly_returns = equity_curve.resample('M').last().pct_change()
+        monthly_returns = _monthly_returns(self._ts_i8[:self._eq_i], curve)
         
         # 计算风险指标
         risk_metrics = {
-            'volatility': returns.std() * np.sqrt(252),
-            'sortino_ratio': self._calculate_sortino_ratio(returns),
+            'volatility': std_ret * np.sqrt(252),
+            'sortino_ratio': sortino_ratio,
             'calmar_ratio': annual_returns / max_drawdown if max_drawdown != 0 else float('inf'),
-            'avg_drawdown': drawdown.mean(),
-            'avg_drawdown_days': self._calculate_avg_drawdown_days(equity_curve)
+            'avg_drawdown': avg_drawdown,
+            'avg_drawdown_days': avg_dd_bars / (24 * 60)  # 转换为天数
         }
         
         return BacktestResult(
@@ -539,42 +981,10 @@ class BacktestSystem:
             max_drawdown=max_drawdown,
             win_rate=win_rate,
             profit_factor=profit_factor,
-            total_trades=len(trades_df),
+            total_trades=total_trades,
             trades_history=self.trades_history,
             equity_curve=equity_curve,
             monthly_returns=monthly_returns,
             positions_history=list(self.positions.values()),
             risk_metrics=risk_metrics
         )
-    
-    def _calculate_sortino_ratio(self, returns: pd.Series) -> float:
-        """计算索提诺比率"""
-        risk_free_rate = 0.02  # 假设无风险利率2%
-        excess_returns = returns - risk_free_rate/252
-        downside_returns = returns[returns < 0]
-        downside_std = downside_returns.std() * np.sqrt(252)
-        
-        return excess_returns.mean() * 252 / downside_std if downside_std != 0 else 0
-    
-    def _calculate_avg_drawdown_days(self, equity_curve: pd.Series) -> float:
-        """计算平均回撤持续天数"""
-        cummax = equity_curve.cummax()
-        drawdown = (cummax - equity_curve) / cummax
-        
-        # 找到回撤开始和结束点
-        drawdown_periods = []
-        in_drawdown = False
-        start_idx = None
-        
-        for i, value in enumerate(drawdown):
-            if not in_drawdown and value > 0:
-                in_drawdown = True
-                start_idx = i
-            elif in_drawdown and value == 0:
-                in_drawdown = False
-                if start_idx is not None:
-                    drawdown_periods.append(i - start_idx)
-        
-        if drawdown_periods:
-            return np.mean(drawdown_periods) / (24 * 60)  # 转换为天数
-        return 0 
\ No newline at end of file
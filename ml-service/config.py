@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Dict, Any, Mapping
 
 class Config:
     """系统配置"""
@@ -87,32 +88,40 @@ class Config:
         "file": str(LOG_DIR / "trading_system.log")
     }
     
+    # 各配置的只读视图，读取时直接返回而不复制
+    _EXCHANGE_RO = MappingProxyType(EXCHANGE_CONFIG)
+    _MARKET_DATA_RO = MappingProxyType(MARKET_DATA_CONFIG)
+    _RISK_RO = MappingProxyType(RISK_CONFIG)
+    _CONTRACT_RO = MappingProxyType(CONTRACT_CONFIG)
+    _DB_RO = MappingProxyType(DB_CONFIG)
+    _LOG_RO = MappingProxyType(LOG_CONFIG)
+    
     @classmethod
-    def get_exchange_config(cls) -> Dict[str, Any]:
+    def get_exchange_config(cls) -> Mapping[str, Any]:
         """获取交易所配置"""
-        return cls.EXCHANGE_CONFIG.copy()
+        return cls._EXCHANGE_RO
     
     @classmethod
-    def get_market_data_config(cls) -> Dict[str, Any]:
+    def get_market_data_config(cls) -> Mapping[str, Any]:
         """获取市场数据配置"""
-        return cls.MARKET_DATA_CONFIG.copy()
+        return cls._MARKET_DATA_RO
     
     @classmethod
-    def get_risk_config(cls) -> Dict[str, Any]:
+    def get_risk_config(cls) -> Mapping[str, Any]:
         """获取风险管理配置"""
-        return cls.RISK_CONFIG.copy()
+        return cls._RISK_RO
     
     @classmethod
-    def get_contract_config(cls) -> Dict[str, Any]:
+    def get_contract_config(cls) -> Mapping[str, Any]:
         """获取合约交易配置"""
-        return cls.CONTRACT_CONFIG.copy()
+        return cls._CONTRACT_RO
     
     @classmethod
-    def get_db_config(cls) -> Dict[str, str]:
+    def get_db_config(cls) -> Mapping[str, str]:
         """获取数据库配置"""
-        return cls.DB_CONFIG.copy()
+        return cls._DB_RO
     
     @classmethod
-    def get_log_config(cls) -> Dict[str, Any]:
+    def get_log_config(cls) -> Mapping[str, Any]:
         """获取日志配置"""
-        return cls.LOG_CONFIG.copy() 
\ No newline at end of file
+        return cls._LOG_RO 
\ No newline at end of file
@@ -1,7 +1,64 @@
+import asyncio
+import os
+import sqlite3
 import aiohttp
 from datetime import datetime
 from loguru import logger
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+
+# Shared HTTP session for exchange health checks, created lazily on first use
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_session_lock = asyncio.Lock()
+# A stuck exchange must not stall the composite health check
+_HEALTH_CHECK_TIMEOUT = aiohttp.ClientTimeout(total=3)
+
+async def _get_session() -> aiohttp.ClientSession:
+    """Return the shared HTTP session, creating it if needed (sessions are bound to their event loop)"""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    async with _session_lock:
+        if _session is None or _session.closed or _session_loop is not loop:
+            _session_loop = loop
+            _session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=20, ttl_dns_cache=300),
+                timeout=_HEALTH_CHECK_TIMEOUT
+            )
+        return _session
+
+async def close_session() -> None:
+    """Close the shared HTTP session (on application shutdown)"""
+    global _session, _session_loop
+    async with _session_lock:
+        if _session is not None and not _session.closed:
+            await _session.close()
+        _session = None
+        _session_loop = None
+
+def _probe_database(db_name: str) -> Dict[str, Any]:
+    """Check that a database file exists and can be opened (blocking, run in a worker thread)"""
+    db_status = {
+        "exists": os.path.exists(db_name),
+        "connection": False,
+        "error": None
+    }
+    
+    if not db_status["exists"]:
+        logger.warning(f"Database {db_name} does not exist")
+        return db_status
+    
+    try:
+        conn = sqlite3.connect(db_name)
+        try:
+            # Reads the schema cookie from the file header without preparing a query plan
+            conn.execute("PRAGMA schema_version").fetchone()
+        finally:
+            conn.close()
+        db_status["connection"] = True
+    except sqlite3.Error as e:
+        db_status["error"] = str(e)
+        logger.error(f"Failed to connect to {db_name}: {e}")
+    return db_status
 
 async def check_database_health() -> Dict[str, Any]:
     """Check if database connections are healthy and return detailed status"""
@@ -12,35 +69,15 @@ async def check_database_health() -> Dict[str, Any]:
     }
     
     try:
-        import sqlite3
-        import os
-        
         required_dbs = ['market_data.db', 'trading_data.db', 'agent_system.db']
-        for db_name in required_dbs:
-            db_status = {
-                "exists": os.path.exists(db_name),
-                "connection": False,
-                "error": None
-            }
-            
-            if not db_status["exists"]:
-                logger.warning(f"Database {db_name} does not exist")
-                status["healthy"] = False
-            else:
-                try:
-                    conn = sqlite3.connect(db_name)
-                    cursor = conn.cursor()
-                    cursor.execute("SELECT 1")
-                    cursor.fetchone()
-                    conn.close()
-                    db_status["connection"] = True
-                except sqlite3.Error as e:
-                    db_status["error"] = str(e)
-                    db_status["connection"] = False
-                    status["healthy"] = False
-                    logger.error(f"Failed to connect to {db_name}: {e}")
-            
+        # Probe all databases concurrently off the event loop thread
+        results = await asyncio.gather(
+            *(asyncio.to_thread(_probe_database, db_name) for db_name in required_dbs)
+        )
+        for db_name, db_status in zip(required_dbs, results):
             status["databases"][db_name] = db_status
+            if not db_status["connection"]:
+                status["healthy"] = False
             
         return status
     except Exception as e:
@@ -50,7 +87,7 @@ async def check_database_health() -> Dict[str, Any]:
         status["error"] = error_msg
         return status
 
-async def check_dydx_api_health() -> Dict[str, Any]:
+async def check_dydx_api_health(session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Any]:
     """Check dYdX API health status"""
     status = {
         "healthy": False,
@@ -58,19 +95,19 @@ async def check_dydx_api_health() -> Dict[str, Any]:
         "error": None
     }
     try:
+        session = session or await _get_session()
         start_time = datetime.utcnow()
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://api.dydx.exchange/v3/markets") as response:
-                status["latency_ms"] = (datetime.utcnow() - start_time).total_seconds() * 1000
-                status["healthy"] = response.status == 200
-                if not status["healthy"]:
-                    status["error"] = f"API returned status {response.status}"
+        async with session.get("https://api.dydx.exchange/v3/markets") as response:
+            status["latency_ms"] = (datetime.utcnow() - start_time).total_seconds() * 1000
+            status["healthy"] = response.status == 200
+            if not status["healthy"]:
+                status["error"] = f"API returned status {response.status}"
     except Exception as e:
         status["error"] = str(e)
         logger.error(f"dYdX API health check failed: {e}")
     return status
 
-async def check_hyperliquid_api_health() -> Dict[str, Any]:
+async def check_hyperliquid_api_health(session: Optional[aiohttp.ClientSession] = None) -> Dict[str, Any]:
     """Check Hyperliquid API health status"""
     status = {
         "healthy": False,
@@ -78,16 +115,16 @@ async def check_hyperliquid_api_health() -> Dict[str, Any]:
         "error": None
     }
     try:
+        session = session or await _get_session()
         start_time = datetime.utcnow()
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                "https://api.hyperliquid-testnet.xyz/info",
-                json={"type": "meta"}
-            ) as response:
-                status["latency_ms"] = (datetime.utcnow() - start_time).total_seconds() * 1000
-                status["healthy"] = response.status == 200
-                if not status["healthy"]:
-                    status["error"] = f"API returned status {response.status}"
+        async with session.post(
+            "https://api.hyperliquid-testnet.xyz/info",
+            json={"type": "meta"}
+        ) as response:
+            status["latency_ms"] = (datetime.utcnow() - start_time).total_seconds() * 1000
+            status["healthy"] = response.status == 200
+            if not status["healthy"]:
+                status["error"] = f"API returned status {response.status}"
     except Exception as e:
         status["error"] = str(e)
         logger.error(f"Hyperliquid API health check failed: {e}")
@@ -102,8 +139,12 @@ async def check_market_data_health() -> Dict[str, Any]:
     }
     
     try:
-        dydx_status = await check_dydx_api_health()
-        hyperliquid_status = await check_hyperliquid_api_health()
+        # Probe both exchanges concurrently over the shared session
+        session = await _get_session()
+        dydx_status, hyperliquid_status = await asyncio.gather(
+            check_dydx_api_health(session),
+            check_hyperliquid_api_health(session)
+        )
         
         status["services"]["dydx"] = dydx_status
         status["services"]["hyperliquid"] = hyperliquid_status
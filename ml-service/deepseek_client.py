@@ -1,97 +1,39 @@
 import os
+import re
 import aiohttp
 import asyncio
 import logging
-from typing import Dict, List, Any, Optional
-import json
+import time
+from typing import Dict, List, Any, Optional, Tuple
+import orjson
 from ollama_client import OllamaClient
 
 logger = logging.getLogger(__name__)
 
-class DeepseekClient:
-    def __init__(self, api_key: Optional[str] = None):
-        self.api_key = api_key or os.getenv('DEEPSEEK_API_KEY')
-        self.base_url = "https://api.deepseek.com/v1/chat"
-        self.timeout = aiohttp.ClientTimeout(total=120)
-        try:
-            self.ollama_client = OllamaClient()
-        except Exception as e:
-            logger.warning(f"Failed to initialize Ollama client: {e}")
-            self.ollama_client = None
-        
-    async def analyze_market_sentiment(self, token_data: Dict) -> Dict[str, Any]:
-        """Analyze market sentiment using Deepseek's API"""
-        if not self.api_key:
-            logger.warning("No DeepSeek API key found")
-            raise ValueError("DeepSeek API key not configured")
-            
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json"
-        }
-        
-        # Prepare market data for analysis
-        prompt = self._create_analysis_prompt(token_data)
-        
-        try:
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.post(
-                    f"{self.base_url}/completions",
-                    headers=headers,
-                    json={
-                        "model": "deepseek-coder-33b-instruct",
-                        "messages": [
-                            {"role": "system", "content": "You are a cryptocurrency market analyst specializing in Solana meme coins. You analyze market data and provide structured JSON responses."},
-                            {"role": "user", "content": prompt}
-                        ],
-                        "temperature": 0.3,
-                        "max_tokens": 1000,
-                        "top_p": 0.8,
-                        "stream": False,
-                        "stop": ["</s>"]
-                    }
-                ) as response:
-                    if response.status != 200:
-                        raise Exception(f"Deepseek API error: {await response.text()}")
-                    
-                    result = await response.json()
-                    return self._parse_analysis_response(result)
-        except Exception as api_error:
-            print(f"DeepSeek API error: {api_error}. Attempting fallback to Ollama...")
-            if self.ollama_client and await self.ollama_client.is_available():
-                try:
-                    result = await asyncio.wait_for(
-                        self.ollama_client.analyze_market_sentiment(token_data),
-                        timeout=120
-                    )
-                    logger.info("Successfully used Ollama fallback for market analysis")
-                    return result
-                except asyncio.TimeoutError:
-                    logger.error("Ollama analysis timed out")
-                    raise api_error
-                except Exception as ollama_error:
-                    logger.error(f"Ollama fallback failed: {ollama_error}")
-                    raise api_error
-            logger.warning("Ollama not available for fallback")
-            raise api_error
-    
-    def _create_analysis_prompt(self, token_data: Dict) -> str:
-        """Create a prompt for market analysis"""
-        return f"""
+# Body of the first markdown code block, optionally tagged json, without surrounding whitespace
+_CODE_BLOCK_RE = re.compile(r"```(?:json)?\s*(.*?)\s*(?:```|$)", re.S)
+
+class _TokenFields(dict):
+    """Template fields; missing token metrics render as None"""
+    def __missing__(self, key):
+        return None
+
+# Market analysis prompt, filled per request with str.format_map
+_PROMPT_TEMPLATE = """
         Please analyze the following market data for a Solana meme coin:
         
         Price Metrics:
-        - Current Price: {token_data.get('current_price')}
-        - 24h Change: {token_data.get('price_change_24h')}%
-        - 7d Change: {token_data.get('price_change_7d')}%
+        - Current Price: {current_price}
+        - 24h Change: {price_change_24h}%
+        - 7d Change: {price_change_7d}%
         
         Volume Metrics:
-        - 24h Volume: {token_data.get('volume_24h')}
-        - Volume Change: {token_data.get('volume_change')}%
+        - 24h Volume: {volume_24h}
+        - Volume Change: {volume_change}%
         
         Market Metrics:
-        - Market Cap: {token_data.get('market_cap')}
-        - Holders: {token_data.get('holders')}
+        - Market Cap: {market_cap}
+        - Holders: {holders}
         
         Please analyze this data and provide a response in the following JSON format:
         {{
@@ -121,46 +63,288 @@ class DeepseekClient:
 
         Ensure your response is a valid JSON object with all fields properly formatted.
         """
+
+class DeepseekClient:
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or os.getenv('DEEPSEEK_API_KEY')
+        self.base_url = "https://api.deepseek.com/v1/chat"
+        self.timeout = aiohttp.ClientTimeout(total=120)
+        self.headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+        # Keep-alive connections are reused across requests
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        # Last health probe result: (checked_at, healthy)
+        self.health_ttl = 30.0  # seconds
+        self._health: Optional[Tuple[float, bool]] = None
+        self._health_lock = asyncio.Lock()
+        # Seconds to wait for DeepSeek before also asking Ollama
+        self.hedge_delay = 2.0
+        # Ollama fallback client, created on first use
+        self._ollama_client: Optional[OllamaClient] = None
+        self._ollama_loaded = False
+        # Last Ollama availability check: (checked_at, available)
+        self.ollama_ttl = 5.0  # seconds
+        self._ollama_avail: Optional[Tuple[float, bool]] = None
+        self._ollama_lock = asyncio.Lock()
+
+    @property
+    def ollama_client(self) -> Optional[OllamaClient]:
+        """Ollama fallback client, or None if it could not be created"""
+        if not self._ollama_loaded:
+            self._ollama_loaded = True
+            try:
+                self._ollama_client = OllamaClient()
+            except Exception as e:
+                logger.warning(f"Failed to initialize Ollama client: {e}")
+                self._ollama_client = None
+        return self._ollama_client
+
+    @ollama_client.setter
+    def ollama_client(self, client: Optional[OllamaClient]) -> None:
+        self._ollama_client = client
+        self._ollama_loaded = True
+        self._ollama_avail = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled HTTP session, creating it on first use (sessions are bound to their event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session_loop = loop
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(
+                    limit=100, limit_per_host=32, ttl_dns_cache=300, keepalive_timeout=75
+                )
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+        
+    async def analyze_market_sentiment(self, token_data: Dict) -> Dict[str, Any]:
+        """Analyze market sentiment using Deepseek's API
+
+        If DeepSeek has not answered within hedge_delay seconds, the Ollama fallback is
+        started alongside it and the first successful answer wins; the other is cancelled.
+        A DeepSeek failure before that falls back to Ollama as before.
+        """
+        if not self.api_key:
+            logger.warning("No DeepSeek API key found")
+            raise ValueError("DeepSeek API key not configured")
+        
+        deepseek_task = asyncio.create_task(self._request_analysis(token_data))
+        ollama_task: Optional[asyncio.Task] = None
+        try:
+            done, _ = await asyncio.wait({deepseek_task}, timeout=self.hedge_delay)
+            if not done and await self._ollama_available() and not deepseek_task.done():
+                ollama_task = asyncio.create_task(self._ollama_analysis(token_data))
+                pending = {deepseek_task, ollama_task}
+                while pending:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        if task.exception() is None:
+                            if task is ollama_task:
+                                logger.info("Ollama answered before DeepSeek (hedged request)")
+                            return task.result()
+                # Both providers failed
+                ollama_error = ollama_task.exception()
+                if isinstance(ollama_error, asyncio.TimeoutError):
+                    logger.error("Ollama analysis timed out")
+                else:
+                    logger.error(f"Ollama fallback failed: {ollama_error}")
+                raise deepseek_task.exception()
+            
+            try:
+                return await deepseek_task
+            except Exception as api_error:
+                print(f"DeepSeek API error: {api_error}. Attempting fallback to Ollama...")
+                if await self._ollama_available():
+                    try:
+                        result = await self._ollama_analysis(token_data)
+                        logger.info("Successfully used Ollama fallback for market analysis")
+                        return result
+                    except asyncio.TimeoutError:
+                        logger.error("Ollama analysis timed out")
+                        raise api_error
+                    except Exception as ollama_error:
+                        logger.error(f"Ollama fallback failed: {ollama_error}")
+                        raise api_error
+                logger.warning("Ollama not available for fallback")
+                raise api_error
+        finally:
+            for task in (deepseek_task, ollama_task):
+                if task is not None and not task.done():
+                    task.cancel()
+    
+    async def analyze_many(self, token_batch: List[Dict]) -> List[Optional[Dict[str, Any]]]:
+        """Analyze several tokens concurrently over the pooled session
+
+        Results keep the order of token_batch; a token whose analysis failed (including
+        the Ollama fallback) yields None.
+        """
+        results = await asyncio.gather(
+            *(self.analyze_market_sentiment(token_data) for token_data in token_batch),
+            return_exceptions=True
+        )
+        analyses: List[Optional[Dict[str, Any]]] = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Market analysis failed: {result}")
+                analyses.append(None)
+            else:
+                analyses.append(result)
+        return analyses
+    
+    async def _request_analysis(self, token_data: Dict) -> Dict[str, Any]:
+        """Request a market analysis from DeepSeek and parse the streamed reply"""
+        # Prepare market data for analysis
+        prompt = self._create_analysis_prompt(token_data)
+        
+        session = await self._get_session()
+        async with session.post(
+            f"{self.base_url}/completions",
+            headers=self.headers,
+            json={
+                "model": "deepseek-coder-33b-instruct",
+                "messages": [
+                    {"role": "system", "content": "You are a cryptocurrency market analyst specializing in Solana meme coins. You analyze market data and provide structured JSON responses."},
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.3,
+                "max_tokens": 1000,
+                "top_p": 0.8,
+                "stream": True,
+                "stop": ["</s>"]
+            }
+        ) as response:
+            if response.status != 200:
+                raise Exception(f"Deepseek API error: {await response.text()}")
+            
+            content = await self._read_streamed_content(response)
+            return self._parse_analysis_response(content)
+    
+    async def _ollama_available(self) -> bool:
+        """Report whether the Ollama fallback can be used
+
+        The result is reused for ollama_ttl seconds and concurrent callers share a single
+        in-flight check, so a burst of DeepSeek failures does not flood Ollama with probes.
+        """
+        if self.ollama_client is None:
+            return False
+        
+        avail = self._ollama_avail
+        if avail is not None and time.monotonic() - avail[0] < self.ollama_ttl:
+            return avail[1]
+        async with self._ollama_lock:
+            avail = self._ollama_avail
+            if avail is not None and time.monotonic() - avail[0] < self.ollama_ttl:
+                return avail[1]
+            try:
+                available = await self.ollama_client.is_available()
+            except Exception as e:
+                logger.error(f"Ollama availability check failed: {e}")
+                available = False
+            self._ollama_avail = (time.monotonic(), available)
+            return available
+
+    async def _ollama_analysis(self, token_data: Dict) -> Dict[str, Any]:
+        """Run the market analysis on the local Ollama model"""
+        return await asyncio.wait_for(
+            self.ollama_client.analyze_market_sentiment(token_data),
+            timeout=120
+        )
+    
+    def _create_analysis_prompt(self, token_data: Dict) -> str:
+        """Create a prompt for market analysis"""
+        return _PROMPT_TEMPLATE.format_map(_TokenFields(token_data))
     
     async def check_health(self) -> bool:
-        """Check if Deepseek API is healthy and accessible"""
+        """Check if Deepseek API is healthy and accessible
+
+        The probe is a real completion request, so its result is reused for health_ttl
+        seconds and concurrent callers share a single in-flight probe.
+        """
         if not self.api_key:
             return False
-            
+        
+        health = self._health
+        if health is not None and time.monotonic() - health[0] < self.health_ttl:
+            return health[1]
+        async with self._health_lock:
+            health = self._health
+            if health is not None and time.monotonic() - health[0] < self.health_ttl:
+                return health[1]
+            healthy = await self._probe_health()
+            self._health = (time.monotonic(), healthy)
+            return healthy
+
+    async def _probe_health(self) -> bool:
+        """Send a minimal completion request and report whether it succeeded"""
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            async with aiohttp.ClientSession(timeout=self.timeout) as session:
-                async with session.post(
-                    f"{self.base_url}/completions",
-                    headers=headers,
-                    json={
-                        "model": "deepseek-coder-33b-instruct",
-                        "messages": [{"role": "system", "content": "health check"}],
-                        "max_tokens": 1
-                    }
-                ) as response:
-                    return response.status == 200
+            session = await self._get_session()
+            async with session.post(
+                f"{self.base_url}/completions",
+                headers=self.headers,
+                json={
+                    "model": "deepseek-coder-33b-instruct",
+                    "messages": [{"role": "system", "content": "health check"}],
+                    "max_tokens": 1
+                }
+            ) as response:
+                return response.status == 200
         except Exception as e:
             logger.error(f"Deepseek health check failed: {e}")
             return False
             
-    def _parse_analysis_response(self, response: Dict) -> Dict:
-        """Parse the Deepseek API response into structured data"""
+    async def _read_streamed_content(self, response: aiohttp.ClientResponse) -> str:
+        """Collect the message content from a streamed (SSE) completion
+
+        Content deltas are kept in a list and joined only when a delta ends with '}';
+        reading stops as soon as the analysis JSON parses, without waiting for [DONE].
+        """
+        parts: List[str] = []
+        async for line in response.content:
+            if not line.startswith(b'data:'):
+                continue
+            payload = line[5:].strip()
+            if payload == b'[DONE]':
+                break
+            try:
+                delta = orjson.loads(payload)['choices'][0]['delta'].get('content')
+            except (KeyError, IndexError, orjson.JSONDecodeError):
+                continue
+            if not delta:
+                continue
+            parts.append(delta)
+            if delta.rstrip().endswith('}'):
+                content = ''.join(parts)
+                try:
+                    orjson.loads(self._strip_code_block(content))
+                except orjson.JSONDecodeError:
+                    continue
+                return content
+        return ''.join(parts)
+
+    @staticmethod
+    def _strip_code_block(content: str) -> str:
+        """Extract JSON from a markdown code block, if the content is wrapped in one
+
+        An unterminated block (content still streaming) runs to the end of the text.
+        """
+        match = _CODE_BLOCK_RE.search(content)
+        return match.group(1) if match else content.strip()
+
+    def _parse_analysis_response(self, content: str) -> Dict:
+        """Parse the Deepseek completion content into structured data"""
         try:
-            content = response['choices'][0]['message']['content']
-            content = content.strip()
-            
-            # Handle potential JSON within markdown code blocks
-            if '```json' in content:
-                content = content.split('```json')[1].split('```')[0].strip()
-            elif '```' in content:
-                content = content.split('```')[1].split('```')[0].strip()
-                
-            analysis = json.loads(content)
+            analysis = orjson.loads(self._strip_code_block(content))
             
             # Validate numeric fields
             risk_level = analysis.get('risk_level')
@@ -171,25 +355,29 @@ class DeepseekClient:
             if not isinstance(confidence, (int, float)) or confidence < 0 or confidence > 1:
                 confidence = 0.5
                 
+            # Resolve each nested object once
+            prediction = analysis.get('short_term_prediction', {})
+            key_levels = prediction.get('key_levels', {})
+            risk_analysis = analysis.get('risk_analysis', {})
             return {
                 'sentiment': analysis.get('market_sentiment', 'neutral'),
                 'risk_level': float(risk_level),
                 'price_prediction': {
-                    'target': analysis.get('short_term_prediction', {}).get('target_price'),
-                    'timeframe': analysis.get('short_term_prediction', {}).get('timeframe'),
-                    'support': analysis.get('short_term_prediction', {}).get('key_levels', {}).get('support'),
-                    'resistance': analysis.get('short_term_prediction', {}).get('key_levels', {}).get('resistance')
+                    'target': prediction.get('target_price'),
+                    'timeframe': prediction.get('timeframe'),
+                    'support': key_levels.get('support'),
+                    'resistance': key_levels.get('resistance')
                 },
                 'key_factors': analysis.get('key_factors', []),
                 'recommendation': analysis.get('trading_recommendation', 'HOLD'),
                 'confidence': float(confidence),
                 'risk_analysis': {
-                    'manipulation_risk': analysis.get('risk_analysis', {}).get('market_manipulation_risk', 'medium'),
-                    'liquidity_risk': analysis.get('risk_analysis', {}).get('liquidity_risk', 'medium'),
-                    'volatility_risk': analysis.get('risk_analysis', {}).get('volatility_risk', 'medium')
+                    'manipulation_risk': risk_analysis.get('market_manipulation_risk', 'medium'),
+                    'liquidity_risk': risk_analysis.get('liquidity_risk', 'medium'),
+                    'volatility_risk': risk_analysis.get('volatility_risk', 'medium')
                 }
             }
-        except (KeyError, json.JSONDecodeError, ValueError) as e:
+        except (KeyError, orjson.JSONDecodeError, ValueError) as e:
             logger.error(f"Failed to parse analysis response: {e}")
             return {
                 'sentiment': 'neutral',
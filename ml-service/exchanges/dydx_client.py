@@ -1,7 +1,11 @@
 import aiohttp
 import asyncio
+import random
+import time
 from typing import Dict, Optional
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+
+_EPOCH_UTC = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
 class DydxClient:
     def __init__(self, api_key: Optional[str] = None, api_secret: Optional[str] = None):
@@ -10,62 +14,82 @@ class DydxClient:
         self.api_key = api_key
         self.api_secret = api_secret
         self.base_url = "https://api.dydx.exchange"
+        self.max_retries = 3
+        self.retry_delay = 1  # seconds, doubled on each retry
+        self.max_retry_delay = 10
+        # Keep-alive connections are reused across requests
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
         self.headers = {
             "DYDX-API-KEY": self.api_key,
-            "DYDX-TIMESTAMP": str(int(datetime.now().timestamp() * 1000)),
             "DYDX-SIGNATURE": "",
             "DYDX-PASSPHRASE": "",
         }
         
-    async def get_funding_rate(self, market: str) -> Dict:
-        max_retries = 3
-        retry_delay = 1
-        for attempt in range(max_retries):
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled HTTP session, creating it on first use (sessions are bound to their event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session_loop = loop
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=100, limit_per_host=32, ttl_dns_cache=300, keepalive_timeout=75
+                )
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    async def _request(self, path: str) -> Dict:
+        """GET a dYdX endpoint over the pooled session
+
+        Connection errors, timeouts and 429/5xx responses are retried with exponential
+        backoff plus jitter; other error statuses fail immediately.
+        """
+        error: Exception = Exception("dYdX API request not attempted")
+        for attempt in range(self.max_retries):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        f"{self.base_url}/v3/markets/{market}",
-                        headers=self.headers
-                    ) as response:
-                        if response.status != 200:
-                            raise Exception(f"dYdX API error: {await response.text()}")
-                        data = await response.json()
-                        return {
-                            'funding_rate': float(data['market']['nextFundingRate']),
-                            'mark_price': float(data['market']['oraclePrice']),
-                            'index_price': float(data['market']['indexPrice']),
-                            'next_funding_time': datetime.fromtimestamp(
-                                int(data['market']['nextFundingAt']),
-                                tz=timezone.utc
-                            )
-                        }
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise Exception(f"Failed to fetch funding rate after {max_retries} attempts: {str(e)}")
-                await asyncio.sleep(retry_delay)
-        return {
-            'funding_rate': 0.0,
-            'mark_price': 0.0,
-            'index_price': 0.0,
-            'next_funding_time': datetime.now(timezone.utc)
-        }
+                session = await self._get_session()
+                headers = {**self.headers, "DYDX-TIMESTAMP": str(time.time_ns() // 1_000_000)}
+                async with session.get(f"{self.base_url}{path}", headers=headers) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    error = Exception(f"dYdX API error: {await response.text()}")
+                    if response.status != 429 and response.status < 500:
+                        raise error
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = e
+            if attempt < self.max_retries - 1:
+                delay = min(self.retry_delay * 2 ** attempt, self.max_retry_delay)
+                await asyncio.sleep(delay + random.uniform(0, self.retry_delay))
+        raise error
+
+    async def get_funding_rate(self, market: str) -> Dict:
+        try:
+            data = await self._request(f"/v3/markets/{market}")
+            market_data = data['market']
+            funding_rate, mark_price, index_price = map(float, (
+                market_data['nextFundingRate'],
+                market_data['oraclePrice'],
+                market_data['indexPrice'],
+            ))
+            return {
+                'funding_rate': funding_rate,
+                'mark_price': mark_price,
+                'index_price': index_price,
+                'next_funding_time': _EPOCH_UTC + timedelta(seconds=int(market_data['nextFundingAt']))
+            }
+        except Exception as e:
+            raise Exception(f"Failed to fetch funding rate: {str(e)}")
     
     async def get_open_interest(self, market: str) -> float:
-        max_retries = 3
-        retry_delay = 1
-        for attempt in range(max_retries):
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(
-                        f"{self.base_url}/v3/markets/{market}/stats",
-                        headers=self.headers
-                    ) as response:
-                        if response.status != 200:
-                            raise Exception(f"dYdX API error: {await response.text()}")
-                        data = await response.json()
-                        return float(data['markets']['openInterest'])
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise Exception(f"Failed to fetch open interest after {max_retries} attempts: {str(e)}")
-                await asyncio.sleep(retry_delay)
-        return 0.0
+        try:
+            data = await self._request(f"/v3/markets/{market}/stats")
+            return float(data['markets']['openInterest'])
+        except Exception as e:
+            raise Exception(f"Failed to fetch open interest: {str(e)}")
@@ -1,6 +1,7 @@
 import aiohttp
 import asyncio
-from typing import Dict, Optional
+import time
+from typing import Dict, Optional, Tuple
 from datetime import datetime, timezone
 
 class HyperliquidClient:
@@ -15,34 +16,80 @@ class HyperliquidClient:
         self.use_testnet = True  # Default to testnet for safety
         self.max_retries = 3
         self.retry_delay = 1  # seconds
+        # /info universe indexed by market name: (fetched_at, url, index), shared by all lookups
+        self.info_ttl = 2.0  # seconds
+        self._info_cache: Optional[Tuple[float, str, Dict[str, Dict]]] = None
+        self._info_lock = asyncio.Lock()
+        # Keep-alive connections are reused across requests
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
         self.headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
             "Authorization": f"Bearer {api_key}"
         }
     
-    async def get_funding_rate(self, market: str) -> Dict:
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled HTTP session, creating it on first use (sessions are bound to their event loop)"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._session_loop = loop
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=100, limit_per_host=32, ttl_dns_cache=300, keepalive_timeout=75
+                )
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """Close the pooled HTTP session"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+
+    def _cached_universe(self, url: str) -> Optional[Dict[str, Dict]]:
+        cached = self._info_cache
+        if cached is not None and cached[1] == url and time.monotonic() - cached[0] < self.info_ttl:
+            return cached[2]
+        return None
+
+    async def _get_universe_index(self) -> Dict[str, Dict]:
+        """Markets from the /info universe keyed by name, refreshed at most every info_ttl seconds
+
+        Concurrent callers wait for a single in-flight refresh instead of each fetching /info.
+        """
         url = self.testnet_url if self.use_testnet else self.mainnet_url
+        index = self._cached_universe(url)
+        if index is not None:
+            return index
+        async with self._info_lock:
+            index = self._cached_universe(url)
+            if index is not None:
+                return index
+            session = await self._get_session()
+            async with session.get(url, headers=self.headers) as response:
+                if response.status != 200:
+                    raise Exception(f"Hyperliquid API error: {await response.text()}")
+                data = await response.json()
+            # Keep the first entry for a repeated name, as a linear scan would
+            index = {m['name']: m for m in reversed(data['universe'])}
+            self._info_cache = (time.monotonic(), url, index)
+            return index
+
+    async def get_funding_rate(self, market: str) -> Dict:
         for attempt in range(self.max_retries):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, headers=self.headers) as response:
-                        if response.status != 200:
-                            raise Exception(f"Hyperliquid API error: {await response.text()}")
-                        data = await response.json()
-                        market_data = next(
-                            (m for m in data['universe'] if m['name'] == market),
-                            None
-                        )
-                        if not market_data:
-                            raise Exception(f"Market {market} not found")
-                        
-                        return {
-                            'funding_rate': float(market_data['funding']),
-                            'mark_price': float(market_data['markPrice']),
-                            'index_price': float(market_data['indexPrice']),
-                            'next_funding_time': datetime.now(timezone.utc)
-                        }
+                market_data = (await self._get_universe_index()).get(market)
+                if not market_data:
+                    raise Exception(f"Market {market} not found")
+                
+                return {
+                    'funding_rate': float(market_data['funding']),
+                    'mark_price': float(market_data['markPrice']),
+                    'index_price': float(market_data['indexPrice']),
+                    'next_funding_time': datetime.now(timezone.utc)
+                }
             except Exception as e:
                 if attempt == self.max_retries - 1:
                     raise Exception(f"Failed to fetch funding rate after {self.max_retries} attempts: {str(e)}")
@@ -55,21 +102,12 @@ class HyperliquidClient:
         }
     
     async def get_open_interest(self, market: str) -> float:
-        url = self.testnet_url if self.use_testnet else self.mainnet_url
         for attempt in range(self.max_retries):
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, headers=self.headers) as response:
-                        if response.status != 200:
-                            raise Exception(f"Hyperliquid API error: {await response.text()}")
-                        data = await response.json()
-                        market_data = next(
-                            (m for m in data['universe'] if m['name'] == market),
-                            None
-                        )
-                        if not market_data:
-                            raise Exception(f"Market {market} not found")
-                        return float(market_data['openInterest'])
+                market_data = (await self._get_universe_index()).get(market)
+                if not market_data:
+                    raise Exception(f"Market {market} not found")
+                return float(market_data['openInterest'])
             except Exception as e:
                 if attempt == self.max_retries - 1:
                     raise Exception(f"Failed to fetch open interest after {self.max_retries} attempts: {str(e)}")
@@ -38,7 +38,8 @@ from database.health import (
     check_database_health,
     check_market_data_health,
     check_dydx_api_health,
-    check_hyperliquid_api_health
+    check_hyperliquid_api_health,
+    close_session as close_health_session
 )
 
 class ServiceStatus(Enum):
@@ -335,6 +336,13 @@ async def startup_event():
     for route in app.routes:
         print(f"{route.path} [{','.join(route.methods)}]")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release shared resources on application shutdown"""
+    await close_health_session()
+    if deepseek is not None:
+        await deepseek.close()
+
 
 class PredictionRequest(BaseModel):
     token_address: str
@@ -612,28 +612,33 @@ class MarketDataService:
             dydx = DydxClient(self.config.api_key, self.config.api_secret)
             hyperliquid = HyperliquidClient(self.config.api_key, self.config.api_secret)
             
-            # Try dYdX first
             try:
-                data = await dydx.get_funding_rate(symbol)
-                if data:
-                    data['exchange'] = 'dydx'
-                    data['open_interest'] = await dydx.get_open_interest(symbol)
-                    logger.info(f"Successfully fetched dYdX data for {symbol}")
-                    return data
-            except Exception as e:
-                logger.warning(f"Failed to fetch dYdX data for {symbol}: {str(e)}")
+                # Try dYdX first
+                try:
+                    data = await dydx.get_funding_rate(symbol)
+                    if data:
+                        data['exchange'] = 'dydx'
+                        data['open_interest'] = await dydx.get_open_interest(symbol)
+                        logger.info(f"Successfully fetched dYdX data for {symbol}")
+                        return data
+                except Exception as e:
+                    logger.warning(f"Failed to fetch dYdX data for {symbol}: {str(e)}")
             
-            # Try Hyperliquid as fallback
-            try:
-                data = await hyperliquid.get_funding_rate(symbol)
-                if data:
-                    data['exchange'] = 'hyperliquid'
-                    data['open_interest'] = await hyperliquid.get_open_interest(symbol)
-                    logger.info(f"Successfully fetched Hyperliquid data for {symbol}")
-                    return data
-            except Exception as e:
-                logger.error(f"Failed to fetch Hyperliquid data for {symbol}: {str(e)}")
-                return None
+                # Try Hyperliquid as fallback
+                try:
+                    data = await hyperliquid.get_funding_rate(symbol)
+                    if data:
+                        data['exchange'] = 'hyperliquid'
+                        data['open_interest'] = await hyperliquid.get_open_interest(symbol)
+                        logger.info(f"Successfully fetched Hyperliquid data for {symbol}")
+                        return data
+                except Exception as e:
+                    logger.error(f"Failed to fetch Hyperliquid data for {symbol}: {str(e)}")
+                    return None
+            finally:
+                # 同一交易所的资金费率与持仓量请求复用会话连接，结束后释放
+                await dydx.close()
+                await hyperliquid.close()
                 
         except Exception as e:
             logger.error(f"Error fetching perpetual data for {symbol}: {str(e)}")
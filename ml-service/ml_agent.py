@@ -3,7 +3,7 @@ import numpy as np
 import pandas as pd
 from typing import Dict, Optional
 from datetime import datetime
-from agent_system import BaseAgent, TradeSignal, AgentConfig
+from agent_system import BaseAgent, TradeSignal, AgentConfig, calculate_atr, latest_sma
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,12 +27,11 @@ class DeepSeekAgent(BaseAgent):
     
     def _prepare_market_data(self, data: pd.DataFrame) -> str:
         """准备市场数据文本"""
-        # 计算技术指标
-        data['sma20'] = data['close'].rolling(window=20).mean()
-        data['sma50'] = data['close'].rolling(window=50).mean()
-        data['rsi'] = self._calculate_rsi(data['close'])
-        data['atr'] = self._calculate_atr(data)
-        data['volume_sma'] = data['volume'].rolling(window=20).mean()
+        # 计算技术指标（只读取末值，仅对所需的尾部窗口计算）
+        sma20 = latest_sma(data['close'], 20)
+        sma50 = latest_sma(data['close'], 50)
+        rsi = self._calculate_rsi(data['close'].iloc[-15:]).iloc[-1]
+        volume_sma = latest_sma(data['volume'], 20)
         
         # 获取最近的数据点
         recent_data = data.tail(5)
@@ -41,7 +40,7 @@ class DeepSeekAgent(BaseAgent):
         # 计算市场趋势
         trend = "上升" if trend_data['close'].iloc[-1] > trend_data['close'].iloc[0] else "下降"
         volatility = data['close'].pct_change().std() * np.sqrt(252)
-        volume_trend = "放大" if recent_data['volume'].mean() > data['volume_sma'].iloc[-1] else "减小"
+        volume_trend = "放大" if recent_data['volume'].mean() > volume_sma else "减小"
         
         # 构建提示文本
         prompt = f"""分析以下{self.config.symbol}市场数据并提供交易建议：
@@ -50,9 +49,9 @@ class DeepSeekAgent(BaseAgent):
 - 当前趋势：{trend}
 - 波动率：{volatility:.2%}
 - 成交量趋势：{volume_trend}
-- RSI：{data['rsi'].iloc[-1]:.2f}
-- 20日均线：{data['sma20'].iloc[-1]:.2f}
-- 50日均线：{data['sma50'].iloc[-1]:.2f}
+- RSI：{rsi:.2f}
+- 20日均线：{sma20:.2f}
+- 50日均线：{sma50:.2f}
 
 最近5根K线数据：
 """
@@ -140,6 +139,7 @@ TAKE_PROFIT: [建议止盈价格]
         try:
             # 准备输入数据
             prompt = self._prepare_market_data(data)
+            volume_sma = latest_sma(data['volume'], 20)
             
             # Prepare market data for analysis
             market_data = {
@@ -148,7 +148,7 @@ TAKE_PROFIT: [建议止盈价格]
                 'price_change_24h': data['close'].pct_change(24).iloc[-1] * 100,
                 'price_change_7d': data['close'].pct_change(7).iloc[-1] * 100,
                 'volume_24h': data['volume'].iloc[-1],
-                'volume_change': (data['volume'].iloc[-1] / data['volume_sma'].iloc[-1] - 1) * 100,
+                'volume_change': (data['volume'].iloc[-1] / volume_sma - 1) * 100,
                 'market_cap': data['close'].iloc[-1] * data['volume'].iloc[-1],
                 'holders': 5000
             }
@@ -169,9 +169,8 @@ TAKE_PROFIT: [建议止盈价格]
                 return None
             
             # 计算技术指标
-            data['atr'] = self._calculate_atr(data)
             current_price = data['close'].iloc[-1]
-            atr = data['atr'].iloc[-1]
+            atr = self._calculate_atr(data.iloc[-15:]).iloc[-1]
             
             # 根据预测生成信号
             if prediction and prediction.get('sentiment') in ['bullish', 'bearish'] and \
@@ -216,18 +215,7 @@ TAKE_PROFIT: [建议止盈价格]
     
     def _calculate_atr(self, data: pd.DataFrame, period: int = 14) -> pd.Series:
         """计算ATR指标"""
-        high = data['high']
-        low = data['low']
-        close = data['close']
-        
-        tr1 = high - low
-        tr2 = abs(high - close.shift())
-        tr3 = abs(low - close.shift())
-        
-        tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr = tr.rolling(window=period).mean()
-        
-        return atr
+        return calculate_atr(data['high'], data['low'], data['close'], period)
     
     def _calculate_rsi(self, prices: pd.Series, period: int = 14) -> pd.Series:
         """计算RSI指标"""
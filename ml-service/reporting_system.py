@@ -57,6 +57,9 @@ class ReportingSystem:
     def _initialize_database(self):
         """初始化数据库表"""
         with sqlite3.connect(self.db_path) as conn:
+            # WAL模式持久保存在数据库文件中，设置一次即可
+            conn.execute("PRAGMA journal_mode=WAL")
+            
             # 执行报告表
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS execution_reports (
@@ -223,6 +226,33 @@ class ReportingSystem:
         except Exception as e:
             logger.error(f"Error saving trade: {str(e)}")
     
+    def save_trades(self, rows: List[tuple], batch_size: int = 10_000) -> int:
+        """批量保存交易记录，返回写入行数
+
+        rows按trades表列顺序（symbol, direction, open_time, close_time, entry_price,
+        exit_price, size, pnl, agent_name, metadata）给出，每batch_size行一次executemany，
+        全部在同一事务中提交。
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                conn.execute("PRAGMA synchronous=NORMAL")
+                for i in range(0, len(rows), batch_size):
+                    conn.executemany("""
+                        INSERT INTO trades (
+                            symbol, direction, open_time, close_time,
+                            entry_price, exit_price, size, pnl,
+                            agent_name, metadata
+                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, rows[i:i + batch_size])
+                conn.commit()
+            
+            logger.info(f"Saved {len(rows)} trade records")
+            return len(rows)
+            
+        except Exception as e:
+            logger.error(f"Error saving trades: {str(e)}")
+            return 0
+    
     def generate_daily_report(self, date: datetime) -> Dict:
         """生成每日报告"""
         try:
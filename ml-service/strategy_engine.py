@@ -2,10 +2,11 @@ import json
 import logging
 import numpy as np
 import pandas as pd
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 
+from streaming_indicators import StreamingEMA, StreamingRSI, StreamingSMA
 from technical_analysis import TechnicalAnalysis
 from market_analyzer import MarketAnalyzer
 
@@ -27,6 +28,15 @@ class StrategyConfig:
     take_profit: float
     max_positions: int
     risk_per_trade: float
+    risk_management: Dict = field(default_factory=dict)
+
+@dataclass
+class Signal:
+    """Trading signal consumed by the backtest engine"""
+    symbol: str
+    side: str  # 'BUY' or 'SELL'
+    price: float
+    timestamp: Optional[datetime] = None
 
 @dataclass
 class Position:
@@ -40,14 +50,36 @@ class Position:
     pnl: float = 0.0
     status: str = "open"
 
+@dataclass(slots=True)
+class IndicatorState:
+    """Latest two values of an indicator, advanced one bar at a time"""
+    calculator: Optional[object] = None  # streaming calculator, None = recompute from history
+    previous: float = np.nan
+    current: float = np.nan
+
+    def push(self, value: float):
+        self.previous = self.current
+        self.current = value
+
 class StrategyEngine:
+    # Indicators with an O(1) per-bar update; built the same way TechnicalAnalysis builds them
+    STREAMING_INDICATORS = {
+        "sma": lambda config: StreamingSMA(config.get("period", 20)),
+        "ema": lambda config: StreamingEMA(config.get("period", 20)),
+        "rsi": lambda config: StreamingRSI(),
+    }
+
     def __init__(self, config: StrategyConfig):
         self.config = config
         self.positions: Dict[str, Position] = {}
         self.ta = TechnicalAnalysis()
         self.analyzer = MarketAnalyzer()
         self.historical_data: Dict[str, pd.DataFrame] = {}
-        self.indicators: Dict[str, Dict] = {}
+        self.indicators: Dict[str, Dict[str, IndicatorState]] = {}
+        # Only indicators without a streaming update need the price history
+        self._needs_history = any(
+            name not in self.STREAMING_INDICATORS for name in config.indicators
+        )
         
     def initialize(self):
         """Initialize strategy with historical data and indicators"""
@@ -55,24 +87,31 @@ class StrategyEngine:
             # Load historical data
             self.historical_data[symbol] = self._load_historical_data(symbol)
             
-            # Calculate indicators
-            self.indicators[symbol] = {}
-            for ind_name, ind_config in self.config.indicators.items():
-                self.indicators[symbol][ind_name] = self._calculate_indicator(
-                    symbol, ind_name, ind_config
-                )
+            # Warm up indicator state from history once
+            self.indicators[symbol] = self._new_indicator_state()
+            history = self.historical_data[symbol]
+            if "price" in history.columns:
+                for price in history["price"].to_numpy(dtype=np.float64):
+                    self._advance_streaming(symbol, price)
+            self._recompute_indicators(symbol)
     
     def update(self, market_data: Dict):
-        """Update strategy with new market data"""
+        """Update strategy with new market data
+
+        Streaming indicators advance by one price in O(1); no frame is rebuilt
+        unless a configured indicator has no streaming form.
+        """
         symbol = market_data["symbol"]
         price = market_data["price"]
         timestamp = market_data["timestamp"]
-        
-        # Update historical data
-        self._update_historical_data(symbol, price, timestamp)
+        if symbol not in self.indicators:
+            self.indicators[symbol] = self._new_indicator_state()
         
         # Update indicators
-        self._update_indicators(symbol)
+        self._advance_streaming(symbol, float(price))
+        if self._needs_history:
+            self._update_historical_data(symbol, price, timestamp)
+            self._recompute_indicators(symbol)
         
         # Check positions
         self._check_positions(symbol, price)
@@ -80,6 +119,49 @@ class StrategyEngine:
         # Generate signals
         return self._generate_signals(symbol, price)
     
+    def generate_signals(self, data: pd.DataFrame) -> np.ndarray:
+        """Vectorized signals for a whole frame: +1 entry (BUY), -1 exit (SELL), 0 none
+
+        Each indicator is computed once over the full frame and the entry/exit
+        conditions are evaluated as boolean masks. An empty condition list never fires.
+        """
+        frame = data if 'price' in data.columns else data.assign(price=data['close'])
+        indicators = {
+            name: np.asarray(getattr(self.ta, name)(frame, **config), dtype=np.float64)
+            for name, config in self.config.indicators.items()
+        }
+        entries = self._conditions_mask(indicators, self.config.entry_conditions, len(frame))
+        exits = self._conditions_mask(indicators, self.config.exit_conditions, len(frame))
+
+        signals = np.zeros(len(frame), dtype=np.int8)
+        signals[exits] = -1
+        signals[entries] = 1
+        return signals
+
+    @staticmethod
+    def _conditions_mask(indicators: Dict[str, np.ndarray], conditions: List[Dict], n: int) -> np.ndarray:
+        """Bars where every condition holds (vectorized _check_conditions)"""
+        if not conditions:
+            return np.zeros(n, dtype=bool)
+
+        mask = np.ones(n, dtype=bool)
+        for condition in conditions:
+            values = indicators[condition["indicator"]]
+            threshold = condition["value"]
+            previous = np.empty_like(values)
+            previous[:1] = np.nan
+            previous[1:] = values[:-1]
+
+            if condition["type"] == "above":
+                mask &= values > threshold
+            elif condition["type"] == "below":
+                mask &= values < threshold
+            elif condition["type"] == "cross_above":
+                mask &= (previous <= threshold) & (values > threshold)
+            elif condition["type"] == "cross_below":
+                mask &= (previous >= threshold) & (values < threshold)
+        return mask
+
     def _load_historical_data(self, symbol: str) -> pd.DataFrame:
         """Load historical data for a symbol"""
         try:
@@ -98,7 +180,7 @@ class StrategyEngine:
             "price": [price]
         })
         self.historical_data[symbol] = pd.concat([
-            self.historical_data[symbol],
+            self.historical_data.get(symbol),
             new_data
         ]).tail(1000)  # Keep last 1000 points
     
@@ -107,12 +189,33 @@ class StrategyEngine:
         data = self.historical_data[symbol]
         return getattr(self.ta, name)(data, **config)
     
-    def _update_indicators(self, symbol: str):
-        """Update all indicators for a symbol"""
-        for ind_name, ind_config in self.config.indicators.items():
-            self.indicators[symbol][ind_name] = self._calculate_indicator(
-                symbol, ind_name, ind_config
+    def _new_indicator_state(self) -> Dict[str, IndicatorState]:
+        """Fresh per-symbol state, one streaming calculator per streaming indicator"""
+        return {
+            name: IndicatorState(
+                self.STREAMING_INDICATORS[name](config) if name in self.STREAMING_INDICATORS else None
             )
+            for name, config in self.config.indicators.items()
+        }
+    
+    def _advance_streaming(self, symbol: str, price: float):
+        """Feed one price to every streaming indicator of a symbol"""
+        if price != price:
+            return
+        for state in self.indicators[symbol].values():
+            if state.calculator is not None:
+                state.push(float(state.calculator.add(price)))
+    
+    def _recompute_indicators(self, symbol: str):
+        """Recompute indicators that have no streaming form from the price history"""
+        if not self._needs_history or symbol not in self.historical_data:
+            return
+        for ind_name, ind_config in self.config.indicators.items():
+            state = self.indicators[symbol][ind_name]
+            if state.calculator is None:
+                values = self._calculate_indicator(symbol, ind_name, ind_config)
+                state.previous = values.iloc[-2] if len(values) > 1 else np.nan
+                state.current = values.iloc[-1] if len(values) else np.nan
     
     def _check_positions(self, symbol: str, current_price: float):
         """Check and update existing positions"""
@@ -186,7 +289,7 @@ class StrategyEngine:
         """Check if conditions are met"""
         for condition in conditions:
             indicator = self.indicators[symbol][condition["indicator"]]
-            current_value = indicator.iloc[-1]
+            current_value = indicator.current
             
             if condition["type"] == "above":
                 if current_value <= condition["value"]:
@@ -195,11 +298,11 @@ class StrategyEngine:
                 if current_value >= condition["value"]:
                     return False
             elif condition["type"] == "cross_above":
-                if not (indicator.iloc[-2] <= condition["value"] and 
+                if not (indicator.previous <= condition["value"] and 
                        current_value > condition["value"]):
                     return False
             elif condition["type"] == "cross_below":
-                if not (indicator.iloc[-2] >= condition["value"] and 
+                if not (indicator.previous >= condition["value"] and 
                        current_value < condition["value"]):
                     return False
         
@@ -228,8 +331,8 @@ class StrategyEngine:
             },
             "indicators": {
                 symbol: {
-                    name: values.iloc[-1]
-                    for name, values in symbol_indicators.items()
+                    name: state.current
+                    for name, state in symbol_indicators.items()
                 }
                 for symbol, symbol_indicators in self.indicators.items()
             }
@@ -0,0 +1,127 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from agent_system import AgentConfig, AgentSystem, BaseAgent, IndicatorCache
+
+COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+WARMUP_BARS = 51
+
+@pytest.fixture
+def ohlcv():
+    rng = np.random.default_rng(7)
+    n = 300
+    close = 60_000 + np.cumsum(rng.normal(0, 25, n))
+    spread = rng.uniform(5, 40, n)
+    frame = pd.DataFrame({
+        'open': close + rng.normal(0, 5, n),
+        'high': close + spread,
+        'low': close - spread,
+        'close': close,
+        'volume': rng.uniform(1, 100, n),
+    }, index=pd.date_range('2024-01-01', periods=n, freq='1min'))
+    # Missing prints on individual fields
+    frame.iloc[[60, 61, 150], frame.columns.get_loc('close')] = np.nan
+    frame.iloc[[90, 200], frame.columns.get_loc('high')] = np.nan
+    frame.iloc[[120], frame.columns.get_loc('low')] = np.nan
+    frame.iloc[[100, 101], frame.columns.get_loc('volume')] = np.nan
+    return frame
+
+def _reference(data: pd.DataFrame) -> pd.DataFrame:
+    """Indicator definitions the agents computed with pandas before IndicatorCache"""
+    close, high, low = data['close'], data['high'], data['low']
+    delta = close.diff()
+    avg_gains = delta.clip(lower=0).rolling(14, min_periods=1).mean()
+    avg_losses = (-delta.clip(upper=0)).rolling(14, min_periods=1).mean()
+    total = avg_gains + avg_losses
+    tr = pd.concat([
+        high - low, (high - close.shift()).abs(), (low - close.shift()).abs()
+    ], axis=1).max(axis=1)
+    highest = high.rolling(20).max()
+    lowest = low.rolling(20).min()
+    return pd.DataFrame({
+        'close': close,
+        'sma20': close.rolling(20).mean(),
+        'sma50': close.rolling(50).mean(),
+        'std20': close.rolling(20).std(),
+        'rsi': (100 * avg_gains / total).where(total > 0),
+        'atr': tr.rolling(14).mean(),
+        'highest': highest,
+        'lowest': lowest,
+        'prev_highest': highest.shift(),
+        'prev_lowest': lowest.shift(),
+        'volume_sma': data['volume'].rolling(20).mean(),
+    })
+
+def _assert_matches(snapshot: dict, expected: pd.Series):
+    for name, value in expected.items():
+        np.testing.assert_allclose(snapshot[name], value, rtol=1e-9, equal_nan=True, err_msg=name)
+
+def test_incremental_sync_matches_pandas(ohlcv):
+    expected = _reference(ohlcv)
+    cache = IndicatorCache()
+    for i in range(1, len(ohlcv) + 1):
+        cache.sync(ohlcv.iloc[:i], COLUMNS, WARMUP_BARS)
+        _assert_matches(cache.snapshot(), expected.iloc[i - 1])
+        assert cache.timestamp == ohlcv.index[i - 1]
+
+def test_rebuild_after_non_contiguous_input_matches_pandas(ohlcv):
+    expected = _reference(ohlcv)
+    cache = IndicatorCache()
+    cache.sync(ohlcv.iloc[:80], COLUMNS, WARMUP_BARS)
+
+    # Skipping bars forces a rebuild from the last WARMUP_BARS rows
+    cache.sync(ohlcv.iloc[:95], COLUMNS, WARMUP_BARS)
+    assert cache.count == WARMUP_BARS
+    _assert_matches(cache.snapshot(), expected.iloc[94])
+
+    # Incremental updates continue from the rebuilt state
+    for i in range(96, 130):
+        cache.sync(ohlcv.iloc[:i], COLUMNS, WARMUP_BARS)
+        _assert_matches(cache.snapshot(), expected.iloc[i - 1])
+
+def test_rebuild_on_shifted_window_matches_pandas(ohlcv):
+    cache = IndicatorCache()
+    cache.sync(ohlcv.iloc[:250], COLUMNS, WARMUP_BARS)
+
+    # A window that does not extend the previous one (e.g. a reloaded history)
+    window = ohlcv.iloc[170:240]
+    cache.sync(window, COLUMNS, WARMUP_BARS)
+    _assert_matches(cache.snapshot(), _reference(window).iloc[-1])
+
+class _FrameOnlyAgent(BaseAgent):
+    """Implements analyze only, without cached-indicator support"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.frames = []
+
+    def analyze(self, data, indicators=None):
+        self.frames.append(data)
+        return None
+
+def test_tick_dispatches_on_supports_cache(ohlcv, tmp_path, caplog):
+    system = AgentSystem(tmp_path / 'agents.db')
+    try:
+        config = AgentConfig(name='frame_only', symbol='BTC', timeframe='1m',
+                             strategy_type='custom', parameters={})
+        frame_only = _FrameOnlyAgent(config)
+        system.agents[config.name] = frame_only
+        assert system.add_agent(AgentConfig(name='trend', symbol='BTC', timeframe='1m',
+                                            strategy_type='trend_following', parameters={}))
+        assert system.get_agent('trend').supports_cache
+        assert not frame_only.supports_cache
+
+        bars = ohlcv.iloc[:60]
+        with caplog.at_level('ERROR'):
+            for timestamp, row in bars.iterrows():
+                system.tick('BTC', {**row.to_dict(), 'timestamp': timestamp}, '1m')
+        assert not caplog.records
+
+        # Agents without cache support see the buffered bars as a frame
+        assert len(frame_only.frames) == len(bars)
+        last = frame_only.frames[-1]
+        assert list(last.index) == list(bars.index)
+        np.testing.assert_array_equal(last['close'].to_numpy(), bars['close'].to_numpy())
+    finally:
+        system.close()
@@ -0,0 +1,217 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from types import SimpleNamespace
+
+from agent_system import AgentConfig
+from backtest_system import (
+    BacktestConfig, BacktestSystem, _run_kernel, _monthly_returns,
+    _OPEN, _SL_TP, _LIQUIDATION, _BACKTEST_END
+)
+
+COMMISSION = 0.001
+CAPITAL = 10_000.0
+
+def _signals(*rows):
+    """Signal arrays in _run_kernel order from (bar, sym, dir, size, stop, tp, lev, liq) rows"""
+    table = np.array(rows, dtype=np.float64).reshape(-1, 8)
+    return (
+        table[:, 0].astype(np.int64), table[:, 1].astype(np.int64), table[:, 2].astype(np.int8),
+        table[:, 3].copy(), table[:, 4].copy(), table[:, 5].copy(), table[:, 6].copy(), table[:, 7].copy()
+    )
+
+def _run(close, signals, funding_rates=None, funding_bars=10_000, capital=CAPITAL):
+    close = np.asarray(close, dtype=np.float64)
+    if close.ndim == 1:
+        close = close[:, None]
+    if funding_rates is None:
+        funding_rates = np.zeros((close.shape[0] // funding_bars + 1, close.shape[1]))
+    (valid, equity, realized, rejected,
+     tr_bar, tr_sym, tr_dir, tr_size, tr_price, tr_comm, tr_pnl, tr_lev, tr_reason) = _run_kernel(
+        close, *signals, COMMISSION, funding_rates, funding_bars, capital
+    )
+    trades = pd.DataFrame({
+        'bar': tr_bar, 'sym': tr_sym, 'dir': tr_dir, 'size': tr_size, 'price': tr_price,
+        'comm': tr_comm, 'pnl': tr_pnl, 'lev': tr_lev, 'reason': tr_reason
+    })
+    return valid, equity, realized, rejected, trades
+
+def test_take_profit_closes_spot_long():
+    close = [100.0, 101.0, 103.0, 105.0, 104.0]
+    valid, equity, realized, rejected, trades = _run(
+        close, _signals((1, 0, 1, 2.0, 95.0, 104.0, 0.0, 0.0))
+    )
+
+    open_comm = 2.0 * 101.0 * COMMISSION
+    close_comm = 2.0 * 105.0 * COMMISSION
+    assert valid.all()
+    assert rejected == 0
+    assert list(trades['reason']) == [_OPEN, _SL_TP]
+    assert list(trades['bar']) == [1, 3]
+    assert list(trades['dir']) == [1, -1]
+    assert trades['comm'].tolist() == pytest.approx([open_comm, close_comm])
+    assert trades['pnl'].iloc[1] == pytest.approx(2.0 * (105.0 - 101.0))
+    assert realized == pytest.approx(8.0 - open_comm - close_comm)
+    # Unrealized PnL is marked to the bar close while the position is open
+    assert equity[2] == pytest.approx(CAPITAL - open_comm + 2.0 * (103.0 - 101.0))
+    assert equity[4] == pytest.approx(CAPITAL + realized)
+
+def test_stop_loss_closes_spot_short():
+    close = [100.0, 100.0, 101.0, 102.0]
+    _, _, realized, _, trades = _run(
+        close, _signals((0, 0, -1, 1.0, 102.0, 90.0, 0.0, 0.0))
+    )
+
+    assert list(trades['reason']) == [_OPEN, _SL_TP]
+    assert trades['bar'].iloc[1] == 3
+    assert trades['pnl'].iloc[1] == pytest.approx(-2.0)
+    assert realized == pytest.approx(-2.0 - 100.0 * COMMISSION - 102.0 * COMMISSION)
+
+def test_liquidation_takes_precedence_over_stop():
+    config = SimpleNamespace(min_maintenance_margin=0.005)
+    liq = BacktestSystem._liquidation_factor(SimpleNamespace(config=config, _liq_factors={}), 1, 10.0)
+    assert liq == pytest.approx(0.905)
+
+    # The gap to 80 crosses both the liquidation price (90.5) and the stop (85)
+    close = [100.0, 100.0, 95.0, 80.0, 80.0]
+    _, _, realized, _, trades = _run(
+        close, _signals((1, 0, 1, 10.0, 85.0, 150.0, 10.0, liq))
+    )
+
+    margin = 10.0 * 100.0 / 10.0
+    assert list(trades['reason']) == [_OPEN, _LIQUIDATION]
+    assert trades['bar'].iloc[1] == 3
+    assert trades['comm'].iloc[0] == pytest.approx(margin * COMMISSION)
+    assert trades['pnl'].iloc[1] == pytest.approx(10.0 * (80.0 - 100.0))
+    assert realized == pytest.approx(-200.0 - margin * COMMISSION - 10.0 * 80.0 * COMMISSION)
+
+def test_funding_charged_each_interval_at_entry_rate():
+    close = np.full(8, 100.0)
+    funding_rates = np.array([[0.01], [0.02], [0.03]])
+    _, equity, realized, _, trades = _run(
+        close, _signals((1, 0, 1, 5.0, 50.0, 200.0, 2.0, 0.5)),
+        funding_rates=funding_rates, funding_bars=3
+    )
+
+    open_comm = 5.0 * 100.0 / 2.0 * COMMISSION
+    funding = 5.0 * 100.0 * 0.01
+    # Charged at bars 3 and 6 using the rate of the period the position was opened in
+    assert equity[2] == pytest.approx(CAPITAL - open_comm)
+    assert equity[3] == pytest.approx(CAPITAL - open_comm - funding)
+    assert equity[6] == pytest.approx(CAPITAL - open_comm - 2 * funding)
+    assert list(trades['reason']) == [_OPEN, _BACKTEST_END]
+    assert realized == pytest.approx(-open_comm - 2 * funding - 5.0 * 100.0 * COMMISSION)
+
+def test_margin_rejection_and_repeat_signals():
+    close = np.full(4, 100.0)
+    _, _, _, rejected, trades = _run(
+        close,
+        _signals(
+            # Margin 1500 exceeds the 1000 of free equity
+            (0, 0, 1, 30.0, 50.0, 200.0, 2.0, 0.5),
+            (1, 0, 1, 10.0, 50.0, 200.0, 2.0, 0.5),
+            # Ignored while the first accepted position is still open
+            (2, 0, -1, 1.0, 150.0, 50.0, 0.0, 0.0),
+        ),
+        capital=1_000.0
+    )
+
+    assert rejected == 1
+    assert list(trades['reason']) == [_OPEN, _BACKTEST_END]
+    assert list(trades['bar']) == [1, 3]
+    assert trades['size'].tolist() == [10.0, 10.0]
+
+def test_backtest_end_closes_all_symbols_at_last_price():
+    close = np.array([
+        [np.nan, np.nan],
+        [np.nan, 50.0],
+        [100.0, 51.0],
+        [102.0, 49.0],
+    ])
+    valid, equity, realized, _, trades = _run(
+        close,
+        _signals(
+            # Dropped: no symbol has data yet
+            (0, 1, 1, 1.0, 1.0, 1000.0, 0.0, 0.0),
+            # Ignored: this symbol has no price yet
+            (1, 0, 1, 1.0, 1.0, 1000.0, 0.0, 0.0),
+            (1, 1, -1, 2.0, 100.0, 1.0, 0.0, 0.0),
+            (2, 0, 1, 1.0, 1.0, 1000.0, 0.0, 0.0),
+        )
+    )
+
+    open_comm = 2.0 * 50.0 * COMMISSION + 100.0 * COMMISSION
+    close_comm = 102.0 * COMMISSION + 2.0 * 49.0 * COMMISSION
+    assert valid.tolist() == [False, True, True, True]
+    assert list(trades['reason']) == [_OPEN, _OPEN, _BACKTEST_END, _BACKTEST_END]
+    ends = trades[trades['reason'] == _BACKTEST_END].set_index('sym')
+    assert ends['bar'].tolist() == [3, 3]
+    assert ends.loc[0, 'price'] == 102.0
+    assert ends.loc[1, 'price'] == 49.0
+    assert ends.loc[0, 'pnl'] == pytest.approx(2.0)
+    assert ends.loc[1, 'pnl'] == pytest.approx(2.0)
+    assert equity[3] == pytest.approx(CAPITAL + 4.0 - open_comm)
+    assert realized == pytest.approx(4.0 - open_comm - close_comm)
+
+def test_monthly_returns_match_resample():
+    # Two-hourly points with March missing entirely
+    index = pd.date_range('2024-01-15', '2024-06-10', freq='2h')
+    index = index[index.month != 3]
+    equity = pd.Series(
+        10_000 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.001, len(index)))),
+        index=index
+    )
+
+    expected = equity.resample('ME').last().ffill().pct_change()
+    result = _monthly_returns(index.asi8, equity.to_numpy())
+
+    pd.testing.assert_series_equal(result, expected, check_freq=False, check_names=False)
+
+class MeanReversionBacktest(BacktestSystem):
+    """Registers its agents in the _initialize_agents hook, like a user subclass"""
+
+    def _initialize_agents(self):
+        self.agent_system.add_agent(AgentConfig(
+            name='mean_reversion_btc', symbol='BTC', timeframe='1m',
+            strategy_type='mean_reversion', parameters={}, confidence_threshold=0.01
+        ))
+        super()._initialize_agents()
+
+@pytest.fixture
+def market_db(tmp_path, monkeypatch):
+    """3000 one-minute bars of a slow drift with a sharp sell-off every 150 bars"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'database').mkdir()
+    start = datetime(2024, 1, 1)
+    rng = np.random.default_rng(3)
+    n = 3000
+    steps = rng.normal(0.01, 0.1, n)
+    # Consecutive losses push the price below the lower band with RSI under 30
+    steps[np.arange(n) % 150 >= 145] -= 0.8
+    close = 100 + np.cumsum(steps)
+    rows = [
+        ('BTC', '1m', str(start + timedelta(minutes=i)), c, c + 0.3, c - 0.3, c, 10.0)
+        for i, c in enumerate(close)
+    ]
+    with sqlite3.connect(tmp_path / 'database' / 'market_data.db') as conn:
+        conn.execute("""
+            CREATE TABLE ohlcv (symbol TEXT, timeframe TEXT, timestamp TEXT,
+                                open REAL, high REAL, low REAL, close REAL, volume REAL)
+        """)
+        conn.executemany("INSERT INTO ohlcv VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+    return BacktestConfig(
+        start_date=start, end_date=start + timedelta(minutes=n - 1), initial_capital=CAPITAL,
+        symbols=['BTC'], timeframes=['1m'], funding_seed=0
+    )
+
+def test_run_batch_uses_subclass_agents(market_db):
+    system = MeanReversionBacktest(market_db)
+    system._simulate()
+    assert system._tr_i > 0
+
+    results = MeanReversionBacktest.run_batch([market_db, market_db], max_workers=2)
+    assert [len(result.trades) for result in results] == [system._tr_i, system._tr_i]
+    assert [result.total_pnl for result in results] == pytest.approx([system.total_pnl] * 2)
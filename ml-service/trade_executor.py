@@ -3,9 +3,9 @@ import logging
 import aiohttp
 import time
 import psutil
-from typing import Dict, List, Optional, Any, Union, TypeVar, cast
+from typing import Dict, List, Mapping, Optional, Any, Union, TypeVar, cast
 from datetime import datetime
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from ml_service.agent_system import TradeSignal, AgentSystem
 from ml_service.config import Config
 from ml_service.reporting_system import ReportingSystem, ExecutionReport, PerformanceReport
@@ -134,7 +134,7 @@ class TradeExecutor:
             await self.reporting.save_error_report({
                 'timestamp': datetime.now(),
                 'error': str(e),
-                'signal': signal.__dict__,
+                'signal': asdict(signal),
                 'type': 'SIGNAL_PROCESSING_ERROR'
             })
 
@@ -147,7 +147,7 @@ class TradeExecutor:
                 raise ValueError(f"Invalid current price: {current_price}")
                 
             contract_config = Config.get_contract_config()
-            if not isinstance(contract_config, dict):
+            if not isinstance(contract_config, Mapping):
                 raise RuntimeError("Invalid contract configuration")
 
             if not signal.symbol or signal.symbol not in contract_config.get('enabled_pairs', []):
@@ -307,7 +307,7 @@ class TradeExecutor:
                 raise ValueError(f"Invalid margin type: {margin_type}")
                 
             risk_config = Config.get_risk_config()
-            if not isinstance(risk_config, dict):
+            if not isinstance(risk_config, Mapping):
                 raise RuntimeError("Invalid risk configuration")
                 
             maintenance_margin = risk_config.get('min_maintenance_margin')
@@ -379,7 +379,7 @@ class TradeExecutor:
             now = datetime.now()
             risk_config = Config.get_risk_config()
             
-            if not isinstance(risk_config, dict):
+            if not isinstance(risk_config, Mapping):
                 logger.error("Invalid risk configuration")
                 interval = 8  # Default 8-hour interval
             else:
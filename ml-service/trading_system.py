@@ -149,6 +149,9 @@ class TradingSystem:
         
         # 停止市场数据服务
         await self.market_data_service.stop()
+
+        # 写入缓冲中的信号与性能记录
+        self.agent_system.close()
     
     async def _analysis_loop(self) -> None:
         """市场分析循环"""